@@ -0,0 +1,144 @@
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+
+from benchmarks.stubs import SonarrStub
+from streamnet.arr import LIBRARY_FIELDS
+from streamnet.jsonstream import CHUNK_SIZE, iter_array
+
+
+# A series the way Sonarr lists it: the stub's fields plus the images,
+# seasons and other details a real /api/v3/series response carries
+def make_series(stub, number):
+    series = stub.make_item(number)
+    series.update(
+        originalTitle=series["title"],
+        alternateTitles=[{"title": f"{series['title']} (Alt)", "seasonNumber": -1}],
+        images=[
+            {
+                "coverType": cover,
+                "url": f"/MediaCover/{number}/{cover}.jpg?lastWrite=638000000000000000",
+                "remoteUrl": f"https://artworks.thetvdb.com/banners/{cover}/{number}.jpg",
+            }
+            for cover in ("banner", "poster", "fanart")
+        ],
+        seasons=[
+            {
+                "seasonNumber": season,
+                "monitored": True,
+                "statistics": {
+                    "episodeFileCount": 10,
+                    "episodeCount": 10,
+                    "totalEpisodeCount": 10,
+                    "sizeOnDisk": 12_345_678_901,
+                    "percentOfEpisodes": 100.0,
+                },
+            }
+            for season in range(1, 6)
+        ],
+        genres=["Drama", "Crime", "Thriller"],
+        tags=[1, 2],
+        added="2023-01-01T00:00:00Z",
+        ratings={"votes": 1234, "value": 8.5},
+    )
+    return series
+
+
+# In-memory stand-in for aiohttp's response.content
+class BytesStream:
+    def __init__(self, body):
+        self.body = body
+        self.offset = 0
+
+    async def read(self, size):
+        chunk = self.body[self.offset : self.offset + size]
+        self.offset += len(chunk)
+        return chunk
+
+
+# How the listings were read before: the whole body, then every item
+async def library_whole(body):
+    return [
+        {key: item[key] for key in LIBRARY_FIELDS if key in item}
+        for item in json.loads(body)
+    ]
+
+
+async def library_streaming(body):
+    return [item async for item in iter_array(BytesStream(body), LIBRARY_FIELDS)]
+
+
+# find_series_in_sonarr for a series that is not in the library
+async def check_whole(body):
+    return [series for series in json.loads(body) if series["tvdbId"] == 0]
+
+
+async def check_streaming(body):
+    stream = BytesStream(body)
+    return [
+        series
+        async for series in iter_array(stream, ("id", "title", "tvdbId", "seasons"))
+        if series["tvdbId"] == 0
+    ]
+
+
+# Scenario -> (before, after)
+CASES = {
+    "library": (library_whole, library_streaming),
+    "check": (check_whole, check_streaming),
+}
+
+
+# Peak memory (tracemalloc) and time of parsing a listing
+def measure(parse, body):
+    tracemalloc.start()
+    started = time.perf_counter()
+    items = asyncio.run(parse(body))
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return items, peak / 1024 / 1024, elapsed_ms
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compare reading a Sonarr listing as a whole with the streaming parser."
+    )
+    parser.add_argument(
+        "--items", type=int, nargs="+", default=[5_000, 20_000], help="library sizes"
+    )
+    args = parser.parse_args(argv)
+
+    stub = SonarrStub(library_size=0)
+    results = {}
+    print(f"chunk size {CHUNK_SIZE // 1024} KiB, fields {', '.join(LIBRARY_FIELDS)}")
+    print(
+        f"{'case':<8} {'items':>7} {'body_mb':>8} {'whole_mb':>9} {'stream_mb':>10} "
+        f"{'whole_ms':>9} {'stream_ms':>10}"
+    )
+    for size in args.items:
+        body = json.dumps([make_series(stub, n) for n in range(1, size + 1)]).encode()
+        body_mb = len(body) / 1024 / 1024
+        for name, (before, after) in CASES.items():
+            expected, whole_mb, whole_ms = measure(before, body)
+            items, stream_mb, stream_ms = measure(after, body)
+            if items != expected:
+                raise SystemExit(f"{name}: both parsers must return the same items.")
+            results[f"{name} {size}"] = {
+                "body_mb": body_mb,
+                "whole_mb": whole_mb,
+                "stream_mb": stream_mb,
+                "whole_ms": whole_ms,
+                "stream_ms": stream_ms,
+            }
+            print(
+                f"{name:<8} {size:>7} {body_mb:>8.1f} {whole_mb:>9.1f} "
+                f"{stream_mb:>10.1f} {whole_ms:>9.0f} {stream_ms:>10.0f}"
+            )
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,405 @@
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.stubs import (
+    RadarrStub,
+    SonarrStub,
+    StubCluster,
+    TelegramStub,
+    TmdbStub,
+)
+from streamnet import callbackdata
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+GROUP_CHAT_ID = -100123456789
+BOT_TOKEN = "123456:BENCHMARK-TOKEN-000000000000000000"
+
+# Scenarios in the order they have to run (later ones reuse earlier user state)
+SCENARIOS = ("search", "select", "add", "join", "night")
+REQUIRES = {"select": ("search",), "add": ("search", "select")}
+
+
+# Nearest-rank percentile of an already sorted list
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    rank = max(
+        0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1)
+    )
+    return sorted_values[rank]
+
+
+# Write a config.json pointing the bot at the stubs and load it
+def prepare_workdir(workdir, urls):
+    config = {
+        "bot": {"TOKEN": BOT_TOKEN, "TIMEZONE": "Europe/Berlin", "LOG_LEVEL": "INFO"},
+        "commands": {},
+        "welcome": {
+            "IMAGE_URL": "https://example.org/welcome.png",
+            "BUTTON_URL": "https://example.org/store",
+            "SUPPORT_URL": "https://example.org/support",
+        },
+        "nightmode": {"NIGHTMODE_START": "00:00", "NIGHTMODE_END": "23:59"},
+        "tmdb": {
+            "API_KEY": "benchmark",
+            "DEFAULT_LANGUAGE": "en",
+            "API_URL": f"{urls['tmdb']}/3",
+        },
+        "sonarr": {
+            "URL": urls["sonarr"],
+            "API_KEY": "benchmark",
+            "QUALITY_PROFILE_NAME": "HD",
+            "ROOT_FOLDER_PATH": "/tv",
+        },
+        "radarr": {
+            "URL": urls["radarr"],
+            "API_KEY": "benchmark",
+            "QUALITY_PROFILE_NAME": "HD",
+            "ROOT_FOLDER_PATH": "/movies",
+        },
+    }
+    os.makedirs(os.path.join(workdir, "config"), exist_ok=True)
+    with open(os.path.join(workdir, "config", "config.json"), "w") as config_file:
+        json.dump(config, config_file)
+
+    # The bot resolves config/ and database/ relative to the working directory
+    os.chdir(workdir)
+    if REPO_DIR not in sys.path:
+        sys.path.insert(0, REPO_DIR)
+
+    from streamnet import state
+    from streamnet.config import load_config, set_config
+    from streamnet.database import init_db
+
+    config = load_config()
+    set_config(config)
+    init_db(config.tmdb.default_language)
+    state.initialize_group_data(config.tmdb.default_language)
+
+
+# Generates synthetic Telegram updates for the scenarios
+class TrafficGenerator:
+    def __init__(self, bot_user_id=1):
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self.bot_user_id = bot_user_id
+
+    def user(self, user_id):
+        return {
+            "id": user_id,
+            "is_bot": False,
+            "first_name": f"User{user_id}",
+            "username": f"user{user_id}",
+        }
+
+    def message(self, user_id, text=None, **extra):
+        message = {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": GROUP_CHAT_ID, "type": "supergroup", "title": "Bench"},
+            "from": self.user(user_id),
+        }
+        if text is not None:
+            message["text"] = text
+            if text.startswith("/"):
+                message["entities"] = [
+                    {"type": "bot_command", "offset": 0, "length": len(text.split()[0])}
+                ]
+        message.update(extra)
+        return {"update_id": next(self._update_ids), "message": message}
+
+    def callback(self, user_id, data):
+        bot_message = {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": GROUP_CHAT_ID, "type": "supergroup", "title": "Bench"},
+        }
+        return {
+            "update_id": next(self._update_ids),
+            "callback_query": {
+                "id": str(next(self._update_ids)),
+                "from": self.user(user_id),
+                "chat_instance": "bench",
+                "data": data,
+                "message": bot_message,
+            },
+        }
+
+
+# Drives the scenarios against an initialised application
+class LoadTest:
+    def __init__(self, application, cluster, users, concurrency, join_burst):
+        self.application = application
+        self.cluster = cluster
+        self.users = list(range(1000, 1000 + users))
+        self.concurrency = concurrency
+        self.join_burst = join_burst
+        self.traffic = TrafficGenerator()
+        self.last_message = {}
+        self.handler_errors = 0
+        application.add_error_handler(self._on_error)
+
+    async def _on_error(self, update, context):
+        self.handler_errors += 1
+
+    # Remember the message of every user's last update, to find the buttons
+    # the bot answered it with
+    def _track(self, updates):
+        updates = list(updates)
+        for data in updates:
+            if "callback_query" in data:
+                user_id = data["callback_query"]["from"]["id"]
+                message_id = data["callback_query"]["message"]["message_id"]
+            else:
+                user_id = data["message"]["from"]["id"]
+                message_id = data["message"]["message_id"]
+            self.last_message[user_id] = message_id
+        return updates
+
+    # (user id, callback data of the buttons shown to the user) for each user
+    def _buttons(self):
+        telegram = self.cluster["telegram"]
+        for user_id in self.users:
+            buttons = telegram.buttons.get(self.last_message.get(user_id))
+            if buttons:
+                yield user_id, buttons
+
+    def updates_for(self, scenario):
+        traffic = self.traffic
+        if scenario == "search":
+            return self._track(
+                traffic.message(user_id, f"/search Bench Title {user_id % 50}")
+                for user_id in self.users
+            )
+        if scenario == "select":
+            return self._track(
+                traffic.callback(user_id, buttons[user_id % len(buttons)])
+                for user_id, buttons in self._buttons()
+            )
+        if scenario == "add":
+            # The first button requests the title when it can be requested:
+            # "yes", or "latest season" for series with several seasons
+            return self._track(
+                traffic.callback(user_id, buttons[0])
+                for user_id, buttons in self._buttons()
+                if buttons[0].startswith(callbackdata.ADD)
+            )
+        if scenario == "join":
+            updates = []
+            for user_id in self.users:
+                members = [
+                    traffic.user(user_id * 100 + i) for i in range(self.join_burst)
+                ]
+                updates.append(traffic.message(user_id, new_chat_members=members))
+            return updates
+        if scenario == "night":
+            # NIGHTMODE_START/END span the whole day, so every message is restricted
+            from streamnet import nightmode, state
+
+            state.GROUP_CHAT_ID = GROUP_CHAT_ID
+            nightmode.load_night_mode_state()
+            nightmode.night_mode_active = True
+            return [
+                traffic.message(user_id, f"Hallo um {i}")
+                for user_id in self.users
+                for i in range(3)
+            ]
+        raise ValueError(f"Unknown scenario '{scenario}'")
+
+    async def wait_for_jobs(self, timeout=120):
+        from streamnet import jobqueue
+
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            counts = jobqueue.job_counts()
+            if not counts.get(jobqueue.QUEUED) and not counts.get(jobqueue.RUNNING):
+                return
+            await asyncio.sleep(0.05)
+
+    async def run(self, scenario):
+        from telegram import Update
+
+        updates = [
+            Update.de_json(data, self.application.bot)
+            for data in self.updates_for(scenario)
+        ]
+        semaphore = asyncio.Semaphore(self.concurrency)
+        latencies = []
+
+        async def process(update):
+            async with semaphore:
+                started = time.perf_counter()
+                await self.application.process_update(update)
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        errors_before = self.handler_errors
+        calls_before = self.cluster.call_counts()
+        started = time.perf_counter()
+        await asyncio.gather(*(process(update) for update in updates))
+        wall = time.perf_counter() - started
+        if scenario == "add":
+            # Confirmations only queue the adds; wait for the workers to finish them
+            await self.wait_for_jobs()
+        drained = time.perf_counter() - started
+        calls = self.cluster.call_counts() - calls_before
+
+        latencies.sort()
+        return {
+            "scenario": scenario,
+            "updates": len(updates),
+            "errors": self.handler_errors - errors_before,
+            "wall_s": round(wall, 3),
+            "drained_s": round(drained, 3),
+            "throughput": round(len(updates) / wall, 2) if wall else 0.0,
+            "p50_ms": round(percentile(latencies, 50), 1),
+            "p95_ms": round(percentile(latencies, 95), 1),
+            "p99_ms": round(percentile(latencies, 99), 1),
+            "upstream_calls": dict(sorted(calls.items())),
+        }
+
+
+def print_report(results):
+    header = f"{'scenario':<8} {'updates':>7} {'errors':>6} {'wall_s':>8} {'upd/s':>8} {'p50_ms':>8} {'p95_ms':>8} {'p99_ms':>8}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        print(
+            f"{result['scenario']:<8} {result['updates']:>7} {result['errors']:>6} "
+            f"{result['wall_s']:>8} {result['throughput']:>8} {result['p50_ms']:>8} "
+            f"{result['p95_ms']:>8} {result['p99_ms']:>8}"
+        )
+        for key, count in result["upstream_calls"].items():
+            print(f"    {count:>6}  {key}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Offline load test of the bot against local Telegram, TMDB, Sonarr and Radarr stubs."
+    )
+    parser.add_argument(
+        "--scenarios",
+        default=",".join(SCENARIOS),
+        help=f"Comma separated scenarios to measure ({', '.join(SCENARIOS)})",
+    )
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--join-burst", type=int, default=3)
+    parser.add_argument("--library-size", type=int, default=5_000)
+    parser.add_argument(
+        "--catalogue-size",
+        type=int,
+        default=None,
+        help="Range of TMDB ids returned by searches (default: 2x library size)",
+    )
+    parser.add_argument("--results-per-page", type=int, default=20)
+    parser.add_argument("--telegram-latency-ms", type=float, default=20.0)
+    parser.add_argument("--tmdb-latency-ms", type=float, default=80.0)
+    parser.add_argument("--arr-latency-ms", type=float, default=30.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument(
+        "--json", dest="json_out", help="Write the results to this file"
+    )
+    parser.add_argument("--log-level", default="CRITICAL")
+    return parser.parse_args(argv)
+
+
+async def run_load_test(cluster, urls, args, scenarios):
+    from telegram.ext import ApplicationBuilder
+
+    from streamnet.application import build_application, shutdown_subsystems
+
+    builder = (
+        ApplicationBuilder()
+        .token(BOT_TOKEN)
+        .base_url(f"{urls['telegram']}/bot")
+        .base_file_url(f"{urls['telegram']}/file/bot")
+    )
+    application = build_application(builder)
+    await application.initialize()
+    await application.post_init(application)
+
+    load_test = LoadTest(
+        application, cluster, args.users, args.concurrency, args.join_burst
+    )
+    wanted = set(scenarios)
+    needed = set(wanted)
+    for scenario in wanted:
+        needed.update(REQUIRES.get(scenario, ()))
+
+    results = []
+    try:
+        for scenario in SCENARIOS:
+            if scenario not in needed:
+                continue
+            result = await load_test.run(scenario)
+            if scenario in wanted:
+                results.append(result)
+    finally:
+        await application.shutdown()
+        await shutdown_subsystems(application)
+    return results
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    common = {"jitter_ms": args.jitter_ms, "error_rate": args.error_rate}
+    cluster = StubCluster(
+        TelegramStub(latency_ms=args.telegram_latency_ms, seed=args.seed, **common),
+        TmdbStub(
+            catalogue_size=args.catalogue_size or args.library_size * 2,
+            results_per_page=args.results_per_page,
+            latency_ms=args.tmdb_latency_ms,
+            seed=args.seed + 1,
+            **common,
+        ),
+        SonarrStub(
+            library_size=args.library_size,
+            latency_ms=args.arr_latency_ms,
+            seed=args.seed + 2,
+            **common,
+        ),
+        RadarrStub(
+            library_size=args.library_size,
+            latency_ms=args.arr_latency_ms,
+            seed=args.seed + 3,
+            **common,
+        ),
+    )
+    urls = cluster.start()
+    cwd = os.getcwd()
+    try:
+        with tempfile.TemporaryDirectory(prefix="bot-bench-") as workdir:
+            for name in ("bot", "httpx", "telegram"):
+                logging.getLogger(name).setLevel(args.log_level.upper())
+            prepare_workdir(workdir, urls)
+            try:
+                results = asyncio.run(run_load_test(cluster, urls, args, scenarios))
+            finally:
+                os.chdir(cwd)
+    finally:
+        cluster.stop()
+
+    print_report(results)
+    if args.json_out:
+        with open(args.json_out, "w") as json_file:
+            json.dump({"args": vars(args), "results": results}, json_file, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
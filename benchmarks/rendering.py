@@ -0,0 +1,88 @@
+import argparse
+import re
+import timeit
+
+from streamnet import rendering
+
+# A title with many of the characters MarkdownV2 reserves
+TITLE = "Mission: Impossible - Dead Reckoning (Part One) [4K] #1 *Director's Cut*!"
+OVERVIEW = (
+    "Ethan Hunt and his IMF team embark on their most dangerous mission yet: "
+    "to track down a terrifying new weapon - before it falls into the wrong hands. "
+) * 3
+STARS = "⭐⭐⭐⭐⭐⭐⭐✨★★"
+URL = "https://www.themoviedb.org/movie/575264"
+
+
+# How messages were escaped before the rendering module (utils.escape_markdown_v2)
+def escape_markdown_v2(text):
+    escape_chars = r"([_*\[\]()~`>#+\-=|{}.!\\])"
+    return re.sub(escape_chars, r"\\\1", text)
+
+
+def card_with_re(title):
+    return (
+        f"🎬 *{escape_markdown_v2(title)}* \\(2023\\) \n\n"
+        f"{STARS} \\- 7\\.6/10\n\n"
+        f"{escape_markdown_v2(OVERVIEW)}\n\n"
+        f"[Weitere Infos bei TMDb]({URL})"
+    )
+
+
+def card_with_template(title):
+    return rendering.render(
+        "details_card",
+        title=title,
+        year=2023,
+        stars=STARS,
+        rating=7.6,
+        overview=OVERVIEW,
+        url=URL,
+    )
+
+
+def status_with_re(title):
+    return f"⏳ *{escape_markdown_v2(title)}* wurde bereits angefragt und wird gerade bearbeitet\\."
+
+
+def status_with_template(title):
+    return rendering.render("request_in_progress", title=title)
+
+
+# Message -> (title, before, after)
+CASES = {
+    "details card": (TITLE, card_with_re, card_with_template),
+    "status, plain title": ("Dune", status_with_re, status_with_template),
+    "status, odd title": (TITLE, status_with_re, status_with_template),
+}
+
+
+def measure(function, title, number, repeat):
+    best = min(timeit.repeat(lambda: function(title), number=number, repeat=repeat))
+    return best / number * 1_000_000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compare re.sub escaping with the precompiled MarkdownV2 templates."
+    )
+    parser.add_argument("--number", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    results = {}
+    print(f"{'message':<20} {'re_us':>8} {'template_us':>12} {'speedup':>8}")
+    for name, (title, before, after) in CASES.items():
+        if before(title) != after(title):
+            raise SystemExit(f"{name}: both renderers must produce the same text.")
+        before_us = measure(before, title, args.number, args.repeat)
+        after_us = measure(after, title, args.number, args.repeat)
+        results[name] = {"re_us": before_us, "template_us": after_us}
+        print(
+            f"{name:<20} {before_us:>8.2f} {after_us:>12.2f} {before_us / after_us:>7.1f}x"
+        )
+    return results
+
+
+if __name__ == "__main__":
+    main()
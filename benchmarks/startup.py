@@ -0,0 +1,97 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONFIG = {
+    "bot": {
+        "TOKEN": "123456:STARTUP-BENCHMARK-000000000000000",
+        "TIMEZONE": "Europe/Berlin",
+        "LOG_LEVEL": "INFO",
+    },
+    "commands": {},
+    "welcome": {},
+    "nightmode": {"NIGHTMODE_START": "00:00", "NIGHTMODE_END": "07:00"},
+    "tmdb": {"API_KEY": "benchmark", "DEFAULT_LANGUAGE": "en"},
+    "sonarr": {"URL": "http://127.0.0.1:8989", "API_KEY": "benchmark"},
+    "radarr": {"URL": "http://127.0.0.1:7878", "API_KEY": "benchmark"},
+}
+
+
+# Runs inside the measured process: everything up to the point where polling would start
+def child():
+    started = time.perf_counter()
+    from streamnet.main import prepare_startup
+
+    import_ms = round((time.perf_counter() - started) * 1000, 2)
+    application, timings = prepare_startup()
+    timings = dict(timings, imports=import_ms)
+    timings["total"] = round((time.perf_counter() - started) * 1000, 2)
+    print(json.dumps(timings), flush=True)
+
+
+def measure(workdir, runs):
+    env = dict(os.environ, PYTHONPATH=REPO_DIR)
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-m", "benchmarks.startup", "--child"],
+            cwd=workdir,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        wall_ms = round((time.perf_counter() - started) * 1000, 2)
+        timings = json.loads(result.stdout.strip().splitlines()[-1])
+        timings["process"] = wall_ms
+        samples.append(timings)
+    return samples
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Measure how long the bot takes from process start to polling."
+    )
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument(
+        "--json", dest="json_out", help="Write the samples to this file"
+    )
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        child()
+        return None
+
+    with tempfile.TemporaryDirectory(prefix="bot-startup-") as workdir:
+        os.makedirs(os.path.join(workdir, "config"))
+        with open(os.path.join(workdir, "config", "config.json"), "w") as config_file:
+            json.dump(CONFIG, config_file)
+        # The first run creates the database; measure warm restarts like a container would see
+        measure(workdir, 1)
+        samples = measure(workdir, args.runs)
+
+    phases = list(samples[0].keys())
+    print(f"{'phase':<12} {'min_ms':>9} {'median_ms':>10} {'max_ms':>9}")
+    for phase in phases:
+        values = [sample[phase] for sample in samples]
+        print(
+            f"{phase:<12} {min(values):>9.1f} {statistics.median(values):>10.1f} {max(values):>9.1f}"
+        )
+
+    if args.json_out:
+        with open(args.json_out, "w") as json_file:
+            json.dump(samples, json_file, indent=2)
+    return samples
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,664 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import random
+import socket
+import threading
+import time
+from collections import Counter
+
+from aiohttp import web
+
+# Offset between TMDB ids and TVDB ids of the synthetic catalogue
+TVDB_ID_OFFSET = 1_000_000
+
+
+# Deterministic pseudo-random generator for a query string
+def seeded_random(*parts):
+    digest = hashlib.sha256("|".join(str(p) for p in parts).encode()).digest()
+    return random.Random(int.from_bytes(digest[:8], "big"))
+
+
+# Permissions of the administrators reported by the Telegram stub
+ADMIN_RIGHTS = {
+    "can_be_edited": False,
+    "is_anonymous": False,
+    "can_manage_chat": True,
+    "can_delete_messages": True,
+    "can_manage_video_chats": True,
+    "can_restrict_members": True,
+    "can_promote_members": False,
+    "can_change_info": True,
+    "can_invite_users": True,
+}
+
+
+# Base class for all upstream stand-ins: latency/error injection and call counting
+class UpstreamStub:
+    name = "upstream"
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.calls = Counter()
+        self.errors = Counter()
+        self.app = web.Application(middlewares=[self._middleware])
+        self.add_routes(self.app.router)
+
+    def add_routes(self, router):
+        raise NotImplementedError
+
+    # Key used for call counting, e.g. "GET /api/v3/movie"
+    def route_key(self, request):
+        resource = request.match_info.route.resource
+        route = resource.canonical if resource is not None else request.path
+        return f"{request.method} {route}"
+
+    @web.middleware
+    async def _middleware(self, request, handler):
+        key = self.route_key(request)
+        self.calls[key] += 1
+
+        delay = self.latency_ms + self.random.uniform(0, self.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.errors[key] += 1
+            return web.json_response({"error": "injected failure"}, status=500)
+        return await handler(request)
+
+
+# Telegram Bot API stand-in answering the methods the bot uses
+class TelegramStub(UpstreamStub):
+    name = "telegram"
+
+    def __init__(self, admin_ids=(), **kwargs):
+        self._message_id = 0
+        # Users reported as group administrators by getChatMember
+        self.admin_ids = set(admin_ids)
+        # Bot message id -> id of the message it replied to
+        self._replies = {}
+        # Message id -> callback data of the buttons sent in reply to it, so a
+        # load test can press the buttons the bot showed a user
+        self.buttons = {}
+        super().__init__(**kwargs)
+
+    def add_routes(self, router):
+        router.add_post("/bot{token}/{method}", self.handle_method)
+
+    def route_key(self, request):
+        return request.match_info.get("method", request.path)
+
+    def _next_message(self, chat_id, text=None):
+        self._message_id += 1
+        message = {
+            "message_id": self._message_id,
+            "date": int(time.time()),
+            "chat": {"id": int(chat_id or 0), "type": "supergroup"},
+        }
+        if text is not None:
+            message["text"] = text
+        return message
+
+    def _record_buttons(self, method, params, message_id):
+        if method == "sendMessage":
+            origin = int(params.get("reply_to_message_id") or 0)
+            self._replies[message_id] = origin
+        else:
+            origin = self._replies.get(int(params.get("message_id") or 0))
+        if origin and params.get("reply_markup"):
+            keyboard = json.loads(params["reply_markup"]).get("inline_keyboard", [])
+            self.buttons[origin] = [
+                button["callback_data"]
+                for row in keyboard
+                for button in row
+                if "callback_data" in button
+            ]
+
+    async def handle_method(self, request):
+        method = request.match_info["method"]
+        params = dict(await request.post())
+        chat_id = params.get("chat_id", 0)
+
+        if method == "getMe":
+            result = {
+                "id": 1,
+                "is_bot": True,
+                "first_name": "StreamNet",
+                "username": "streamnet_bench_bot",
+            }
+        elif method in ("sendMessage", "editMessageText", "editMessageReplyMarkup"):
+            result = self._next_message(chat_id, params.get("text", ""))
+            self._record_buttons(method, params, result["message_id"])
+        elif method in ("sendPhoto", "editMessageCaption"):
+            result = self._next_message(chat_id)
+        elif method == "getChatMember":
+            user_id = int(params.get("user_id", 0))
+            result = {
+                "status": "member",
+                "user": {
+                    "id": user_id,
+                    "is_bot": False,
+                    "first_name": "Bench",
+                },
+            }
+            if user_id in self.admin_ids:
+                result.update(ADMIN_RIGHTS, status="administrator")
+        else:
+            # sendChatAction, deleteMessage, answerCallbackQuery, ...
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+
+# TMDB API stand-in generating a deterministic synthetic catalogue
+class TmdbStub(UpstreamStub):
+    name = "tmdb"
+
+    def __init__(self, catalogue_size=10_000, results_per_page=20, **kwargs):
+        self.catalogue_size = catalogue_size
+        self.results_per_page = results_per_page
+        super().__init__(**kwargs)
+
+    def add_routes(self, router):
+        router.add_get("/3/configuration", self.configuration)
+        router.add_get("/3/search/multi", self.search_multi)
+        router.add_get("/3/search/movie", self.search_movie)
+        router.add_get("/3/search/tv", self.search_tv)
+        router.add_get("/3/tv/{tmdb_id}/external_ids", self.external_ids)
+        router.add_get("/3/{media_type}/{tmdb_id}", self.details)
+        router.add_get("/p/exports/{name}", self.export)
+
+    def _result(self, rng, query, index, media_type):
+        tmdb_id = rng.randint(1, self.catalogue_size)
+        year = rng.randint(1950, 2024)
+        result = {
+            "id": tmdb_id,
+            "media_type": media_type,
+            "overview": f"Synthetic overview for {query} #{index}.",
+            "vote_average": round(rng.uniform(1, 10), 1),
+        }
+        if media_type == "movie":
+            result["title"] = f"{query} {index}"
+            result["release_date"] = f"{year}-01-01"
+        else:
+            result["name"] = f"{query} {index}"
+            result["first_air_date"] = f"{year}-01-01"
+        return result
+
+    def _results(self, query, media_type=None):
+        rng = seeded_random(query, media_type)
+        results = []
+        for index in range(self.results_per_page):
+            kind = media_type or ("movie" if index % 2 == 0 else "tv")
+            results.append(self._result(rng, query, index, kind))
+        return {"page": 1, "results": results, "total_results": len(results)}
+
+    async def configuration(self, request):
+        return web.json_response({"images": {"base_url": "http://image.tmdb.org/t/p/"}})
+
+    async def search_multi(self, request):
+        return web.json_response(self._results(request.query.get("query", "")))
+
+    async def search_movie(self, request):
+        return web.json_response(self._results(request.query.get("query", ""), "movie"))
+
+    async def search_tv(self, request):
+        return web.json_response(self._results(request.query.get("query", ""), "tv"))
+
+    async def external_ids(self, request):
+        tmdb_id = int(request.match_info["tmdb_id"])
+        return web.json_response({"id": tmdb_id, "tvdb_id": tmdb_id + TVDB_ID_OFFSET})
+
+    async def details(self, request):
+        media_type = request.match_info["media_type"]
+        tmdb_id = int(request.match_info["tmdb_id"])
+        rng = seeded_random("details", media_type, tmdb_id)
+        details = {
+            "id": tmdb_id,
+            "overview": "Synthetic overview. " * 20,
+            "vote_average": round(rng.uniform(1, 10), 1),
+            "poster_path": f"/{tmdb_id}.jpg",
+        }
+        if media_type == "movie":
+            details["title"] = f"Movie {tmdb_id}"
+            details["release_date"] = f"{rng.randint(1950, 2024)}-01-01"
+        else:
+            details["name"] = f"Series {tmdb_id}"
+            details["first_air_date"] = f"{rng.randint(1950, 2024)}-01-01"
+            details["number_of_seasons"] = rng.randint(1, 12)
+            details["seasons"] = [
+                {"season_number": number, "name": f"Season {number}"}
+                for number in range(details["number_of_seasons"] + 1)
+            ]
+        return web.json_response(details)
+
+    # Daily id export (gzipped JSON lines) of the whole synthetic catalogue
+    async def export(self, request):
+        name = request.match_info["name"]
+        if name.startswith("movie_ids_"):
+            key, prefix = "original_title", "Movie"
+        elif name.startswith("tv_series_ids_"):
+            key, prefix = "original_name", "Series"
+        else:
+            raise web.HTTPNotFound()
+        lines = []
+        for tmdb_id in range(1, self.catalogue_size + 1):
+            rng = seeded_random("export", prefix, tmdb_id)
+            entry = {"id": tmdb_id, key: f"{prefix} {tmdb_id}"}
+            entry["popularity"] = round(rng.expovariate(0.5), 3)
+            if prefix == "Movie":
+                entry.update(adult=False, video=False)
+            lines.append(json.dumps(entry))
+        return web.Response(
+            body=gzip.compress("\n".join(lines).encode()),
+            content_type="application/octet-stream",
+        )
+
+
+# Shared behaviour of the Sonarr and Radarr stand-ins. Titles added through
+# the API are downloaded after `download_seconds`: until then they are in the
+# download queue and in the wanted/missing list.
+class ArrStub(UpstreamStub):
+    list_path = None
+    id_field = None
+    search_option = None
+    queue_field = None
+    webhook_key = None
+
+    def __init__(
+        self, library_size=1_000, quality_profile="HD", download_seconds=30, **kwargs
+    ):
+        self.quality_profile = quality_profile
+        self.download_seconds = download_seconds
+        self.library = [self.make_item(i) for i in range(1, library_size + 1)]
+        self._library_body = None
+        # Library item id -> time its download finishes
+        self.downloads = {}
+        # Bodies of the commands started, in order
+        self.commands = []
+        super().__init__(**kwargs)
+
+    def make_item(self, tmdb_id):
+        raise NotImplementedError
+
+    # Mark an item as downloaded (or not)
+    def set_downloaded(self, item, downloaded):
+        raise NotImplementedError
+
+    def is_missing(self, item):
+        raise NotImplementedError
+
+    # The wanted/missing records of an item
+    def missing_records(self, item):
+        raise NotImplementedError
+
+    # The item as webhook payloads show it, and the event specific fields
+    def webhook_item(self, item):
+        raise NotImplementedError
+
+    def webhook_fields(self, event_type, item):
+        raise NotImplementedError
+
+    # Body of the webhook Sonarr/Radarr sends about a library item, e.g.
+    # webhook_payload("Download", 101). Event types: Test, Grab, Download,
+    # Rename, SeriesAdd/MovieAdded and SeriesDelete/MovieDelete.
+    def webhook_payload(self, event_type, item_id, **fields):
+        item = self.library[item_id - 1]
+        payload = {
+            "eventType": event_type,
+            "instanceName": self.name.capitalize(),
+            "applicationUrl": "",
+            self.webhook_key: self.webhook_item(item),
+        }
+        payload.update(self.webhook_fields(event_type, item))
+        payload.update(fields)
+        return payload
+
+    def add_routes(self, router):
+        router.add_get(self.list_path, self.list_items)
+        router.add_post(self.list_path, self.add_item)
+        router.add_post(f"{self.list_path}/import", self.import_items)
+        router.add_get("/api/v3/queue", self.queue)
+        router.add_get("/api/v3/wanted/missing", self.missing)
+        router.add_get("/api/v3/qualityprofile", self.quality_profiles)
+        router.add_get("/api/v3/system/status", self.system_status)
+        router.add_post("/api/v3/command", self.command)
+
+    def _create(self, payload):
+        item = dict(payload, id=len(self.library) + 1)
+        self.set_downloaded(item, False)
+        self.library.append(item)
+        self.downloads[item["id"]] = time.monotonic() + self.download_seconds
+        self._library_body = None
+        return item
+
+    # Finish the downloads that are due
+    def _settle(self):
+        now = time.monotonic()
+        for item_id, finished_at in list(self.downloads.items()):
+            if finished_at <= now:
+                del self.downloads[item_id]
+                self.set_downloaded(self.library[item_id - 1], True)
+                self._library_body = None
+
+    # One page of a paged listing, the way Sonarr/Radarr return it
+    @staticmethod
+    def _page(request, records):
+        page = int(request.query.get("page", 1))
+        page_size = int(request.query.get("pageSize", 10))
+        start = (page - 1) * page_size
+        return web.json_response(
+            {
+                "page": page,
+                "pageSize": page_size,
+                "totalRecords": len(records),
+                "records": records[start : start + page_size],
+            }
+        )
+
+    async def list_items(self, request):
+        self._settle()
+        # Serialise the library once and reuse it until it changes
+        if self._library_body is None:
+            self._library_body = json.dumps(self.library).encode()
+        return web.Response(body=self._library_body, content_type="application/json")
+
+    async def add_item(self, request):
+        item = self._create(await request.json())
+        item["addOptions"] = {self.search_option: True}
+        return web.json_response(item, status=201)
+
+    async def import_items(self, request):
+        created = [self._create(payload) for payload in await request.json()]
+        return web.json_response(created, status=201)
+
+    async def queue(self, request):
+        self._settle()
+        records = [
+            {
+                "id": number,
+                self.queue_field: item_id,
+                "status": "downloading",
+                "size": 1_000_000_000,
+                "sizeleft": 500_000_000,
+            }
+            for number, item_id in enumerate(self.downloads, start=1)
+        ]
+        return self._page(request, records)
+
+    async def missing(self, request):
+        self._settle()
+        records = [
+            record
+            for item in self.library
+            if self.is_missing(item)
+            for record in self.missing_records(item)
+        ]
+        return self._page(request, records)
+
+    async def system_status(self, request):
+        return web.json_response(
+            {"appName": self.name.capitalize(), "version": "4.0.0"}
+        )
+
+    async def quality_profiles(self, request):
+        return web.json_response(
+            [{"id": 1, "name": "Any"}, {"id": 4, "name": self.quality_profile}]
+        )
+
+    async def command(self, request):
+        payload = await request.json()
+        self.commands.append(payload)
+        return web.json_response(dict(payload, id=1, status="queued"), status=201)
+
+
+class SonarrStub(ArrStub):
+    name = "sonarr"
+    list_path = "/api/v3/series"
+    id_field = "tvdbId"
+    search_option = "searchForMissingEpisodes"
+    queue_field = "seriesId"
+    webhook_key = "series"
+
+    def add_routes(self, router):
+        super().add_routes(router)
+        router.add_get("/api/v3/series/{item_id}", self.get_series)
+        router.add_put("/api/v3/series/{item_id}", self.update_series)
+        router.add_get("/api/v3/episode", self.episodes)
+
+    def make_item(self, tmdb_id):
+        return {
+            "id": tmdb_id,
+            "title": f"Series {tmdb_id}",
+            "year": 1950 + tmdb_id % 75,
+            "tvdbId": tmdb_id + TVDB_ID_OFFSET,
+            "tmdbId": tmdb_id,
+            "monitored": True,
+            "seasons": [{"seasonNumber": 1, "monitored": True}],
+            "path": f"/tv/Series {tmdb_id}",
+            "overview": "Synthetic series overview. " * 8,
+            "statistics": {"episodeFileCount": 10, "episodeCount": 10},
+        }
+
+    def set_downloaded(self, item, downloaded):
+        item["statistics"] = {
+            "episodeFileCount": 10 if downloaded else 0,
+            "episodeCount": 10,
+        }
+
+    def is_missing(self, item):
+        return (
+            item["statistics"]["episodeFileCount"] < item["statistics"]["episodeCount"]
+        )
+
+    # Two aired episodes, both with or without files
+    def episode_records(self, item):
+        has_file = not self.is_missing(item)
+        return [
+            {
+                "id": item["id"] * 100 + episode,
+                "seriesId": item["id"],
+                "seasonNumber": 1,
+                "episodeNumber": episode,
+                "title": f"Episode {episode}",
+                "airDateUtc": f"2020-01-0{episode}T02:00:00Z",
+                "monitored": True,
+                "hasFile": has_file,
+            }
+            for episode in range(1, 3)
+        ]
+
+    def missing_records(self, item):
+        return self.episode_records(item)
+
+    def _series(self, request):
+        item_id = int(request.match_info["item_id"])
+        if not 1 <= item_id <= len(self.library):
+            raise web.HTTPNotFound()
+        return self.library[item_id - 1]
+
+    async def get_series(self, request):
+        return web.json_response(self._series(request))
+
+    async def update_series(self, request):
+        item = self._series(request)
+        item.update(await request.json())
+        self._library_body = None
+        return web.json_response(item, status=202)
+
+    async def episodes(self, request):
+        self._settle()
+        item_id = int(request.query.get("seriesId", 0))
+        if not 1 <= item_id <= len(self.library):
+            return web.json_response([])
+        return web.json_response(self.episode_records(self.library[item_id - 1]))
+
+    def webhook_item(self, item):
+        return {
+            "id": item["id"],
+            "title": item["title"],
+            "path": item.get("path", f"/tv/{item['title']}"),
+            "tvdbId": item["tvdbId"],
+            "tmdbId": item.get("tmdbId", 0),
+            "type": "standard",
+            "year": item.get("year", 0),
+        }
+
+    def webhook_fields(self, event_type, item):
+        episodes = [
+            {
+                key: record[key]
+                for key in ("id", "episodeNumber", "seasonNumber", "title")
+            }
+            for record in self.episode_records(item)
+        ]
+        if event_type == "Grab":
+            return {
+                "episodes": episodes,
+                "release": {"releaseTitle": f"{item['title']}.S01.1080p"},
+                "downloadClient": "Bench",
+            }
+        if event_type == "Download":
+            return {
+                "episodes": episodes,
+                "episodeFile": {"relativePath": f"Season 01/{item['title']} S01.mkv"},
+                "isUpgrade": False,
+                "downloadClient": "Bench",
+            }
+        if event_type == "Rename":
+            return {"renamedEpisodeFiles": []}
+        if event_type == "SeriesDelete":
+            return {"deletedFiles": False}
+        return {}
+
+
+class RadarrStub(ArrStub):
+    name = "radarr"
+    list_path = "/api/v3/movie"
+    id_field = "tmdbId"
+    search_option = "searchForMovie"
+    queue_field = "movieId"
+    webhook_key = "movie"
+
+    def make_item(self, tmdb_id):
+        return {
+            "id": tmdb_id,
+            "title": f"Movie {tmdb_id}",
+            "year": 1950 + tmdb_id % 75,
+            "tmdbId": tmdb_id,
+            "monitored": True,
+            "hasFile": tmdb_id % 3 != 0,
+            "path": f"/movies/Movie {tmdb_id}",
+            "overview": "Synthetic movie overview. " * 8,
+        }
+
+    def set_downloaded(self, item, downloaded):
+        item["hasFile"] = downloaded
+
+    def is_missing(self, item):
+        return item.get("monitored") and not item["hasFile"]
+
+    def missing_records(self, item):
+        return [
+            {
+                "id": item["id"],
+                "title": item["title"],
+                "tmdbId": item["tmdbId"],
+                "monitored": True,
+                "hasFile": False,
+            }
+        ]
+
+    def webhook_item(self, item):
+        return {
+            "id": item["id"],
+            "title": item["title"],
+            "year": item.get("year", 0),
+            "folderPath": item.get("path", f"/movies/{item['title']}"),
+            "tmdbId": item["tmdbId"],
+        }
+
+    def webhook_fields(self, event_type, item):
+        remote = {"tmdbId": item["tmdbId"], "title": item["title"]}
+        if event_type == "Grab":
+            return {
+                "remoteMovie": remote,
+                "release": {"releaseTitle": f"{item['title']}.1080p"},
+                "downloadClient": "Bench",
+            }
+        if event_type == "Download":
+            return {
+                "remoteMovie": remote,
+                "movieFile": {"relativePath": f"{item['title']}.mkv"},
+                "isUpgrade": False,
+                "downloadClient": "Bench",
+            }
+        if event_type == "Rename":
+            return {"renamedMovieFiles": []}
+        if event_type == "MovieDelete":
+            return {"deletedFiles": False}
+        return {}
+
+
+# Runs a set of stubs on localhost in a background thread with its own event loop.
+# A separate loop keeps the stubs responsive while the bot blocks its own loop
+# (e.g. the synchronous quality profile lookups).
+class StubCluster:
+    def __init__(self, *stubs):
+        self.stubs = {stub.name: stub for stub in stubs}
+        self.urls = {}
+        self._runners = []
+        self._loop = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    def __getitem__(self, name):
+        return self.stubs[name]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self.urls
+
+    def stop(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._stop_all(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop = None
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self._start_all())
+        self._ready.set()
+        self._loop.run_forever()
+        self._loop.close()
+
+    async def _start_all(self):
+        for name, stub in self.stubs.items():
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.bind(("127.0.0.1", 0))
+            runner = web.AppRunner(stub.app, access_log=None)
+            await runner.setup()
+            await web.SockSite(runner, sock).start()
+            self._runners.append(runner)
+            self.urls[name] = f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+    async def _stop_all(self):
+        for runner in self._runners:
+            await runner.cleanup()
+
+    # Snapshot of all call counters, keyed by "service METHOD route"
+    def call_counts(self):
+        counts = Counter()
+        for name, stub in self.stubs.items():
+            for key, value in list(stub.calls.items()):
+                counts[f"{name} {key}"] = value
+        return counts
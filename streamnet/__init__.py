@@ -0,0 +1 @@
+# StreamNet TV Telegram bot
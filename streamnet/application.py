@@ -0,0 +1,270 @@
+import importlib
+import logging
+import re
+import sys
+
+from apscheduler.triggers.interval import IntervalTrigger
+from telegram.ext import (
+    ApplicationBuilder,
+    CallbackQueryHandler,
+    CommandHandler,
+    MessageHandler,
+    filters,
+)
+
+from streamnet import leader
+from streamnet.config import get_config
+from streamnet.tracing import TracingApplication, TracingRequest, configure_tracing
+
+logger = logging.getLogger("bot")
+
+
+# Wrap a handler or job callback so its module (and with it TMDB, Sonarr/Radarr
+# or night mode) is only imported when the callback runs for the first time
+def lazy_callback(module_name, name):
+    target = None
+
+    async def callback(*args, **kwargs):
+        nonlocal target
+        if target is None:
+            target = getattr(importlib.import_module(module_name), name)
+        return await target(*args, **kwargs)
+
+    callback.__name__ = callback.__qualname__ = name
+    return callback
+
+
+# Bulk lists can also be sent as a .txt file with the command as caption
+def bulk_caption_filter(command):
+    return filters.Document.TXT & filters.CaptionRegex(
+        rf"^/{re.escape(command)}(@\w+)?(\s|$)"
+    )
+
+
+# Start background subsystems once the application is initialised. With
+# worker processes this runs in the front process only, once for all of them.
+async def start_subsystems(application):
+    config = get_config()
+    if config.watchdog.enabled:
+        importlib.import_module("streamnet.watchdog").start_watchdog(
+            config.watchdog.lag_threshold_ms
+        )
+    importlib.import_module("streamnet.ledger").init_ledger()
+    if config.downloads.enabled or config.webhooks.enabled:
+        importlib.import_module("streamnet.downloads").init_downloads()
+    if config.details_cache.enabled:
+        importlib.import_module("streamnet.detailscache").init_details_cache(
+            config.details_cache.hard_ttl_hours * 3600
+        )
+    if config.library.enabled:
+        importlib.import_module("streamnet.library").init_library_index()
+    if config.catalogue.enabled:
+        importlib.import_module("streamnet.catalogue").init_catalogue()
+    if config.quota.enabled:
+        quota = importlib.import_module("streamnet.quota")
+        quota.init_quota()
+        quota.load_buckets()
+    await leader.start_election(application)
+    await importlib.import_module("streamnet.jobqueue").start_workers(application)
+    if config.health.enabled:
+        await importlib.import_module("streamnet.health").start_health_server(
+            config.health.host, config.health.port
+        )
+    if config.webhooks.enabled:
+        await importlib.import_module("streamnet.webhooks").start_webhook_server(
+            application, config.webhooks.host, config.webhooks.port
+        )
+
+
+# Release resources of subsystems that were loaded while the bot was running
+async def shutdown_subsystems(application):
+    if "streamnet.jobqueue" in sys.modules:
+        await sys.modules["streamnet.jobqueue"].stop_workers()
+    await leader.stop_election()
+    if "streamnet.quota" in sys.modules and get_config().quota.enabled:
+        sys.modules["streamnet.quota"].save_buckets()
+    if "streamnet.health" in sys.modules:
+        await sys.modules["streamnet.health"].stop_health_server()
+    if "streamnet.webhooks" in sys.modules:
+        await sys.modules["streamnet.webhooks"].stop_webhook_server()
+    if "streamnet.httpclient" in sys.modules:
+        await sys.modules["streamnet.httpclient"].close_session()
+    if "streamnet.watchdog" in sys.modules:
+        await sys.modules["streamnet.watchdog"].stop_watchdog()
+
+
+# Start what the handlers of a worker process need. The database tables, job
+# queue, scheduled jobs, health and webhook servers and the watchdog are run
+# by the front process.
+async def start_worker_subsystems(application):
+    config = get_config()
+    if config.library.enabled:
+        importlib.import_module("streamnet.library").init_library_index()
+    if config.catalogue.enabled:
+        importlib.import_module("streamnet.catalogue").init_catalogue()
+    if config.quota.enabled:
+        importlib.import_module("streamnet.quota").load_buckets()
+
+
+async def shutdown_worker_subsystems(application):
+    if "streamnet.quota" in sys.modules and get_config().quota.enabled:
+        sys.modules["streamnet.quota"].save_buckets()
+    if "streamnet.httpclient" in sys.modules:
+        await sys.modules["streamnet.httpclient"].close_session()
+
+
+# Build the application and register all handlers and jobs. A worker process
+# (`worker=True`) only gets the handlers and the jobs every process needs.
+def build_application(builder=None, worker=False):
+    config = get_config()
+    if builder is None:
+        builder = ApplicationBuilder().token(config.bot.token)
+    if worker:
+        builder = builder.post_init(start_worker_subsystems).post_shutdown(
+            shutdown_worker_subsystems
+        )
+    else:
+        builder = builder.post_init(start_subsystems).post_shutdown(shutdown_subsystems)
+
+    # Configure per-update tracing (only swaps in the tracing classes when enabled)
+    tracing = config.tracing
+    configure_tracing(
+        tracing.enabled, tracing.slow_update_threshold_ms, tracing.log_all
+    )
+    if tracing.enabled:
+        logger.info(
+            f"TRACING enabled, logging updates slower than {tracing.slow_update_threshold_ms} ms"
+        )
+        builder = builder.application_class(TracingApplication).request(
+            TracingRequest(connection_pool_size=256)
+        )
+    application = builder.build()
+
+    commands = config.commands
+    start = lazy_callback("streamnet.commands", "start")
+    help = lazy_callback("streamnet.commands", "help")
+    welcome_new_members = lazy_callback("streamnet.commands", "welcome_new_members")
+    set_group_id = lazy_callback("streamnet.commands", "set_group_id")
+    set_language = lazy_callback("streamnet.commands", "set_language")
+    enable_night_mode = lazy_callback("streamnet.nightmode", "enable_night_mode")
+    disable_night_mode = lazy_callback("streamnet.nightmode", "disable_night_mode")
+    # Scheduled jobs only run on the instance holding the scheduler lease
+    night_mode_checker = leader.leader_only(
+        lazy_callback("streamnet.nightmode", "night_mode_checker")
+    )
+    refresh_library = leader.leader_only(
+        lazy_callback("streamnet.library", "refresh_library")
+    )
+    refresh_catalogue = leader.leader_only(
+        lazy_callback("streamnet.catalogue", "refresh_catalogue")
+    )
+    check_downloads = leader.leader_only(
+        lazy_callback("streamnet.downloads", "check_downloads")
+    )
+    search_media = lazy_callback("streamnet.media", "search_media")
+    handle_add_media_callback = lazy_callback(
+        "streamnet.media", "handle_add_media_callback"
+    )
+    bulk_request = lazy_callback("streamnet.bulk", "bulk_request")
+    handle_text_message = lazy_callback("streamnet.messages", "handle_text_message")
+    upstream_status = lazy_callback("streamnet.commands", "upstream_status")
+    list_requests = lazy_callback("streamnet.commands", "list_requests")
+    profile = lazy_callback("streamnet.commands", "profile")
+    handle_error = lazy_callback("streamnet.errors", "handle_error")
+
+    # Register the command handlers
+    application.add_handler(CommandHandler(commands.start, start))
+    application.add_handler(CommandHandler(commands.help, help))
+    application.add_handler(CommandHandler(commands.welcome, welcome_new_members))
+    application.add_handler(CommandHandler(commands.set_group_id, set_group_id))
+    application.add_handler(CommandHandler(commands.tmdb_language, set_language))
+    application.add_handler(
+        CommandHandler(commands.night_mode_enable, enable_night_mode)
+    )
+    application.add_handler(
+        CommandHandler(commands.night_mode_disable, disable_night_mode)
+    )
+    application.add_handler(CommandHandler(commands.search, search_media))
+    application.add_handler(CommandHandler(commands.bulk, bulk_request))
+    application.add_handler(CommandHandler(commands.status, upstream_status))
+    application.add_handler(CommandHandler(commands.requests, list_requests))
+    application.add_handler(CommandHandler(commands.profile, profile))
+    application.add_handler(
+        MessageHandler(bulk_caption_filter(commands.bulk), bulk_request)
+    )
+
+    # Register callback query handlers for buttons
+    application.add_handler(CallbackQueryHandler(handle_add_media_callback))
+
+    # Register the message handler for new members
+    application.add_handler(
+        MessageHandler(filters.StatusUpdate.NEW_CHAT_MEMBERS, welcome_new_members)
+    )
+
+    # Register the message handler for general messages
+    application.add_handler(
+        MessageHandler(filters.TEXT & ~filters.COMMAND, handle_text_message)
+    )
+
+    application.add_error_handler(handle_error)
+
+    # APScheduler resolves trigger names through pkg_resources entry points, which
+    # costs ~200 ms at startup. Registering the trigger class up front skips that.
+    application.job_queue.scheduler._trigger_classes.setdefault(
+        "interval", IntervalTrigger
+    )
+
+    # Pick up changes to config.json while the bot is running (every process
+    # has its own copy of the config)
+    application.job_queue.run_repeating(
+        lazy_callback("streamnet.configwatch", "watch_config"),
+        interval=importlib.import_module("streamnet.configwatch").WATCH_SECONDS,
+        first=0,
+    )
+
+    # Persist the search/request quotas now and then
+    if config.quota.enabled:
+        application.job_queue.run_repeating(
+            lazy_callback("streamnet.quota", "save_quota"),
+            interval=config.quota.persist_seconds,
+            first=config.quota.persist_seconds,
+        )
+
+    if worker:
+        return application
+
+    # Start the night mode checker task with max_instances set to 1
+    application.job_queue.run_repeating(night_mode_checker, interval=300, first=0)
+
+    # Keep the local index of the Sonarr/Radarr library up to date
+    if config.library.enabled:
+        application.job_queue.run_repeating(
+            refresh_library, interval=config.library.refresh_minutes * 60, first=5
+        )
+
+    # Ingest new TMDB id exports into the local catalogue
+    if config.catalogue.enabled:
+        application.job_queue.run_repeating(
+            refresh_catalogue, interval=config.catalogue.refresh_hours * 3600, first=30
+        )
+
+    # Tell requesters when the titles they requested have been downloaded
+    if config.downloads.enabled:
+        application.job_queue.run_repeating(
+            check_downloads,
+            interval=config.downloads.min_poll_seconds,
+            first=config.downloads.min_poll_seconds,
+        )
+
+    # Check Telegram, TMDB and Sonarr/Radarr once the bot has started polling
+    application.job_queue.run_once(lazy_callback("streamnet.health", "preflight"), 0)
+
+    # Keep the readiness endpoint up to date
+    if config.health.enabled:
+        application.job_queue.run_repeating(
+            lazy_callback("streamnet.health", "check_health"),
+            interval=config.health.interval_seconds,
+            first=config.health.interval_seconds,
+        )
+
+    return application
@@ -0,0 +1,323 @@
+import logging
+
+import aiohttp
+
+from streamnet.config import get_config
+from streamnet.httpclient import ServiceUnavailable, request
+from streamnet.jsonstream import iter_array
+from streamnet.tracing import trace_span
+
+logger = logging.getLogger("bot")
+
+# Fields of a Sonarr series or Radarr movie the bot uses. The listings are
+# parsed while they are downloaded and everything else is dropped right away,
+# so a large library never sits in memory as a whole.
+LIBRARY_FIELDS = (
+    "id",
+    "title",
+    "originalTitle",
+    "alternateTitles",
+    "year",
+    "tmdbId",
+    "tvdbId",
+    "hasFile",
+)
+
+# Records per request when reading the paged listings (queue, wanted/missing)
+PAGE_SIZE = 500
+
+# Quality profile IDs resolved so far, keyed by (url, profile name)
+_quality_profile_ids = {}
+
+
+# Function to find a series in Sonarr by its TVDB id. Returns its id, title
+# and seasons (with whether they are monitored), or None.
+async def find_series_in_sonarr(series_tvdb_id):
+    sonarr = get_config().sonarr
+    try:
+        async with trace_span("sonarr.series_list"):
+            async with request(
+                "sonarr",
+                "GET",
+                f"{sonarr.url}/api/v3/series",
+                params={"apikey": sonarr.api_key},
+            ) as response:
+                response.raise_for_status()
+                async for series in iter_array(
+                    response.content, ("id", "title", "tvdbId", "seasons")
+                ):
+                    if series.get("tvdbId") == series_tvdb_id:
+                        logger.info(
+                            f"Series '{series.get('title')}' already exists in Sonarr (TVDB ID: {series_tvdb_id})"
+                        )
+                        return series
+        return None
+
+    except ServiceUnavailable:
+        raise
+    except aiohttp.ClientError as http_err:
+        logger.error(f"HTTP error while checking Sonarr: {http_err}")
+        return None
+    except Exception as e:
+        logger.error(f"Unexpected error while checking Sonarr: {e}")
+        return None
+
+
+# Function to check if the movie is already in Radarr
+async def check_movie_in_radarr(movie_tmdb_id):
+    radarr = get_config().radarr
+    try:
+        async with trace_span("radarr.movie_list"):
+            async with request(
+                "radarr",
+                "GET",
+                f"{radarr.url}/api/v3/movie",
+                params={"apikey": radarr.api_key},
+            ) as response:
+                response.raise_for_status()
+                async for movie in iter_array(response.content, ("title", "tmdbId")):
+                    if movie.get("tmdbId") == movie_tmdb_id:
+                        logger.info(
+                            f"Movie '{movie.get('title')}' already exists in Radarr."
+                        )
+                        return True
+        return False
+
+    except ServiceUnavailable:
+        raise
+    except aiohttp.ClientError as http_err:
+        logger.error(f"HTTP error while checking Radarr: {http_err}")
+        return False
+    except Exception as e:
+        logger.error(f"Unexpected error while checking Radarr: {e}")
+        return False
+
+
+# Series in Sonarr ("sonarr") or movies in Radarr ("radarr") one at a time,
+# reduced to `fields`
+async def iter_library(service, fields=LIBRARY_FIELDS):
+    arr = getattr(get_config(), service)
+    path = "series" if service == "sonarr" else "movie"
+    async with trace_span(f"{service}.{path}_list"):
+        async with request(
+            service,
+            "GET",
+            f"{arr.url}/api/v3/{path}",
+            params={"apikey": arr.api_key},
+        ) as response:
+            response.raise_for_status()
+            async for item in iter_array(response.content, fields):
+                yield item
+
+
+# All series in Sonarr ("sonarr") or all movies in Radarr ("radarr")
+async def get_library(service):
+    return [item async for item in iter_library(service)]
+
+
+# TVDB IDs of all series in Sonarr (one request for the whole library)
+async def get_series_tvdb_ids():
+    return {
+        series["tvdbId"]
+        async for series in iter_library("sonarr", ("tvdbId",))
+        if "tvdbId" in series
+    }
+
+
+# TMDB IDs of all movies in Radarr (one request for the whole library)
+async def get_movie_tmdb_ids():
+    return {
+        movie["tmdbId"]
+        async for movie in iter_library("radarr", ("tmdbId",))
+        if "tmdbId" in movie
+    }
+
+
+# Ids in `id_field` of all records of a paged Sonarr/Radarr listing, e.g.
+# "queue", read PAGE_SIZE records at a time. The number of requests depends on
+# the length of the listing, not on how many of its titles the caller wants.
+async def get_paged_ids(service, path, id_field, **params):
+    arr = getattr(get_config(), service)
+    ids = set()
+    page = 1
+    async with trace_span(f"{service}.{path.replace('/', '_')}"):
+        while True:
+            async with request(
+                service,
+                "GET",
+                f"{arr.url}/api/v3/{path}",
+                params={
+                    "apikey": arr.api_key,
+                    "page": page,
+                    "pageSize": PAGE_SIZE,
+                    **params,
+                },
+            ) as response:
+                response.raise_for_status()
+                listing = await response.json()
+            records = listing.get("records") or []
+            ids.update(record[id_field] for record in records if id_field in record)
+            if not records or page * PAGE_SIZE >= listing.get("totalRecords", 0):
+                return ids
+            page += 1
+
+
+# Ids of the Sonarr series / Radarr movies with a download in the queue
+async def get_queue_ids(service):
+    id_field = "seriesId" if service == "sonarr" else "movieId"
+    return await get_paged_ids(service, "queue", id_field)
+
+
+# Ids of the Sonarr series with missing monitored episodes / the monitored
+# Radarr movies without a file
+async def get_missing_ids(service):
+    id_field = "seriesId" if service == "sonarr" else "id"
+    return await get_paged_ids(service, "wanted/missing", id_field, monitored="true")
+
+
+# All episodes of a Sonarr series
+async def get_episodes(series_id):
+    sonarr = get_config().sonarr
+    async with trace_span("sonarr.episodes"):
+        async with request(
+            "sonarr",
+            "GET",
+            f"{sonarr.url}/api/v3/episode",
+            params={"apikey": sonarr.api_key, "seriesId": series_id},
+        ) as response:
+            response.raise_for_status()
+            return await response.json()
+
+
+# Function to get quality profile ID by name from Sonarr or Radarr.
+# The ID is resolved on first use and cached afterwards.
+async def get_quality_profile_id(arr_url, api_key, profile_name, service="Sonarr"):
+    cache_key = (arr_url, profile_name)
+    if cache_key in _quality_profile_ids:
+        return _quality_profile_ids[cache_key]
+
+    try:
+        async with trace_span(f"{service.lower()}.qualityprofile"):
+            async with request(
+                service.lower(),
+                "GET",
+                f"{arr_url}/api/v3/qualityprofile",
+                params={"apikey": api_key},
+            ) as response:
+                response.raise_for_status()
+                profiles = await response.json()
+
+        for profile in profiles:
+            if profile["name"] == profile_name:
+                _quality_profile_ids[cache_key] = profile["id"]
+                return profile["id"]
+
+        logger.warning(f"Quality profile '{profile_name}' not found in {service}.")
+        return None
+
+    except ServiceUnavailable:
+        raise
+    except aiohttp.ClientError as http_err:
+        logger.error(f"HTTP error occurred while fetching quality profiles: {http_err}")
+        return None
+    except Exception as e:
+        logger.error(f"An unexpected error occurred: {e}")
+        return None
+
+
+# Forget resolved quality profile IDs so they are looked up again
+def clear_quality_profile_cache():
+    _quality_profile_ids.clear()
+
+
+# Add a series to Sonarr, returns the response status and the created series
+async def post_series(data):
+    sonarr = get_config().sonarr
+    async with trace_span("sonarr.add_series"):
+        async with request(
+            "sonarr",
+            "POST",
+            f"{sonarr.url}/api/v3/series",
+            json=data,
+            params={"apikey": sonarr.api_key},
+        ) as response:
+            if response.status == 201:
+                return response.status, await response.json()
+            return response.status, None
+
+
+# A Sonarr series with all its fields, as needed to update it
+async def get_series(series_id):
+    sonarr = get_config().sonarr
+    async with trace_span("sonarr.series"):
+        async with request(
+            "sonarr",
+            "GET",
+            f"{sonarr.url}/api/v3/series/{series_id}",
+            params={"apikey": sonarr.api_key},
+        ) as response:
+            response.raise_for_status()
+            return await response.json()
+
+
+# Update a Sonarr series (e.g. which seasons are monitored), returns the
+# response status
+async def put_series(series):
+    sonarr = get_config().sonarr
+    async with trace_span("sonarr.update_series"):
+        async with request(
+            "sonarr",
+            "PUT",
+            f"{sonarr.url}/api/v3/series/{series['id']}",
+            json=series,
+            params={"apikey": sonarr.api_key},
+        ) as response:
+            return response.status
+
+
+# Add a movie to Radarr, returns the response status and the created movie
+async def post_movie(data):
+    radarr = get_config().radarr
+    async with trace_span("radarr.add_movie"):
+        async with request(
+            "radarr",
+            "POST",
+            f"{radarr.url}/api/v3/movie",
+            json=data,
+            params={"apikey": radarr.api_key},
+        ) as response:
+            if response.status == 201:
+                return response.status, await response.json()
+            return response.status, None
+
+
+# Add several series ("sonarr") or movies ("radarr") with a single request to
+# the bulk import endpoint. Returns the response status and the created items.
+async def post_import(service, items):
+    arr = getattr(get_config(), service)
+    path = "series" if service == "sonarr" else "movie"
+    async with trace_span(f"{service}.import", count=len(items)):
+        async with request(
+            service,
+            "POST",
+            f"{arr.url}/api/v3/{path}/import",
+            json=items,
+            params={"apikey": arr.api_key},
+        ) as response:
+            if response.status in (200, 201, 202):
+                return response.status, await response.json()
+            return response.status, None
+
+
+# Start a command (e.g. a manual search) in Sonarr ("sonarr") or Radarr ("radarr")
+async def post_command(service, data):
+    arr = getattr(get_config(), service)
+    async with trace_span(f"{service}.command"):
+        async with request(
+            service,
+            "POST",
+            f"{arr.url}/api/v3/command",
+            json=data,
+            params={"apikey": arr.api_key},
+        ) as response:
+            return response.status
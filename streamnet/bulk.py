@@ -0,0 +1,476 @@
+import asyncio
+import logging
+import re
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import telegram.error
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from streamnet import arr, ledger, tmdb
+from streamnet.config import get_config
+from streamnet.httpclient import ServiceUnavailable, service_unavailable_text
+from streamnet.utils import admin_required
+
+logger = logging.getLogger("bot")
+
+# TMDB lookups running at the same time
+BULK_CONCURRENCY = 5
+# Titles sent to Sonarr/Radarr per import request
+BULK_BATCH_SIZE = 25
+# Upper limits for one bulk request
+BULK_MAX_ENTRIES = 200
+BULK_MAX_FILE_SIZE = 256 * 1024
+# Minimum seconds between two edits of the progress message
+PROGRESS_INTERVAL = 2.0
+
+# "tmdb:tv:1399", "tmdb:movie:603" or "tmdb:603" (a movie). Ids always need the
+# "tmdb:" prefix, so "movie: 1917" or "tv: 24" stay titles.
+_ID_LINE = re.compile(r"^tmdb\s*:\s*(?:(movie|tv)\s*:\s*)?(\d+)$", re.IGNORECASE)
+# Optional "movie:"/"tv:" prefix in front of a title
+_TYPE_PREFIX = re.compile(r"^(movie|tv)\s*:\s*", re.IGNORECASE)
+# Release year in parentheses at the end of a title
+_YEAR = re.compile(r"\s*\((\d{4})\)?\s*$")
+
+BULK_USAGE = (
+    "Bitte gib eine Liste mit einem Titel pro Zeile an, z.B.:\n\n"
+    "/bulk\n"
+    "Inception (2010)\n"
+    "tv: Breaking Bad\n"
+    "tmdb:movie:603\n\n"
+    "TMDB-IDs brauchen das Präfix tmdb:movie: oder tmdb:tv:.\n"
+    "Du kannst auch eine .txt Datei mit der Liste senden (Beschriftung /bulk)."
+)
+
+
+# One line of a bulk request
+@dataclass(frozen=True)
+class BulkEntry:
+    line: str
+    title: Optional[str] = None
+    year: Optional[int] = None
+    tmdb_id: Optional[int] = None
+    media_type: Optional[str] = None  # "movie", "tv" or None for either
+
+
+# A title resolved on TMDB
+@dataclass(frozen=True)
+class ResolvedMedia:
+    entry: BulkEntry
+    media_type: str
+    tmdb_id: int
+    title: str
+    year: Optional[int] = None
+    tvdb_id: Optional[int] = None
+
+
+# Parse one line; returns None for blank lines and "#" comments
+def parse_bulk_line(line):
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+
+    match = _ID_LINE.match(line)
+    if match:
+        media_type = (match.group(1) or "movie").lower()
+        return BulkEntry(line=line, tmdb_id=int(match.group(2)), media_type=media_type)
+
+    media_type = None
+    match = _TYPE_PREFIX.match(line)
+    if match:
+        media_type = match.group(1).lower()
+        line_title = line[match.end() :]
+    else:
+        line_title = line
+
+    year = None
+    match = _YEAR.search(line_title)
+    if match:
+        year = int(match.group(1))
+        line_title = line_title[: match.start()]
+
+    title = line_title.strip()
+    if not title:
+        return None
+    return BulkEntry(line=line, title=title, year=year, media_type=media_type)
+
+
+# Parse a whole list, dropping repeated lines
+def parse_bulk_list(text):
+    entries = []
+    seen = set()
+    for line in text.splitlines():
+        entry = parse_bulk_line(line)
+        if entry is None:
+            continue
+        key = (entry.media_type, entry.tmdb_id, (entry.title or "").lower(), entry.year)
+        if key in seen:
+            continue
+        seen.add(key)
+        entries.append(entry)
+    return entries
+
+
+def _release_year(media):
+    date = media.get("release_date") or media.get("first_air_date") or ""
+    return int(date[:4]) if date[:4].isdigit() else None
+
+
+def _media_title(media, media_type):
+    return media.get("title") if media_type == "movie" else media.get("name")
+
+
+# Pick the best search result: the first one matching the year (if given)
+def _pick_result(results, entry):
+    for media in results:
+        media_type = entry.media_type or media.get("media_type")
+        if media_type not in ("movie", "tv"):
+            continue
+        if entry.year and _release_year(media) != entry.year:
+            continue
+        return media_type, media
+    return None, None
+
+
+# Look a bulk entry up on TMDB. Returns None if it cannot be resolved.
+async def resolve_entry(entry):
+    if entry.tmdb_id:
+        media_type = entry.media_type
+        media = await tmdb.fetch_media_details(media_type, entry.tmdb_id)
+        if not media.get("id"):
+            return None
+    else:
+        if entry.media_type:
+            data = await tmdb.search_title(entry.media_type, entry.title, entry.year)
+        else:
+            data = await tmdb.search_multi(entry.title)
+        media_type, media = _pick_result(data.get("results") or [], entry)
+        if media is None:
+            return None
+
+    tvdb_id = None
+    if media_type == "tv":
+        try:
+            tvdb_id = (await tmdb.fetch_external_ids(media["id"])).get("tvdb_id")
+        except Exception as e:
+            logger.error(f"Error fetching external IDs for '{entry.line}': {e}")
+        if not tvdb_id:
+            return None
+
+    return ResolvedMedia(
+        entry=entry,
+        media_type=media_type,
+        tmdb_id=media["id"],
+        title=_media_title(media, media_type) or entry.title or entry.line,
+        year=_release_year(media),
+        tvdb_id=tvdb_id,
+    )
+
+
+# Keeps a single status message up to date while a bulk request runs
+class BulkProgress:
+    def __init__(self, message, total):
+        self.message = message
+        self.total = total
+        self.resolved = 0
+        self.not_found = []
+        self.existing = 0
+        self.duplicates = 0
+        self.added = 0
+        self.failed = []
+        self.phase = "🔍 Titel werden gesucht"
+        self._last_edit = 0.0
+        self._last_text = None
+
+    def text(self, done=False):
+        lines = [
+            "✅ Bulk-Anfrage abgeschlossen" if done else f"{self.phase}...",
+            "",
+            f"Gesucht: {self.resolved}/{self.total}",
+            f"Hinzugefügt: {self.added}",
+            f"Bereits vorhanden: {self.existing}",
+        ]
+        if self.duplicates:
+            lines.append(f"Doppelt in der Liste: {self.duplicates}")
+        if self.not_found:
+            lines.append(f"Nicht gefunden: {len(self.not_found)}")
+        if self.failed:
+            lines.append(f"Fehlgeschlagen: {len(self.failed)}")
+        if done:
+            for label, items in (
+                ("Nicht gefunden", self.not_found),
+                ("Fehlgeschlagen", self.failed),
+            ):
+                if items:
+                    shown = ", ".join(items[:20])
+                    more = f" (+{len(items) - 20})" if len(items) > 20 else ""
+                    lines += ["", f"{label}: {shown}{more}"]
+        return "\n".join(lines)
+
+    # Edit the status message, at most every PROGRESS_INTERVAL seconds unless forced
+    async def update(self, force=False, done=False):
+        now = time.monotonic()
+        if not force and now - self._last_edit < PROGRESS_INTERVAL:
+            return
+        text = self.text(done)
+        if text == self._last_text:
+            return
+        self._last_edit = now
+        self._last_text = text
+        try:
+            await self.message.edit_text(text[:4096])
+        except telegram.error.BadRequest as e:
+            logger.warning(f"Failed to update bulk progress message: {e}")
+
+
+# Resolve all entries on TMDB with bounded concurrency
+async def resolve_entries(entries, progress):
+    semaphore = asyncio.Semaphore(BULK_CONCURRENCY)
+
+    async def resolve(entry):
+        async with semaphore:
+            try:
+                return entry, await resolve_entry(entry)
+            except Exception as e:
+                logger.error(f"Failed to resolve bulk entry '{entry.line}': {e}")
+                return entry, None
+
+    resolved = []
+    for task in asyncio.as_completed([resolve(entry) for entry in entries]):
+        entry, media = await task
+        progress.resolved += 1
+        if media is None:
+            progress.not_found.append(entry.line)
+        else:
+            resolved.append(media)
+        await progress.update()
+    return resolved
+
+
+def _series_payload(media, quality_profile_id, sonarr):
+    return {
+        "title": media.title,
+        "qualityProfileId": quality_profile_id,
+        "rootFolderPath": sonarr.root_folder_path,
+        "seasonFolder": True,
+        "tvdbId": media.tvdb_id,
+        "monitored": True,
+        "addOptions": {"searchForMissingEpisodes": True},
+    }
+
+
+def _movie_payload(media, quality_profile_id, radarr):
+    return {
+        "title": media.title,
+        "year": media.year,
+        "qualityProfileId": quality_profile_id,
+        "rootFolderPath": radarr.root_folder_path,
+        "tmdbId": media.tmdb_id,
+        "monitored": True,
+        "addOptions": {"searchForMovie": True},
+    }
+
+
+def _record_added(media, requester):
+    ledger.record_request(
+        media.media_type,
+        media.tmdb_id,
+        media.title,
+        requester.id,
+        requester.username,
+        None,
+        tvdb_id=media.tvdb_id,
+        status=ledger.ADDED,
+    )
+
+
+# Add resolved titles to Sonarr ("sonarr") or Radarr ("radarr") in batches. Uses
+# the bulk import endpoint and falls back to one request per title if it fails.
+# Added titles are recorded in the request ledger for the requester (a user).
+async def add_in_batches(service, items, progress, requester):
+    if not items:
+        return
+    arr_config = getattr(get_config(), service)
+    quality_profile_id = await arr.get_quality_profile_id(
+        arr_config.url,
+        arr_config.api_key,
+        arr_config.quality_profile_name,
+        service.capitalize(),
+    )
+    if quality_profile_id is None:
+        logger.error(f"Quality profile not found in {service.capitalize()}.")
+        progress.failed += [media.title for media in items]
+        return
+
+    if service == "sonarr":
+        make_payload, post_single = _series_payload, arr.post_series
+    else:
+        make_payload, post_single = _movie_payload, arr.post_movie
+
+    for start in range(0, len(items), BULK_BATCH_SIZE):
+        batch = items[start : start + BULK_BATCH_SIZE]
+        payloads = [
+            make_payload(media, quality_profile_id, arr_config) for media in batch
+        ]
+        status, created = await arr.post_import(service, payloads)
+        if created is not None:
+            progress.added += len(batch)
+            for media in batch:
+                _record_added(media, requester)
+            logger.info(f"Bulk imported {len(batch)} titles into {service}.")
+        else:
+            logger.warning(
+                f"Bulk import into {service} failed (status {status}), adding titles one by one."
+            )
+            for media, payload in zip(batch, payloads):
+                status, _ = await post_single(payload)
+                if status == 201:
+                    progress.added += 1
+                    _record_added(media, requester)
+                else:
+                    logger.error(
+                        f"Failed to add '{media.title}' to {service}. Status code: {status}"
+                    )
+                    progress.failed.append(media.title)
+        await progress.update()
+
+
+def _service_for(media_type):
+    return "sonarr" if media_type == "tv" else "radarr"
+
+
+# Start reading the library of a service (the TVDB ids of all series in
+# Sonarr, the TMDB ids of all movies in Radarr) unless it is being read
+# already. Services without a URL are not configured and left out.
+def _read_library(tasks, service):
+    if service in tasks or not getattr(get_config(), service).url:
+        return
+    if service == "sonarr":
+        tasks[service] = asyncio.ensure_future(arr.get_series_tvdb_ids())
+    else:
+        tasks[service] = asyncio.ensure_future(arr.get_movie_tmdb_ids())
+
+
+# Libraries of the given services by service. Services that are not
+# configured or could not be read are missing, so only their titles fail.
+async def _libraries(tasks, services):
+    libraries = {}
+    for service in services:
+        _read_library(tasks, service)
+        if service not in tasks:
+            logger.warning(f"Bulk request skips {service}: no URL configured.")
+            continue
+        try:
+            libraries[service] = await tasks[service]
+        except Exception as e:
+            logger.warning(f"Bulk request skips {service}, library not read: {e}")
+    return libraries
+
+
+def _in_flight(media):
+    request = ledger.find_request(media.media_type, media.tmdb_id)
+    return request is not None and request["status"] == ledger.REQUESTED
+
+
+# Read the list from the message text, an attached .txt file or a replied-to file
+async def _read_bulk_text(update, context):
+    message = update.message
+    document = message.document or (
+        message.reply_to_message.document if message.reply_to_message else None
+    )
+    if document is not None:
+        if document.file_size and document.file_size > BULK_MAX_FILE_SIZE:
+            return None
+        file = await context.bot.get_file(document.file_id)
+        data = await file.download_as_bytearray()
+        return bytes(data).decode("utf-8", errors="replace")
+
+    # Everything after the command itself, keeping the line breaks
+    parts = (message.text or "").split(maxsplit=1)
+    return parts[1] if len(parts) > 1 else ""
+
+
+# Bulk request command: resolve a list of titles and add them to Sonarr/Radarr
+@admin_required
+async def bulk_request(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    text = await _read_bulk_text(update, context)
+    if text is None:
+        await update.message.reply_text("🛑 Die Datei ist zu groß.")
+        return
+    entries = parse_bulk_list(text)
+    if not entries:
+        await update.message.reply_text(BULK_USAGE)
+        return
+    if len(entries) > BULK_MAX_ENTRIES:
+        await update.message.reply_text(
+            f"🛑 Zu viele Titel ({len(entries)}). Maximal {BULK_MAX_ENTRIES} pro Anfrage."
+        )
+        return
+
+    logger.info(
+        f"Bulk request with {len(entries)} titles by USER '{update.effective_user.username}' (ID: '{update.effective_user.id}')"
+    )
+    status_message = await update.message.reply_text(
+        f"🔍 Titel werden gesucht... (0/{len(entries)})"
+    )
+    progress = BulkProgress(status_message, len(entries))
+
+    library_tasks = {}
+    try:
+        # Each library is fetched once for the whole list, alongside the TMDB
+        # lookups for lines with a type; lines without one can be either
+        for entry in entries:
+            if entry.media_type:
+                _read_library(library_tasks, _service_for(entry.media_type))
+        resolved = await resolve_entries(entries, progress)
+        libraries = await _libraries(
+            library_tasks, {_service_for(media.media_type) for media in resolved}
+        )
+
+        to_add = {"sonarr": [], "radarr": []}
+        seen = set()
+        for media in resolved:
+            key = (media.media_type, media.tmdb_id)
+            service = _service_for(media.media_type)
+            library_id = media.tvdb_id if media.media_type == "tv" else media.tmdb_id
+            if key in seen:
+                progress.duplicates += 1
+            elif service not in libraries:
+                progress.failed.append(media.title)
+            elif library_id in libraries[service]:
+                progress.existing += 1
+            elif _in_flight(media):
+                # Already queued through a regular request
+                progress.existing += 1
+            else:
+                to_add[service].append(media)
+            seen.add(key)
+
+        progress.phase = "🎬 Titel werden angefragt"
+        await progress.update(force=True)
+        requester = update.effective_user
+        await add_in_batches("sonarr", to_add["sonarr"], progress, requester)
+        await add_in_batches("radarr", to_add["radarr"], progress, requester)
+    except ServiceUnavailable as e:
+        await status_message.edit_text(service_unavailable_text(e.service))
+        return
+    except Exception as e:
+        logger.error(f"Bulk request failed: {e}")
+        await status_message.edit_text(
+            "🛑 Ein unerwarteter Fehler ist aufgetreten. Bitte versuche es später erneut."
+        )
+        return
+    finally:
+        # Libraries that were not needed after all, or not awaited because
+        # the lookups failed
+        for task in library_tasks.values():
+            task.cancel()
+        await asyncio.gather(*library_tasks.values(), return_exceptions=True)
+
+    logger.info(
+        f"Bulk request finished: {progress.added} added, {progress.existing} existing, "
+        f"{len(progress.not_found)} not found, {len(progress.failed)} failed"
+    )
+    await progress.update(force=True, done=True)
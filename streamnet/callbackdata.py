@@ -0,0 +1,122 @@
+import base64
+import hashlib
+import hmac
+import string
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from streamnet.config import get_config
+
+# Actions of the media buttons
+SELECT = "s"  # show the details card of a search result
+ADD = "a"  # confirm the request
+CANCEL = "c"  # cancel the request
+SEASONS = "p"  # pick the seasons of a series to request
+
+MEDIA_TYPE_CODES = {"movie": "m", "tv": "t"}
+MEDIA_TYPES = {code: media_type for media_type, code in MEDIA_TYPE_CODES.items()}
+
+# Telegram accepts at most 64 bytes of callback data
+MAX_LENGTH = 64
+# Bytes of the HMAC kept in the callback data (8 base64 characters)
+MAC_BYTES = 6
+
+_DIGITS = string.digits + string.ascii_lowercase
+_key = None
+
+
+# Raised for callback data that was not created by encode() for this user
+class InvalidCallbackData(ValueError):
+    pass
+
+
+# What a media button does, decoded from its callback data
+@dataclass(frozen=True)
+class MediaCallback:
+    action: str
+    media_type: str
+    tmdb_id: int
+    tvdb_id: Optional[int] = None
+    # Season numbers of a series, None for all
+    seasons: Optional[Tuple[int, ...]] = None
+
+
+def _base36(number):
+    digits = ""
+    while True:
+        number, remainder = divmod(number, 36)
+        digits = _DIGITS[remainder] + digits
+        if not number:
+            return digits
+
+
+# Signing key: bot.CALLBACK_SECRET, or derived from the bot token so every
+# process running the same bot accepts the same buttons
+def _signing_key():
+    global _key
+    if _key is None:
+        bot = get_config().bot
+        secret = bot.callback_secret or f"callback-data:{bot.token}"
+        _key = hashlib.sha256(secret.encode()).digest()
+    return _key
+
+
+# The MAC also covers the user the button was made for, so other users cannot
+# press it, without spending any bytes on the user id
+def _mac(payload, user_id):
+    digest = hmac.new(
+        _signing_key(), f"{payload}|{user_id}".encode(), hashlib.sha256
+    ).digest()
+    return base64.urlsafe_b64encode(digest[:MAC_BYTES]).decode()
+
+
+# Season numbers as "<highest>-<mask>" in base36, where bit n of the mask
+# stands for season highest - n. Counting down from the highest season keeps
+# the field short for series numbered by year (season 2019) as well.
+def _encode_seasons(numbers):
+    highest = max(numbers)
+    mask = 0
+    for number in numbers:
+        mask |= 1 << (highest - int(number))
+    return f"{_base36(highest)}-{_base36(mask)}"
+
+
+def _decode_seasons(value):
+    highest, _, mask = value.partition("-")
+    highest, mask = int(highest, 36), int(mask, 36)
+    return tuple(
+        sorted(highest - bit for bit in range(mask.bit_length()) if mask >> bit & 1)
+    )
+
+
+# Pack a button action into callback data, e.g. "am.1ix.Zq3k-x0a". Seasons
+# can only be given together with the TVDB id. Raises ValueError if the data
+# does not fit into MAX_LENGTH (e.g. seasons that are far apart).
+def encode(action, media_type, tmdb_id, user_id, tvdb_id=None, seasons=None):
+    fields = [action + MEDIA_TYPE_CODES[media_type], _base36(int(tmdb_id))]
+    if tvdb_id:
+        fields.append(_base36(int(tvdb_id)))
+        if seasons:
+            fields.append(_encode_seasons(seasons))
+    payload = ".".join(fields)
+    data = f"{payload}.{_mac(payload, user_id)}"
+    if len(data) > MAX_LENGTH:
+        raise ValueError(f"Callback data too long: {data!r}")
+    return data
+
+
+# Unpack callback data made by encode() for the given user
+def decode(data, user_id):
+    payload, _, mac = (data or "").rpartition(".")
+    if not payload or not hmac.compare_digest(mac, _mac(payload, user_id)):
+        raise InvalidCallbackData(data)
+    head, *ids = payload.split(".")
+    if len(head) != 2 or head[1] not in MEDIA_TYPES or len(ids) not in (1, 2, 3):
+        raise InvalidCallbackData(data)
+    try:
+        numbers = [int(value, 36) for value in ids[:2]]
+        if len(ids) == 3:
+            numbers.append(_decode_seasons(ids[2]))
+    except ValueError:
+        raise InvalidCallbackData(data) from None
+    return MediaCallback(head[0], MEDIA_TYPES[head[1]], *numbers)
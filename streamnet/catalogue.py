@@ -0,0 +1,273 @@
+import asyncio
+import gzip
+import json
+import logging
+import os
+import re
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from streamnet.config import get_config
+from streamnet.database import DATABASE_FILE
+from streamnet.httpclient import request
+from streamnet.tracing import trace_span
+
+logger = logging.getLogger("bot")
+
+# Media type -> name of its daily TMDB id export (e.g. movie_ids_05_15_2024.json.gz)
+EXPORT_FILES = {"movie": "movie_ids", "tv": "tv_series_ids"}
+# Export lines written per transaction while ingesting
+BATCH_SIZE = 5000
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+# Matches fetched (most popular first) before exact titles are moved to the top
+CANDIDATES = 200
+# How often a process without a catalogue checks whether another process
+# (the front process of the dispatcher) has ingested the first export
+READY_CHECK_SECONDS = 60
+
+_ready = None
+_ready_checked_at = 0.0
+_refreshing = False
+
+
+# Create the catalogue table, its full-text index and the triggers keeping them in sync
+def init_catalogue():
+    global _ready, _ready_checked_at
+    with sqlite3.connect(DATABASE_FILE) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """CREATE TABLE IF NOT EXISTS catalogue (
+                            id INTEGER PRIMARY KEY,
+                            media_type TEXT NOT NULL,
+                            tmdb_id INTEGER NOT NULL,
+                            title TEXT NOT NULL,
+                            popularity REAL NOT NULL DEFAULT 0,
+                            export_date TEXT NOT NULL,
+                            UNIQUE (media_type, tmdb_id)
+                          )"""
+        )
+        cursor.execute(
+            """CREATE VIRTUAL TABLE IF NOT EXISTS catalogue_fts USING fts5(
+                    title, content = 'catalogue', content_rowid = 'id',
+                    tokenize = 'unicode61 remove_diacritics 2'
+               )"""
+        )
+        cursor.execute(
+            """CREATE TRIGGER IF NOT EXISTS catalogue_insert AFTER INSERT ON catalogue BEGIN
+                   INSERT INTO catalogue_fts (rowid, title) VALUES (new.id, new.title);
+               END"""
+        )
+        cursor.execute(
+            """CREATE TRIGGER IF NOT EXISTS catalogue_delete AFTER DELETE ON catalogue BEGIN
+                   INSERT INTO catalogue_fts (catalogue_fts, rowid, title)
+                   VALUES ('delete', old.id, old.title);
+               END"""
+        )
+        # Only renamed titles touch the full-text index
+        cursor.execute(
+            """CREATE TRIGGER IF NOT EXISTS catalogue_update AFTER UPDATE OF title ON catalogue
+               WHEN old.title IS NOT new.title BEGIN
+                   INSERT INTO catalogue_fts (catalogue_fts, rowid, title)
+                   VALUES ('delete', old.id, old.title);
+                   INSERT INTO catalogue_fts (rowid, title) VALUES (new.id, new.title);
+               END"""
+        )
+        cursor.execute(
+            """CREATE TABLE IF NOT EXISTS catalogue_exports (
+                            media_type TEXT PRIMARY KEY,
+                            export_date TEXT NOT NULL,
+                            entries INTEGER NOT NULL,
+                            ingested_at REAL NOT NULL
+                          )"""
+        )
+        cursor.execute("SELECT COUNT(*) FROM catalogue_exports")
+        _ready = cursor.fetchone()[0] > 0
+        _ready_checked_at = time.monotonic()
+        conn.commit()
+
+
+# Date of the last export ingested per media type
+def ingested_exports():
+    with sqlite3.connect(DATABASE_FILE) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT media_type, export_date FROM catalogue_exports")
+        return dict(cursor.fetchall())
+
+
+# Parse one line of an export file into (tmdb_id, title, popularity), or None
+# for lines to skip (adult titles, titles without a name, broken lines)
+def parse_export_line(line, min_popularity=0):
+    try:
+        entry = json.loads(line)
+        tmdb_id = int(entry["id"])
+    except (ValueError, KeyError, TypeError):
+        return None
+    if entry.get("adult"):
+        return None
+    title = entry.get("original_title") or entry.get("original_name")
+    popularity = float(entry.get("popularity") or 0)
+    if not title or popularity < min_popularity:
+        return None
+    return tmdb_id, title, popularity
+
+
+# Stream an export file into the catalogue in batches, so memory use does not
+# depend on its size. Titles already in the catalogue are only rewritten when
+# they changed; titles missing from the export are removed afterwards.
+# Runs in a worker thread with its own connection.
+def ingest_export(path, media_type, export_date, min_popularity=0):
+    entries = 0
+    with sqlite3.connect(DATABASE_FILE) as conn, gzip.open(
+        path, "rt", encoding="utf-8"
+    ) as export:
+        batch = []
+        for line in export:
+            entry = parse_export_line(line, min_popularity)
+            if entry is None:
+                continue
+            batch.append((media_type, *entry, export_date))
+            if len(batch) >= BATCH_SIZE:
+                entries += _upsert(conn, batch)
+                batch = []
+        entries += _upsert(conn, batch)
+
+        conn.execute(
+            "DELETE FROM catalogue WHERE media_type = ? AND export_date < ?",
+            (media_type, export_date),
+        )
+        conn.execute(
+            """INSERT INTO catalogue_exports (media_type, export_date, entries, ingested_at)
+               VALUES (?, ?, ?, ?)
+               ON CONFLICT (media_type) DO UPDATE SET export_date = excluded.export_date,
+                   entries = excluded.entries, ingested_at = excluded.ingested_at""",
+            (media_type, export_date, entries, time.time()),
+        )
+        conn.commit()
+    return entries
+
+
+def _upsert(conn, batch):
+    conn.executemany(
+        """INSERT INTO catalogue (media_type, tmdb_id, title, popularity, export_date)
+           VALUES (?, ?, ?, ?, ?)
+           ON CONFLICT (media_type, tmdb_id) DO UPDATE SET title = excluded.title,
+               popularity = excluded.popularity, export_date = excluded.export_date""",
+        batch,
+    )
+    conn.commit()
+    return len(batch)
+
+
+# Download an export file to `path` in chunks. Returns False if TMDB has not
+# published it (yet).
+async def download_export(media_type, export_date, path):
+    url = f"{get_config().catalogue.export_url}/{EXPORT_FILES[media_type]}_{export_date:%m_%d_%Y}.json.gz"
+    async with request("tmdb", "GET", url) as response:
+        if response.status in (403, 404):
+            return False
+        response.raise_for_status()
+        with open(path, "wb") as export:
+            async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                export.write(chunk)
+    return True
+
+
+# Job: ingest the newest TMDB exports that were not ingested yet. Exports are
+# published once a day, so today's file is tried first, then yesterday's.
+async def refresh_catalogue(context):
+    global _refreshing
+    if _refreshing:
+        return
+    _refreshing = True
+    try:
+        if _ready is None:
+            init_catalogue()
+        settings = get_config().catalogue
+        ingested = ingested_exports()
+        today = datetime.now(timezone.utc).date()
+        for media_type in EXPORT_FILES:
+            for export_date in (today, today - timedelta(days=1)):
+                if ingested.get(media_type, "") >= export_date.isoformat():
+                    break
+                try:
+                    if await _refresh_export(
+                        media_type, export_date, settings.min_popularity
+                    ):
+                        break
+                except Exception as e:
+                    logger.error(
+                        f"Failed to ingest TMDB {media_type} export of {export_date}: {e}"
+                    )
+                    break
+    finally:
+        _refreshing = False
+
+
+async def _refresh_export(media_type, export_date, min_popularity):
+    global _ready
+    handle, path = tempfile.mkstemp(suffix=".json.gz")
+    os.close(handle)
+    try:
+        started = time.perf_counter()
+        if not await download_export(media_type, export_date, path):
+            return False
+        entries = await asyncio.to_thread(
+            ingest_export, path, media_type, export_date.isoformat(), min_popularity
+        )
+    finally:
+        os.remove(path)
+    _ready = True
+    logger.info(
+        f"CATALOGUE ingested {entries} {media_type} titles from the TMDB export of "
+        f"{export_date} in {time.perf_counter() - started:.1f} s"
+    )
+    return True
+
+
+# Whether the catalogue has been filled. Until it has, the database is asked
+# again at most every READY_CHECK_SECONDS.
+def is_ready():
+    global _ready, _ready_checked_at
+    if _ready is False and time.monotonic() - _ready_checked_at >= READY_CHECK_SECONDS:
+        _ready_checked_at = time.monotonic()
+        _ready = bool(ingested_exports())
+    return bool(_ready)
+
+
+# Titles in the catalogue matching a search query, in the shape of TMDB search
+# results. The last word is matched as a prefix, so partial input autocompletes.
+# Exact titles come first, then the most popular matches.
+def search_catalogue(query, media_type=None, limit=20):
+    if not is_ready():
+        return []
+    words = re.findall(r"\w+", query.lower())
+    if not words:
+        return []
+    expression = " ".join(f'"{word}"' for word in words) + "*"
+
+    sql = """SELECT c.media_type, c.tmdb_id, c.title, c.popularity
+             FROM catalogue_fts JOIN catalogue c ON c.id = catalogue_fts.rowid
+             WHERE catalogue_fts MATCH ?"""
+    params = [expression]
+    if media_type:
+        sql += " AND c.media_type = ?"
+        params.append(media_type)
+    sql += " ORDER BY c.popularity DESC LIMIT ?"
+    params.append(CANDIDATES)
+    with trace_span("db.search_catalogue"), sqlite3.connect(DATABASE_FILE) as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    normalized = " ".join(words)
+    rows.sort(
+        key=lambda row: " ".join(re.findall(r"\w+", row[2].lower())) != normalized
+    )
+    results = []
+    for row_media_type, tmdb_id, title, popularity in rows[:limit]:
+        result = {"id": tmdb_id, "media_type": row_media_type, "popularity": popularity}
+        result["title" if row_media_type == "movie" else "name"] = title
+        results.append(result)
+    return results
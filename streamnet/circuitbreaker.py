@@ -0,0 +1,117 @@
+import logging
+import time
+from collections import deque
+
+logger = logging.getLogger("bot")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Ticket of calls made while the breaker is closed; every probe gets its own
+CALL = "call"
+
+
+# Stops calling an upstream that keeps failing. While closed, the outcome of
+# every call within the last `window` seconds is kept; once at least
+# `min_calls` were made and the share of failures reaches `error_rate`, the
+# breaker opens and calls fail fast for `open_seconds`. After that a single
+# probe call is let through (half-open): success closes the breaker again,
+# failure opens it for another `open_seconds`. Only the outcome of the probe
+# itself counts while half-open; calls still running from before are ignored.
+class CircuitBreaker:
+    def __init__(
+        self, name, window=60.0, min_calls=10, error_rate=0.5, open_seconds=30.0
+    ):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self.opened_at = None
+        self._calls = deque()  # (monotonic time, ok)
+        self._failures = 0
+        self._probe = None  # ticket of the probe call in flight
+
+    def _prune(self, now):
+        while self._calls and now - self._calls[0][0] > self.window:
+            _, ok = self._calls.popleft()
+            if not ok:
+                self._failures -= 1
+
+    def _open(self, now):
+        self.state = OPEN
+        self.opened_at = now
+        self._probe = None
+        logger.warning(
+            f"CIRCUIT BREAKER for '{self.name}' OPEN, failing fast for {self.open_seconds:g} s"
+        )
+
+    # Whether a call may be made right now: a ticket to pass to record() or
+    # release() once the call is over, or None. In half-open state only one
+    # probe call is allowed at a time.
+    def allow(self):
+        if self.state == CLOSED:
+            return CALL
+        now = time.monotonic()
+        if self.state == OPEN:
+            if now - self.opened_at < self.open_seconds:
+                return None
+            self.state = HALF_OPEN
+            logger.info(f"CIRCUIT BREAKER for '{self.name}' HALF-OPEN, probing")
+        if self._probe is not None:
+            return None
+        self._probe = object()
+        return self._probe
+
+    # Record the outcome of a call that allow() let through
+    def record(self, ticket, ok):
+        now = time.monotonic()
+        if self.state == HALF_OPEN:
+            if ticket is not self._probe:
+                return  # a call that started before the breaker opened
+            if ok:
+                self.state = CLOSED
+                self.opened_at = None
+                self._probe = None
+                self._calls.clear()
+                self._failures = 0
+                logger.info(f"CIRCUIT BREAKER for '{self.name}' CLOSED")
+            else:
+                self._open(now)
+            return
+        if self.state == OPEN:
+            return  # a call that started before the breaker opened
+
+        self._calls.append((now, ok))
+        if not ok:
+            self._failures += 1
+        self._prune(now)
+        if (
+            len(self._calls) >= self.min_calls
+            and self._failures / len(self._calls) >= self.error_rate
+        ):
+            self._open(now)
+
+    # A call was let through but ended without an outcome (e.g. cancelled)
+    def release(self, ticket):
+        if ticket is not None and ticket is self._probe:
+            self._probe = None
+
+    # Current state for monitoring
+    def snapshot(self):
+        now = time.monotonic()
+        self._prune(now)
+        calls = len(self._calls)
+        snapshot = {
+            "state": self.state,
+            "calls": calls,
+            "failures": self._failures,
+            "error_rate": round(self._failures / calls, 3) if calls else 0.0,
+        }
+        if self.state == OPEN:
+            snapshot["retry_in_s"] = round(
+                max(0.0, self.open_seconds - (now - self.opened_at)), 1
+            )
+        return snapshot
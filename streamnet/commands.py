@@ -0,0 +1,232 @@
+import logging
+from datetime import datetime
+
+from telegram import (
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    ReplyKeyboardRemove,
+    Update,
+)
+from telegram.ext import ContextTypes
+
+from streamnet import ledger, rendering, sessions, state, watchdog
+from streamnet.config import get_config
+from streamnet.database import save_group_data
+from streamnet.httpclient import SERVICE_NAMES, breaker_states
+from streamnet.utils import admin_required, get_current_time
+
+logger = logging.getLogger("bot")
+
+# Number of requests shown by /requests
+REQUESTS_LIST_LIMIT = 25
+REQUEST_STATUS_LABELS = {
+    ledger.REQUESTED: "angefragt",
+    ledger.ADDED: "hinzugefügt",
+    ledger.AVAILABLE: "vorhanden",
+    ledger.DOWNLOADED: "heruntergeladen",
+    ledger.REMOVED: "entfernt",
+    ledger.FAILED: "gescheitert",
+}
+
+
+# Command to set the group ID
+@admin_required
+async def set_group_id(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    state.GROUP_CHAT_ID = update.message.chat_id
+
+    # Retrieve the group name
+    group_name = (
+        update.message.chat.title if update.message.chat.title else "Unknown Group"
+    )
+
+    # Save group data (assuming LANGUAGE is already defined)
+    save_group_data(state.GROUP_CHAT_ID, group_name, state.LANGUAGE)
+
+    username = update.message.from_user.username  # Get the username
+    user_id = update.message.from_user.id
+    logger.info(
+        f"GROUP CHAT ID set to: '{state.GROUP_CHAT_ID}' for GROUP: '{group_name}' by USER '{username}' (ID: '{user_id}')"
+    )
+
+    await update.message.reply_text(f"Group Chat ID set to: '{state.GROUP_CHAT_ID}'")
+
+
+# Command to set the language for TMDB searches
+@admin_required
+async def set_language(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    if context.args:
+        language_code = context.args[0]
+        if len(language_code) == 2:
+            state.LANGUAGE = language_code
+            group_name = (
+                update.message.chat.title
+                if update.message.chat.title
+                else "Unknown Group"
+            )
+            save_group_data(state.GROUP_CHAT_ID, group_name, state.LANGUAGE)
+            user_id = update.message.from_user.id
+            username = update.message.from_user.username
+            logger.info(
+                f"Language set to: '{state.LANGUAGE}' by user '{username}' (ID: '{user_id}')"
+            )
+            await update.message.reply_text(f"TMDb LANGUAGE gesetzt: {state.LANGUAGE}")
+        else:
+            await update.message.reply_text(
+                "Ungültiger Language Code. (e.g., 'en', 'de')"
+            )
+    else:
+        await update.message.reply_text(
+            "Bitte gebe einen TMDb Language Code ein (e.g., 'en', 'de')"
+        )
+
+
+# Function to welcome new members
+async def welcome_new_members(
+    update: Update, context: ContextTypes.DEFAULT_TYPE
+) -> None:
+    welcome = get_config().welcome
+    for member in update.message.new_chat_members:
+        logger.info(f"New member '{member.full_name}' joined the group.")
+
+        # Define the buttons
+        button1 = InlineKeyboardButton("StreamNet TV Store", url=welcome.button_url)
+        button2 = InlineKeyboardButton("StreamNet Club Spende", url=welcome.support_url)
+
+        # Add both buttons to the keyboard
+        keyboard = InlineKeyboardMarkup([[button1], [button2]])
+
+        now = get_current_time()
+        date_time = now.strftime("%d.%m.%Y %H:%M:%S")
+        username = f"@{member.username}" if member.username else member.full_name
+
+        welcome_message = rendering.render(
+            "welcome", name=member.full_name, username=username, joined=date_time
+        )
+
+        await update.message.chat.send_photo(
+            photo=welcome.image_url,
+            caption=welcome_message,
+            parse_mode=rendering.PARSE_MODE,
+            reply_markup=keyboard,
+        )
+
+
+# Help command function
+async def help(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    help_text = (
+        "Hier sind die Befehle, die du verwenden kannst:\n\n"
+        "/start  - Bot Willkommensnachricht\n"
+        "/set_group_id  - Setze die Gruppen-ID (Nachtmodus)\n"
+        "/set_language [code]  - TMDB-Sprache für Mediensuche (standard: en)\n"
+        "/enable_night_mode  - Aktiviere den Nachtmodus\n"
+        "/disable_night_mode - Deaktiviere den Nachtmodus\n"
+        "/search [title] - Suche nach einem Film oder einer TV-Show\n"
+        "/bulk [Liste] - Viele Titel auf einmal anfragen (ein Titel pro Zeile)\n\n"
+        "Um einen Befehl auszuführen, tippe ihn einfach in den Chat ein oder kopiere und füge ihn ein."
+    )
+    await update.message.reply_text(help_text)
+
+
+# Start bot function
+async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    user = update.effective_user
+    await update.message.reply_html(
+        rf"Hi {user.mention_html()} !"
+        "\n\n"
+        "Willkommen bei <b>StreamNet TV</b>\n"
+        "Ich bin <b>Mr.StreamNet</b> - der Butler des <b>StreamNet Club's</b>.\n\n"
+        "Ich stehe dir zur Verfügung, um deine Medienanfragen zu verwalten und vieles Mehr.\n"
+        "Wenn du Hilfe benötigst, benutze/klicke auf den Befehl  /help .",
+        reply_markup=ReplyKeyboardRemove(),
+    )
+
+
+# Show the circuit breaker state of TMDB, Sonarr and Radarr
+@admin_required
+async def upstream_status(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    states = breaker_states()
+    icons = {"closed": "🟢", "half_open": "🟡", "open": "🔴"}
+    lines = ["Status der Dienste:", ""]
+    for service, name in SERVICE_NAMES.items():
+        snapshot = states.get(service)
+        if snapshot is None:
+            lines.append(f"⚪️ {name}: noch nicht verwendet")
+            continue
+        line = (
+            f"{icons[snapshot['state']]} {name}: {snapshot['state']}, "
+            f"{snapshot['failures']}/{snapshot['calls']} Fehler"
+        )
+        if "retry_in_s" in snapshot:
+            line += f", nächster Versuch in {snapshot['retry_in_s']:g} s"
+        lines.append(line)
+    # Memory held by the request flows of this process
+    count, total, per_session = sessions.get_store().memory()
+    lines += [
+        "",
+        f"Sitzungen: {count} aktiv, {total / 1024:.1f} KiB, "
+        f"{per_session} Bytes je Sitzung",
+    ]
+    await update.message.reply_text("\n".join(lines))
+
+
+# List the latest requests from the request ledger: /requests [status]
+@admin_required
+async def list_requests(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    status = context.args[0].lower() if context.args else None
+    if status is not None and status not in REQUEST_STATUS_LABELS:
+        await update.message.reply_text(
+            f"Unbekannter Status. Möglich sind: {', '.join(REQUEST_STATUS_LABELS)}"
+        )
+        return
+
+    counts = ledger.request_counts()
+    requests = ledger.list_requests(limit=REQUESTS_LIST_LIMIT, status=status)
+    lines = [
+        "Anfragen: "
+        + ", ".join(
+            f"{REQUEST_STATUS_LABELS[key]} {counts.get(key, 0)}"
+            for key in REQUEST_STATUS_LABELS
+        ),
+        "",
+    ]
+    tzinfo = get_config().bot.tzinfo
+    for request in requests:
+        kind = "Serie" if request["media_type"] == "tv" else "Film"
+        when = datetime.fromtimestamp(request["updated_at"], tzinfo)
+        requester = (
+            f"@{request['username']}" if request["username"] else request["user_id"]
+        )
+        lines.append(
+            f"• {request['title']} ({kind}) – {REQUEST_STATUS_LABELS[request['status']]} – "
+            f"{requester} – {when.strftime('%d.%m.%Y %H:%M')}"
+        )
+    if not requests:
+        lines.append("Keine Anfragen gefunden.")
+    await update.message.reply_text("\n".join(lines)[:4096])
+
+
+# Sample the event loop and reply with the functions it spends most time in:
+# /profile [seconds]. The sampling runs in the background, so the bot keeps
+# handling updates (and shows up in the profile) meanwhile.
+@admin_required
+async def profile(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    try:
+        seconds = float(context.args[0]) if context.args else 5
+    except ValueError:
+        await update.message.reply_text(
+            "Bitte gib die Dauer in Sekunden an, z.B. /profile 10"
+        )
+        return
+    seconds = min(max(seconds, 1), watchdog.MAX_PROFILE_SECONDS)
+    await update.message.reply_text(f"⏱ Profil läuft {seconds:g} s...")
+
+    async def run():
+        try:
+            samples = await watchdog.profile_loop(seconds)
+        except watchdog.ProfilerUnavailable as e:
+            await update.message.reply_text(f"🛑 Profil nicht möglich: {e}")
+            return
+        report = watchdog.profile_report(seconds, *samples)
+        await update.message.reply_text(report[:4096])
+
+    context.application.create_task(run(), update=update)
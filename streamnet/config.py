@@ -0,0 +1,662 @@
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, time
+from types import MappingProxyType
+from typing import Mapping, Optional
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger("bot")
+
+# Configurations
+CONFIG_DIR = "config"
+CONFIG_FILE = os.path.join(CONFIG_DIR, "config.json")
+
+DEFAULT_TIMEZONE = "Europe/Berlin"
+
+
+# Raised when config.json is missing, unreadable or invalid
+class ConfigError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class BotConfig:
+    token: str
+    timezone: str = DEFAULT_TIMEZONE
+    tzinfo: ZoneInfo = field(default=ZoneInfo(DEFAULT_TIMEZONE), compare=False)
+    log_level: str = "INFO"
+    log_format: str = "text"
+    log_dedupe_seconds: float = 60
+    # Key for signing button callback data (derived from the token if unset)
+    callback_secret: Optional[str] = field(default=None, repr=False)
+
+
+@dataclass(frozen=True)
+class WelcomeConfig:
+    image_url: Optional[str] = None
+    button_url: Optional[str] = None
+    support_url: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class NightModeConfig:
+    start: time
+    end: time
+    warning_window_seconds: float = 300
+    warning_delete_seconds: float = 60
+
+
+@dataclass(frozen=True)
+class TmdbConfig:
+    api_key: str
+    default_language: str = "en"
+    api_url: str = "https://api.themoviedb.org/3"
+    connect_timeout: float = 5
+    read_timeout: float = 10
+
+
+@dataclass(frozen=True)
+class ArrConfig:
+    url: Optional[str]
+    api_key: Optional[str]
+    quality_profile_name: Optional[str]
+    root_folder_path: Optional[str]
+    connect_timeout: float = 5
+    read_timeout: float = 30
+
+
+@dataclass(frozen=True)
+class CommandsConfig:
+    start: str = "start"
+    welcome: str = "welcome"
+    night_mode_enable: str = "enable_night_mode"
+    night_mode_disable: str = "disable_night_mode"
+    tmdb_language: str = "set_language"
+    set_group_id: str = "set_group_id"
+    help: str = "help"
+    search: str = "search"
+    bulk: str = "bulk"
+    status: str = "status"
+    requests: str = "requests"
+    profile: str = "profile"
+
+
+@dataclass(frozen=True)
+class TracingConfig:
+    enabled: bool = False
+    slow_update_threshold_ms: float = 2000
+    log_all: bool = False
+
+
+@dataclass(frozen=True)
+class WatchdogConfig:
+    enabled: bool = True
+    lag_threshold_ms: float = 500
+
+
+@dataclass(frozen=True)
+class HealthConfig:
+    enabled: bool = False
+    host: str = "0.0.0.0"
+    port: int = 8080
+    check_timeout_seconds: float = 5
+    interval_seconds: float = 60
+
+
+@dataclass(frozen=True)
+class WebhooksConfig:
+    enabled: bool = False
+    host: str = "0.0.0.0"
+    port: int = 8081
+    secret: str = ""
+    announce: bool = False
+
+
+@dataclass(frozen=True)
+class JobsConfig:
+    workers: int = 2
+    max_attempts: int = 5
+    retry_base_seconds: float = 30
+    retry_max_seconds: float = 1800
+
+
+@dataclass(frozen=True)
+class CircuitBreakerConfig:
+    window_seconds: float = 60
+    min_calls: int = 10
+    error_rate: float = 0.5
+    open_seconds: float = 30
+
+
+@dataclass(frozen=True)
+class LeaderConfig:
+    lease_seconds: float = 30
+    renew_seconds: float = 10
+
+
+@dataclass(frozen=True)
+class QuotaLimit:
+    per_minute: float
+    burst: float
+
+
+# Token bucket limits per action ("search", "select", "add")
+_DEFAULT_USER_QUOTAS = {
+    "search": QuotaLimit(per_minute=5, burst=10),
+    "select": QuotaLimit(per_minute=10, burst=20),
+    "add": QuotaLimit(per_minute=2, burst=5),
+}
+_DEFAULT_CHAT_QUOTAS = {
+    "search": QuotaLimit(per_minute=30, burst=60),
+    "select": QuotaLimit(per_minute=60, burst=120),
+    "add": QuotaLimit(per_minute=10, burst=20),
+}
+
+
+@dataclass(frozen=True)
+class QuotaConfig:
+    enabled: bool = False
+    persist_seconds: float = 60
+    user: Mapping = field(
+        default_factory=lambda: MappingProxyType(_DEFAULT_USER_QUOTAS)
+    )
+    chat: Mapping = field(
+        default_factory=lambda: MappingProxyType(_DEFAULT_CHAT_QUOTAS)
+    )
+
+
+@dataclass(frozen=True)
+class SessionsConfig:
+    ttl_seconds: float = 900
+    max_sessions: int = 10000
+
+
+@dataclass(frozen=True)
+class DispatcherConfig:
+    processes: int = 1
+
+
+@dataclass(frozen=True)
+class LibraryConfig:
+    enabled: bool = True
+    refresh_minutes: float = 15
+
+
+@dataclass(frozen=True)
+class DetailsCacheConfig:
+    enabled: bool = True
+    soft_ttl_hours: float = 24
+    hard_ttl_hours: float = 720
+    max_entries: int = 5000
+
+
+@dataclass(frozen=True)
+class CatalogueConfig:
+    enabled: bool = False
+    export_url: str = "https://files.tmdb.org/p/exports"
+    refresh_hours: float = 6
+    min_popularity: float = 0
+
+
+@dataclass(frozen=True)
+class DownloadsConfig:
+    enabled: bool = True
+    min_poll_seconds: float = 60
+    max_poll_seconds: float = 1800
+    give_up_days: float = 14
+
+
+@dataclass(frozen=True)
+class Config:
+    bot: BotConfig
+    welcome: WelcomeConfig
+    nightmode: NightModeConfig
+    tmdb: TmdbConfig
+    sonarr: ArrConfig
+    radarr: ArrConfig
+    commands: CommandsConfig
+    tracing: TracingConfig
+    watchdog: WatchdogConfig
+    health: HealthConfig
+    webhooks: WebhooksConfig
+    jobs: JobsConfig
+    circuit_breaker: CircuitBreakerConfig
+    leader: LeaderConfig
+    dispatcher: DispatcherConfig
+    quota: QuotaConfig
+    sessions: SessionsConfig
+    library: LibraryConfig
+    catalogue: CatalogueConfig
+    details_cache: DetailsCacheConfig
+    downloads: DownloadsConfig
+    topics: Mapping = field(default_factory=lambda: MappingProxyType({}))
+    # The parsed config.json, read-only (used for logging the settings)
+    raw: Mapping = field(default_factory=lambda: MappingProxyType({}), repr=False)
+
+
+# Function to redact sensitive information like tokens and API keys
+def redact_sensitive_info(value, visible_chars=4):
+    if isinstance(value, str) and len(value) > visible_chars * 2:
+        return f"{value[:visible_chars]}{'*' * (len(value) - visible_chars * 2)}{value[-visible_chars:]}"
+    return value
+
+
+# Return a config section as dict, recording an error if it has the wrong type
+def _section(raw, name, errors):
+    section = raw.get(name) or {}
+    if not isinstance(section, dict):
+        errors.append(f"Section '{name}' must be an object.")
+        return {}
+    return section
+
+
+def _parse_time(section, key, default, errors):
+    value = section.get(key, default)
+    try:
+        return datetime.strptime(value, "%H:%M").time()
+    except (TypeError, ValueError):
+        errors.append(f"nightmode.{key} must be a time in HH:MM format, got {value!r}.")
+        return datetime.strptime(default, "%H:%M").time()
+
+
+# Build a section of positive numbers; fields maps field name -> (key, type)
+def _parse_numbers(cls, section, name, fields, errors):
+    values = {}
+    for field_name, (key, number_type) in fields.items():
+        if key not in section:
+            continue
+        try:
+            value = number_type(section[key])
+        except (TypeError, ValueError):
+            value = None
+        if value is None or value <= 0:
+            errors.append(f"{name}.{key} must be a positive number.")
+            continue
+        values[field_name] = value
+    return cls(**values)
+
+
+_TIMEOUT_FIELDS = {
+    "connect_timeout": ("CONNECT_TIMEOUT", float),
+    "read_timeout": ("READ_TIMEOUT", float),
+}
+
+
+# Limits of one scope ("USER" or "CHAT") of the quota section, e.g.
+# {"SEARCH": {"PER_MINUTE": 5, "BURST": 10}}; missing values keep their default
+def _parse_quota_limits(quota, scope, defaults, errors):
+    section = _section(quota, scope, errors)
+    limits = {}
+    for action, default in defaults.items():
+        values = section.get(action.upper()) or {}
+        if not isinstance(values, dict):
+            errors.append(f"quota.{scope}.{action.upper()} must be an object.")
+            values = {}
+        limits[action] = QuotaLimit(
+            **{
+                "per_minute": default.per_minute,
+                "burst": default.burst,
+                **_parse_numbers(
+                    dict,
+                    values,
+                    f"quota.{scope}.{action.upper()}",
+                    {
+                        "per_minute": ("PER_MINUTE", float),
+                        "burst": ("BURST", float),
+                    },
+                    errors,
+                ),
+            }
+        )
+    return MappingProxyType(limits)
+
+
+def _parse_arr(section, name, errors):
+    timeouts = _parse_numbers(dict, section, name, _TIMEOUT_FIELDS, errors)
+    return ArrConfig(
+        url=section.get("URL"),
+        api_key=section.get("API_KEY"),
+        quality_profile_name=section.get("QUALITY_PROFILE_NAME"),
+        root_folder_path=section.get("ROOT_FOLDER_PATH"),
+        **timeouts,
+    )
+
+
+# Validate the raw config.json contents and build the immutable Config
+def parse_config(raw):
+    if not isinstance(raw, dict):
+        raise ConfigError("config.json must contain a JSON object.")
+
+    errors = []
+    bot = _section(raw, "bot", errors)
+    welcome = _section(raw, "welcome", errors)
+    nightmode = _section(raw, "nightmode", errors)
+    tmdb = _section(raw, "tmdb", errors)
+    sonarr = _section(raw, "sonarr", errors)
+    radarr = _section(raw, "radarr", errors)
+    commands = _section(raw, "commands", errors)
+    tracing = _section(raw, "tracing", errors)
+    watchdog = _section(raw, "watchdog", errors)
+    health = _section(raw, "health", errors)
+    webhooks = _section(raw, "webhooks", errors)
+    jobs = _section(raw, "jobs", errors)
+    circuit_breaker = _section(raw, "circuit_breaker", errors)
+    leader = _section(raw, "leader", errors)
+    dispatcher = _section(raw, "dispatcher", errors)
+    quota = _section(raw, "quota", errors)
+    sessions = _section(raw, "sessions", errors)
+    library = _section(raw, "library", errors)
+    catalogue = _section(raw, "catalogue", errors)
+    details_cache = _section(raw, "details_cache", errors)
+    downloads = _section(raw, "downloads", errors)
+    topics = _section(raw, "topics", errors)
+
+    token = bot.get("TOKEN")
+    if not token or not isinstance(token, str):
+        errors.append("bot.TOKEN is missing or invalid.")
+
+    timezone = bot.get("TIMEZONE", DEFAULT_TIMEZONE)
+    try:
+        tzinfo = ZoneInfo(timezone)
+    except Exception as e:
+        logger.error(f"Invalid TIMEZONE '{timezone}' in config.json <-----")
+        logger.info(f"Defaulting TIMEZONE to '{DEFAULT_TIMEZONE}'. Error: {e}")
+        timezone, tzinfo = DEFAULT_TIMEZONE, ZoneInfo(DEFAULT_TIMEZONE)
+
+    log_level = str(bot.get("LOG_LEVEL", "INFO")).upper()
+    if not isinstance(logging.getLevelName(log_level), int):
+        errors.append(f"bot.LOG_LEVEL '{log_level}' is not a valid log level.")
+
+    log_format = str(bot.get("LOG_FORMAT", "text")).lower()
+    if log_format not in ("text", "json"):
+        errors.append(f"bot.LOG_FORMAT must be 'text' or 'json', got {log_format!r}.")
+
+    try:
+        log_dedupe_seconds = float(bot.get("LOG_DEDUPE_SECONDS", 60))
+    except (TypeError, ValueError):
+        errors.append("bot.LOG_DEDUPE_SECONDS must be a number.")
+        log_dedupe_seconds = 60
+
+    try:
+        slow_update_threshold_ms = float(tracing.get("SLOW_UPDATE_THRESHOLD_MS", 2000))
+    except (TypeError, ValueError):
+        errors.append("tracing.SLOW_UPDATE_THRESHOLD_MS must be a number.")
+        slow_update_threshold_ms = 2000
+
+    leader_config = _parse_numbers(
+        LeaderConfig,
+        leader,
+        "leader",
+        {
+            "lease_seconds": ("LEASE_SECONDS", float),
+            "renew_seconds": ("RENEW_SECONDS", float),
+        },
+        errors,
+    )
+    if leader_config.renew_seconds * 2 > leader_config.lease_seconds:
+        errors.append("leader.RENEW_SECONDS must be at most half of LEASE_SECONDS.")
+
+    details_cache_config = DetailsCacheConfig(
+        enabled=bool(details_cache.get("ENABLED", True)),
+        **_parse_numbers(
+            dict,
+            details_cache,
+            "details_cache",
+            {
+                "soft_ttl_hours": ("SOFT_TTL_HOURS", float),
+                "hard_ttl_hours": ("HARD_TTL_HOURS", float),
+                "max_entries": ("MAX_ENTRIES", int),
+            },
+            errors,
+        ),
+    )
+    if details_cache_config.soft_ttl_hours > details_cache_config.hard_ttl_hours:
+        errors.append(
+            "details_cache.SOFT_TTL_HOURS must not be greater than HARD_TTL_HOURS."
+        )
+
+    webhooks_config = WebhooksConfig(
+        enabled=bool(webhooks.get("ENABLED", False)),
+        host=webhooks.get("HOST", "0.0.0.0"),
+        secret=str(webhooks.get("SECRET") or ""),
+        announce=bool(webhooks.get("ANNOUNCE", False)),
+        **_parse_numbers(dict, webhooks, "webhooks", {"port": ("PORT", int)}, errors),
+    )
+    if webhooks_config.enabled and len(webhooks_config.secret) < 16:
+        errors.append(
+            "webhooks.SECRET must be at least 16 characters when webhooks are enabled."
+        )
+
+    downloads_config = DownloadsConfig(
+        enabled=bool(downloads.get("ENABLED", True)),
+        **_parse_numbers(
+            dict,
+            downloads,
+            "downloads",
+            {
+                "min_poll_seconds": ("MIN_POLL_SECONDS", float),
+                "max_poll_seconds": ("MAX_POLL_SECONDS", float),
+                "give_up_days": ("GIVE_UP_DAYS", float),
+            },
+            errors,
+        ),
+    )
+    if downloads_config.min_poll_seconds > downloads_config.max_poll_seconds:
+        errors.append(
+            "downloads.MIN_POLL_SECONDS must not be greater than MAX_POLL_SECONDS."
+        )
+
+    try:
+        min_popularity = float(catalogue.get("MIN_POPULARITY", 0))
+    except (TypeError, ValueError):
+        errors.append("catalogue.MIN_POPULARITY must be a number.")
+        min_popularity = 0
+
+    jobs_config = _parse_numbers(
+        JobsConfig,
+        jobs,
+        "jobs",
+        {
+            "workers": ("WORKERS", int),
+            "max_attempts": ("MAX_ATTEMPTS", int),
+            "retry_base_seconds": ("RETRY_BASE_SECONDS", float),
+            "retry_max_seconds": ("RETRY_MAX_SECONDS", float),
+        },
+        errors,
+    )
+
+    circuit_breaker_config = _parse_numbers(
+        CircuitBreakerConfig,
+        circuit_breaker,
+        "circuit_breaker",
+        {
+            "window_seconds": ("WINDOW_SECONDS", float),
+            "min_calls": ("MIN_CALLS", int),
+            "error_rate": ("ERROR_RATE", float),
+            "open_seconds": ("OPEN_SECONDS", float),
+        },
+        errors,
+    )
+    if circuit_breaker_config.error_rate > 1:
+        errors.append("circuit_breaker.ERROR_RATE must be between 0 and 1.")
+
+    config = Config(
+        bot=BotConfig(
+            token=token,
+            timezone=timezone,
+            tzinfo=tzinfo,
+            log_level=log_level,
+            log_format=log_format,
+            log_dedupe_seconds=log_dedupe_seconds,
+            callback_secret=bot.get("CALLBACK_SECRET") or None,
+        ),
+        welcome=WelcomeConfig(
+            image_url=welcome.get("IMAGE_URL"),
+            button_url=welcome.get("BUTTON_URL"),
+            support_url=welcome.get("SUPPORT_URL"),
+        ),
+        nightmode=NightModeConfig(
+            start=_parse_time(nightmode, "NIGHTMODE_START", "00:00", errors),
+            end=_parse_time(nightmode, "NIGHTMODE_END", "07:00", errors),
+            **_parse_numbers(
+                dict,
+                nightmode,
+                "nightmode",
+                {
+                    "warning_window_seconds": ("WARNING_WINDOW_SECONDS", float),
+                    "warning_delete_seconds": ("WARNING_DELETE_SECONDS", float),
+                },
+                errors,
+            ),
+        ),
+        tmdb=TmdbConfig(
+            api_key=tmdb.get("API_KEY"),
+            default_language=tmdb.get("DEFAULT_LANGUAGE") or "en",
+            api_url=tmdb.get("API_URL", "https://api.themoviedb.org/3").rstrip("/"),
+            **_parse_numbers(dict, tmdb, "tmdb", _TIMEOUT_FIELDS, errors),
+        ),
+        sonarr=_parse_arr(sonarr, "sonarr", errors),
+        radarr=_parse_arr(radarr, "radarr", errors),
+        commands=CommandsConfig(
+            start=commands.get("START", "start"),
+            welcome=commands.get("WELCOME", "welcome"),
+            night_mode_enable=commands.get("NIGHT_MODE_ENABLE", "enable_night_mode"),
+            night_mode_disable=commands.get("NIGHT_MODE_DISABLE", "disable_night_mode"),
+            tmdb_language=commands.get("TMDB_LANGUAGE", "set_language"),
+            set_group_id=commands.get("SET_GROUP_ID", "set_group_id"),
+            help=commands.get("HELP", "help"),
+            search=commands.get("SEARCH", "search"),
+            bulk=commands.get("BULK", "bulk"),
+            status=commands.get("STATUS", "status"),
+            requests=commands.get("REQUESTS", "requests"),
+            profile=commands.get("PROFILE", "profile"),
+        ),
+        tracing=TracingConfig(
+            enabled=bool(tracing.get("ENABLED", False)),
+            slow_update_threshold_ms=slow_update_threshold_ms,
+            log_all=bool(tracing.get("LOG_ALL", False)),
+        ),
+        watchdog=WatchdogConfig(
+            enabled=bool(watchdog.get("ENABLED", True)),
+            **_parse_numbers(
+                dict,
+                watchdog,
+                "watchdog",
+                {"lag_threshold_ms": ("LAG_THRESHOLD_MS", float)},
+                errors,
+            ),
+        ),
+        health=HealthConfig(
+            enabled=bool(health.get("ENABLED", False)),
+            host=health.get("HOST", "0.0.0.0"),
+            **_parse_numbers(
+                dict,
+                health,
+                "health",
+                {
+                    "port": ("PORT", int),
+                    "check_timeout_seconds": ("CHECK_TIMEOUT_SECONDS", float),
+                    "interval_seconds": ("INTERVAL_SECONDS", float),
+                },
+                errors,
+            ),
+        ),
+        webhooks=webhooks_config,
+        jobs=jobs_config,
+        circuit_breaker=circuit_breaker_config,
+        leader=leader_config,
+        quota=QuotaConfig(
+            enabled=bool(quota.get("ENABLED", False)),
+            user=_parse_quota_limits(quota, "USER", _DEFAULT_USER_QUOTAS, errors),
+            chat=_parse_quota_limits(quota, "CHAT", _DEFAULT_CHAT_QUOTAS, errors),
+            **_parse_numbers(
+                dict,
+                quota,
+                "quota",
+                {"persist_seconds": ("PERSIST_SECONDS", float)},
+                errors,
+            ),
+        ),
+        sessions=_parse_numbers(
+            SessionsConfig,
+            sessions,
+            "sessions",
+            {
+                "ttl_seconds": ("TTL_SECONDS", float),
+                "max_sessions": ("MAX_SESSIONS", int),
+            },
+            errors,
+        ),
+        dispatcher=_parse_numbers(
+            DispatcherConfig,
+            dispatcher,
+            "dispatcher",
+            {"processes": ("PROCESSES", int)},
+            errors,
+        ),
+        library=LibraryConfig(
+            enabled=bool(library.get("ENABLED", True)),
+            **_parse_numbers(
+                dict,
+                library,
+                "library",
+                {"refresh_minutes": ("REFRESH_MINUTES", float)},
+                errors,
+            ),
+        ),
+        catalogue=CatalogueConfig(
+            enabled=bool(catalogue.get("ENABLED", False)),
+            export_url=catalogue.get(
+                "EXPORT_URL", "https://files.tmdb.org/p/exports"
+            ).rstrip("/"),
+            min_popularity=min_popularity,
+            **_parse_numbers(
+                dict,
+                catalogue,
+                "catalogue",
+                {"refresh_hours": ("REFRESH_HOURS", float)},
+                errors,
+            ),
+        ),
+        details_cache=details_cache_config,
+        downloads=downloads_config,
+        topics=MappingProxyType(dict(topics)),
+        raw=MappingProxyType(raw),
+    )
+
+    if errors:
+        raise ConfigError("Invalid config.json:\n  " + "\n  ".join(errors))
+    return config
+
+
+# Read and validate a config file
+def load_config(path=CONFIG_FILE):
+    if not os.path.isfile(path):
+        raise ConfigError(
+            f"'{path}' not found. Please create the configuration file before starting the bot."
+        )
+    try:
+        with open(path, "r") as config_file:
+            raw = json.load(config_file)
+    except (OSError, ValueError) as e:
+        raise ConfigError(f"Failed to read '{path}': {e}") from e
+    return parse_config(raw)
+
+
+_config = None
+
+
+# The active config, parsed once on first access
+def get_config():
+    global _config
+    if _config is None:
+        _config = load_config()
+    return _config
+
+
+# Replace the active config (e.g. after loading it from another path)
+def set_config(config):
+    global _config
+    _config = config
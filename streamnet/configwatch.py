@@ -0,0 +1,209 @@
+import logging
+import os
+import sys
+from dataclasses import fields
+
+from telegram.ext import CommandHandler, MessageHandler
+
+from streamnet.config import (
+    CONFIG_FILE,
+    CommandsConfig,
+    Config,
+    ConfigError,
+    get_config,
+    load_config,
+    set_config,
+)
+
+logger = logging.getLogger("bot")
+
+# How often config.json is checked for changes
+WATCH_SECONDS = 5
+# Requests still running on the old HTTP session get this long to finish
+SESSION_GRACE_SECONDS = 60
+
+# Sections only read while the bot starts
+RESTART_SECTIONS = (
+    "tracing",
+    "watchdog",
+    "health",
+    "jobs",
+    "leader",
+    "dispatcher",
+)
+# Subsystems that are set up at startup when enabled
+TOGGLED_SECTIONS = (
+    "library",
+    "catalogue",
+    "details_cache",
+    "quota",
+    "downloads",
+    "webhooks",
+)
+
+# (mtime, size) of config.json when it was last read
+_stamp = None
+
+
+def _file_stamp(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+# Names of the sections that differ between two configs
+def changed_sections(old, new):
+    return [
+        section.name
+        for section in fields(Config)
+        if section.name != "raw"
+        and getattr(old, section.name) != getattr(new, section.name)
+    ]
+
+
+# Job: reload config.json when it changed. The new config is validated
+# completely before it replaces the old one in a single assignment, so an
+# update sees either the old or the new config. An invalid file is logged
+# and the bot keeps running with the config it has.
+async def watch_config(context):
+    global _stamp
+    stamp = _file_stamp(CONFIG_FILE)
+    if stamp is None or stamp == _stamp:
+        return
+    _stamp = stamp
+
+    try:
+        new = load_config()
+    except ConfigError as e:
+        logger.error(f"CONFIG RELOAD failed, keeping the current config: {e}")
+        return
+    old = get_config()
+    changed = changed_sections(old, new)
+    if not changed:
+        return
+
+    set_config(new)
+    logger.info(f"CONFIG RELOADED, changed sections: {', '.join(changed)}")
+    apply_changes(context.application, old, new, changed)
+
+
+# Bring everything that copied a setting at startup up to date with the new
+# config; everything else reads the config on each use
+def apply_changes(application, old, new, changed):
+    job_queue = application.job_queue
+    restart = [section for section in RESTART_SECTIONS if section in changed]
+    restart += [
+        section
+        for section in TOGGLED_SECTIONS
+        if getattr(old, section).enabled != getattr(new, section).enabled
+    ]
+    if "bot" in changed:
+        if (old.bot.token, old.bot.log_format, old.bot.callback_secret) != (
+            new.bot.token,
+            new.bot.log_format,
+            new.bot.callback_secret,
+        ):
+            restart.append("bot")
+        if old.bot.log_level != new.bot.log_level:
+            logging.getLogger().setLevel(new.bot.log_level)
+    if (old.webhooks.host, old.webhooks.port) != (new.webhooks.host, new.webhooks.port):
+        restart.append("webhooks")
+    if restart:
+        logger.warning(
+            f"CONFIG changes in {', '.join(restart)} take effect after a restart."
+        )
+
+    upstreams = [s for s in ("tmdb", "sonarr", "radarr") if s in changed]
+    if "circuit_breaker" in changed:
+        upstreams = ["tmdb", "sonarr", "radarr"]
+    if upstreams and "streamnet.httpclient" in sys.modules:
+        httpclient = sys.modules["streamnet.httpclient"]
+        for service in upstreams:
+            httpclient.reset_service(service)
+        # New connections for the new hosts; running requests keep the old ones
+        httpclient.replace_session(SESSION_GRACE_SECONDS)
+
+    arrs = [s for s in ("sonarr", "radarr") if s in changed]
+    if arrs and "streamnet.arr" in sys.modules:
+        arr = sys.modules["streamnet.arr"]
+        arr.clear_quality_profile_cache()
+        for service in arrs:
+            application.create_task(_resolve_quality_profile(arr, service))
+    if arrs and new.library.enabled:
+        _run_now(job_queue, "refresh_library")
+
+    if "nightmode" in changed:
+        # The checker reads the new times; run it now instead of in 5 minutes
+        _run_now(job_queue, "night_mode_checker")
+    if old.library.refresh_minutes != new.library.refresh_minutes:
+        _reschedule(job_queue, "refresh_library", new.library.refresh_minutes * 60)
+    if old.catalogue.refresh_hours != new.catalogue.refresh_hours:
+        _reschedule(job_queue, "refresh_catalogue", new.catalogue.refresh_hours * 3600)
+    if old.downloads.min_poll_seconds != new.downloads.min_poll_seconds:
+        _reschedule(job_queue, "check_downloads", new.downloads.min_poll_seconds)
+    if "quota" in changed and "streamnet.quota" in sys.modules:
+        sys.modules["streamnet.quota"].apply_limits()
+    if "sessions" in changed and "streamnet.sessions" in sys.modules:
+        sys.modules["streamnet.sessions"].apply_limits()
+    if old.quota.persist_seconds != new.quota.persist_seconds:
+        _reschedule(job_queue, "save_quota", new.quota.persist_seconds)
+
+    if "commands" in changed:
+        _rename_commands(application, old.commands, new.commands)
+
+
+# Look up the quality profile of the new Sonarr/Radarr settings right away,
+# instead of on the first request
+async def _resolve_quality_profile(arr, service):
+    settings = getattr(get_config(), service)
+    if not settings.url or not settings.quality_profile_name:
+        return
+    try:
+        await arr.get_quality_profile_id(
+            settings.url,
+            settings.api_key,
+            settings.quality_profile_name,
+            service.capitalize(),
+        )
+    except Exception as e:
+        logger.warning(f"Failed to resolve the {service} quality profile: {e}")
+
+
+def _run_now(job_queue, name):
+    for job in job_queue.get_jobs_by_name(name):
+        job_queue.run_once(job.callback, 0, name=f"{name}_now")
+
+
+def _reschedule(job_queue, name, seconds):
+    for job in job_queue.get_jobs_by_name(name):
+        job.job.reschedule("interval", seconds=seconds)
+        logger.info(f"JOB '{name}' now runs every {seconds:g} seconds.")
+
+
+# Point the command handlers at the new command names
+def _rename_commands(application, old, new):
+    from streamnet.application import bulk_caption_filter
+
+    renamed = {}
+    for command in fields(CommandsConfig):
+        before = getattr(old, command.name)
+        after = getattr(new, command.name)
+        if before != after:
+            renamed[before.lower()] = after.lower()
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            if isinstance(handler, CommandHandler):
+                handler.commands = frozenset(
+                    renamed.get(command, command) for command in handler.commands
+                )
+            elif (
+                isinstance(handler, MessageHandler)
+                and handler.callback.__name__ == "bulk_request"
+            ):
+                handler.filters = bulk_caption_filter(new.bulk)
+    logger.info(
+        "COMMANDS renamed: "
+        + ", ".join(f"/{before} -> /{after}" for before, after in renamed.items())
+    )
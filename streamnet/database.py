@@ -0,0 +1,126 @@
+import logging
+import os
+import sqlite3
+from sqlite3 import Error
+
+from streamnet.tracing import trace_span
+
+logger = logging.getLogger("bot")
+
+DATABASE_DIR = "database"
+DATABASE_FILE = os.path.join(DATABASE_DIR, "group_data.db")
+
+
+# Database initialization
+def init_db(default_language="en"):
+    try:
+        if not os.path.exists(DATABASE_DIR):
+            os.makedirs(DATABASE_DIR)
+
+        with sqlite3.connect(DATABASE_FILE) as conn:
+            cursor = conn.cursor()
+            # Create the tables with the timezone column
+            cursor.execute(
+                """CREATE TABLE IF NOT EXISTS group_data (
+                                id INTEGER PRIMARY KEY,
+                                group_chat_id INTEGER,
+                                group_name TEXT,
+                                message_id INTEGER,
+                                user_id INTEGER,
+                                night_mode_message_id INTEGER,
+                                night_mode_active BOOLEAN DEFAULT 0,
+                                language TEXT
+                              )"""
+            )
+
+            # Check if the table is empty and set the default language, group name, and timezone
+            cursor.execute("SELECT COUNT(*) FROM group_data")
+            count = cursor.fetchone()[0]
+
+            if count == 0:  # Only insert if the table is empty
+                cursor.execute(
+                    """INSERT INTO group_data (group_chat_id, group_name, language, night_mode_active) VALUES (?, ?, ?, ?)""",
+                    (None, "Default Group", default_language, False),
+                )
+
+            conn.commit()
+        logger.info("Database initialized.")
+    except Error as e:
+        logger.error(f"An error occurred: {e}")
+
+
+# Save group chat ID and language to database
+def save_group_data(group_chat_id, group_name, language):
+    with trace_span("db.save_group_data"), sqlite3.connect(DATABASE_FILE) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT OR REPLACE INTO group_data (id, group_chat_id, group_name, language) VALUES (1, ?, ?, ?)",
+            (group_chat_id, group_name, language),
+        )
+        conn.commit()
+
+
+# Load group chat ID and language from database
+def load_group_data(default_language=None):
+    with sqlite3.connect(DATABASE_FILE) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT group_chat_id, language FROM group_data WHERE id=1")
+        row = cursor.fetchone()
+    if row:
+        return row[0], row[1]
+    return None, default_language
+
+
+# Load group name
+def get_group_name(group_chat_id):
+    with trace_span("db.get_group_name"), sqlite3.connect(DATABASE_FILE) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT group_name FROM group_data WHERE group_chat_id = ?",
+            (group_chat_id,),
+        )
+        row = cursor.fetchone()
+        return row[0] if row else "Unknown Group"
+
+
+# Save night mode message ID to database
+def update_night_mode_message_id(group_chat_id, message_id):
+    with trace_span("db.update_night_mode_message_id"), sqlite3.connect(
+        DATABASE_FILE
+    ) as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                """UPDATE group_data SET night_mode_message_id = ? WHERE group_chat_id = ?""",
+                (message_id, group_chat_id),
+            )
+            conn.commit()
+            logger.info(
+                f"Updated NIGHT MODE MESSAGE ID to {message_id} for GROUP CHAT ID: {group_chat_id}."
+            )
+        except Exception as e:
+            logger.error(
+                f"Failed to update NIGHT MODE MESSAGE ID for GROUP CHAT ID: {group_chat_id}. Error: {e}"
+            )
+
+
+# Save whether night mode is active to database
+def set_night_mode_active(group_chat_id, active):
+    with trace_span("db.set_night_mode_active"), sqlite3.connect(DATABASE_FILE) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE group_data SET night_mode_active = ? WHERE group_chat_id = ?",
+            (1 if active else 0, group_chat_id),
+        )
+        conn.commit()
+
+
+def get_night_mode_info(group_chat_id):
+    with trace_span("db.get_night_mode_info"), sqlite3.connect(DATABASE_FILE) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT night_mode_message_id, night_mode_active FROM group_data WHERE group_chat_id = ?",
+            (group_chat_id,),
+        )
+        row = cursor.fetchone()
+        return row if row else (None, False)  # Return None and False if not found
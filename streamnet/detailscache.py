@@ -0,0 +1,82 @@
+import json
+import logging
+import sqlite3
+import time
+
+from streamnet.database import DATABASE_FILE
+from streamnet.tracing import trace_span
+
+logger = logging.getLogger("bot")
+
+
+# Create the table holding TMDB details cards and drop entries older than `max_age`
+def init_details_cache(max_age):
+    with sqlite3.connect(DATABASE_FILE) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """CREATE TABLE IF NOT EXISTS tmdb_details (
+                            media_type TEXT NOT NULL,
+                            tmdb_id INTEGER NOT NULL,
+                            language TEXT NOT NULL,
+                            details TEXT NOT NULL,
+                            fetched_at REAL NOT NULL,
+                            accessed_at REAL NOT NULL,
+                            PRIMARY KEY (media_type, tmdb_id, language)
+                          )"""
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS tmdb_details_accessed_at ON tmdb_details (accessed_at)"
+        )
+        cursor.execute(
+            "DELETE FROM tmdb_details WHERE fetched_at <= ?", (time.time() - max_age,)
+        )
+        conn.commit()
+
+
+# Cached details of a title as (details, age in seconds), or None. Entries
+# older than `max_age` are treated as missing.
+def get_cached_details(media_type, tmdb_id, language, max_age):
+    now = time.time()
+    with trace_span("db.get_cached_details"), sqlite3.connect(DATABASE_FILE) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """SELECT details, fetched_at FROM tmdb_details
+               WHERE media_type = ? AND tmdb_id = ? AND language = ? AND fetched_at > ?""",
+            (media_type, tmdb_id, language, now - max_age),
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        cursor.execute(
+            "UPDATE tmdb_details SET accessed_at = ? WHERE media_type = ? AND tmdb_id = ? AND language = ?",
+            (now, media_type, tmdb_id, language),
+        )
+        conn.commit()
+    return json.loads(row[0]), now - row[1]
+
+
+# Store the details of a title, evicting the least recently used entries
+# once there are more than `max_entries`
+def store_details(media_type, tmdb_id, language, details, max_entries):
+    now = time.time()
+    with trace_span("db.store_details"), sqlite3.connect(DATABASE_FILE) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """INSERT INTO tmdb_details (media_type, tmdb_id, language, details, fetched_at, accessed_at)
+               VALUES (?, ?, ?, ?, ?, ?)
+               ON CONFLICT (media_type, tmdb_id, language) DO UPDATE SET
+                   details = excluded.details, fetched_at = excluded.fetched_at,
+                   accessed_at = excluded.accessed_at""",
+            (media_type, tmdb_id, language, json.dumps(details), now, now),
+        )
+        cursor.execute("SELECT COUNT(*) FROM tmdb_details")
+        excess = cursor.fetchone()[0] - max_entries
+        if excess > 0:
+            cursor.execute(
+                """DELETE FROM tmdb_details WHERE rowid IN (
+                       SELECT rowid FROM tmdb_details ORDER BY accessed_at LIMIT ?
+                   )""",
+                (excess,),
+            )
+            logger.debug(f"Evicted {excess} TMDB details from the cache.")
+        conn.commit()
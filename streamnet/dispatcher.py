@@ -0,0 +1,212 @@
+import asyncio
+import logging
+import multiprocessing
+import queue
+import signal
+import sqlite3
+import zlib
+from contextlib import asynccontextmanager
+
+import telegram.error
+from telegram import Update
+
+from streamnet.config import get_config
+from streamnet.database import DATABASE_FILE
+
+logger = logging.getLogger("bot")
+
+# Long polling timeout of getUpdates in the front process (seconds)
+POLL_TIMEOUT = 30
+# Updates waiting for a worker before the front process stops polling
+QUEUE_SIZE = 1000
+# Seconds the front process waits for room in the queue of a worker before it
+# drops the update, so one stuck worker cannot stop polling for every chat
+PUT_TIMEOUT = 10
+# Seconds between two checks whether the worker processes are still alive
+WORKER_CHECK_SECONDS = 5
+# Seconds a worker gets to finish its queue when the bot stops
+STOP_TIMEOUT = 30
+
+
+# Worker that handles all updates of a chat. Updates of one chat always go to
+# the same worker, which handles them one after another, so their order is kept.
+def shard_for(update, shards):
+    if update.effective_chat is not None:
+        key = update.effective_chat.id
+    elif update.effective_user is not None:
+        key = update.effective_user.id
+    else:
+        key = 0
+    return zlib.crc32(str(key).encode()) % shards
+
+
+# Worker process: the handlers of the bot fed from a queue instead of
+# getUpdates. The subsystems that must only run once are left to the front
+# process.
+def run_worker(number, updates):
+    from streamnet import state
+    from streamnet.application import build_application
+    from streamnet.logs import configure_logging
+
+    config = get_config()
+    configure_logging(
+        config.bot.log_level, config.bot.log_format, config.bot.log_dedupe_seconds
+    )
+    state.initialize_group_data(config.tmdb.default_language)
+    try:
+        asyncio.run(_serve(number, build_application(worker=True), updates))
+    except KeyboardInterrupt:
+        pass
+
+
+# Start an application (with its post_init) without polling, and stop it again
+@asynccontextmanager
+async def _running(application):
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    await application.start()
+    try:
+        yield application
+    finally:
+        await application.stop()
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+
+
+async def _serve(number, application, updates):
+    loop = asyncio.get_running_loop()
+    async with _running(application):
+        logger.info(f"WORKER {number} started.")
+        try:
+            while True:
+                data = await loop.run_in_executor(None, updates.get)
+                if data is None:
+                    break
+                await application.update_queue.put(
+                    Update.de_json(data, application.bot)
+                )
+        finally:
+            logger.info(f"WORKER {number} stopped.")
+
+
+# Front process: poll Telegram and hand every update to the worker of its chat
+async def _poll(bot, queues):
+    loop = asyncio.get_running_loop()
+    offset = None
+    try:
+        while True:
+            try:
+                batch = await bot.get_updates(
+                    offset=offset,
+                    timeout=POLL_TIMEOUT,
+                    allowed_updates=Update.ALL_TYPES,
+                    read_timeout=POLL_TIMEOUT + 10,
+                )
+            except telegram.error.NetworkError as e:
+                logger.warning(f"Polling failed, retrying: {e}")
+                await asyncio.sleep(1)
+                continue
+            for update in batch:
+                shard = shard_for(update, len(queues))
+                try:
+                    # Blocks while the worker is too far behind
+                    await loop.run_in_executor(
+                        None, queues[shard].put, update.to_dict(), True, PUT_TIMEOUT
+                    )
+                except queue.Full:
+                    logger.error(
+                        f"WORKER {shard} is not taking updates, dropped update {update.update_id}."
+                    )
+                offset = update.update_id + 1
+    finally:
+        # Confirm the updates handed to the workers, so Telegram does not send
+        # them again after a restart
+        if offset is not None:
+            try:
+                await bot.get_updates(offset=offset, timeout=0)
+            except telegram.error.TelegramError as e:
+                logger.warning(f"Could not confirm the last updates: {e}")
+
+
+# Run the bot as one polling front process and `processes` worker processes.
+# The front process runs `application` (the full build) without handling
+# updates: its subsystems (database tables, job queue, scheduled jobs, quota
+# cleanup, health and webhook servers, watchdog) run there once, and are up
+# before the workers start.
+def run_dispatcher(application, processes):
+    # Write-ahead logging lets the workers read while another one writes
+    with sqlite3.connect(DATABASE_FILE) as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+
+    try:
+        asyncio.run(_front(application, processes))
+    except KeyboardInterrupt:
+        pass
+
+
+def _spawn(context, number, updates):
+    worker = context.Process(
+        target=run_worker, args=(number, updates), name=f"worker-{number}"
+    )
+    worker.start()
+    return worker
+
+
+# Restart worker processes that died, on their own queue, so the updates
+# waiting for them are handled by the new process
+async def _watch_workers(context, workers, queues):
+    while True:
+        await asyncio.sleep(WORKER_CHECK_SECONDS)
+        for number, worker in enumerate(workers):
+            if worker.is_alive():
+                continue
+            logger.error(
+                f"WORKER {number} died (exit code {worker.exitcode}), restarting it."
+            )
+            # A worker killed while waiting for an update leaves the reader
+            # lock of its queue taken. It was the only reader of the queue, so
+            # the new process gets a fresh lock.
+            queues[number]._rlock = context.Lock()
+            workers[number] = _spawn(context, number, queues[number])
+
+
+async def _front(application, processes):
+    loop = asyncio.get_running_loop()
+    async with _running(application):
+        context = multiprocessing.get_context("spawn")
+        queues = [context.Queue(QUEUE_SIZE) for _ in range(processes)]
+        workers = [
+            _spawn(context, number, queues[number]) for number in range(processes)
+        ]
+        logger.info(f"DISPATCHER started with {processes} worker processes.")
+
+        polling = asyncio.create_task(_poll(application.bot, queues))
+        watching = asyncio.create_task(_watch_workers(context, workers, queues))
+        # Stop polling on SIGTERM (e.g. docker stop) as well as on Ctrl+C, so
+        # the application and the workers are shut down properly
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, polling.cancel)
+        try:
+            await polling
+        except asyncio.CancelledError:
+            pass
+        finally:
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                loop.remove_signal_handler(signum)
+            # Also when the front process itself is cancelled
+            polling.cancel()
+            watching.cancel()
+            await asyncio.gather(polling, watching, return_exceptions=True)
+            logger.info("DISPATCHER stopping workers...")
+            for updates in queues:
+                try:
+                    updates.put(None, timeout=1)
+                except queue.Full:
+                    pass
+            for worker in workers:
+                await loop.run_in_executor(None, worker.join, STOP_TIMEOUT)
+                if worker.is_alive():
+                    logger.warning(f"Terminating {worker.name}.")
+                    worker.terminate()
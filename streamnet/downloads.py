@@ -0,0 +1,249 @@
+import asyncio
+import logging
+import sqlite3
+import time
+
+import aiohttp
+import telegram.error
+
+from streamnet import arr, ledger, rendering
+from streamnet.config import get_config
+from streamnet.database import DATABASE_FILE
+from streamnet.httpclient import ServiceUnavailable
+from streamnet.tracing import trace_span
+
+logger = logging.getLogger("bot")
+
+# Media type of the titles of each service
+SERVICE_MEDIA_TYPES = {"sonarr": "tv", "radarr": "movie"}
+# Fields of the library listing needed to tell whether a title has files
+DOWNLOAD_FIELDS = ("id", "title", "hasFile", "statistics")
+
+# Seconds until the next poll. Starts at downloads.MIN_POLL_SECONDS and
+# doubles (up to MAX_POLL_SECONDS) while none of the titles is downloading.
+_interval = None
+_next_poll_at = 0.0
+# added_at of the newest tracked title seen by the last poll
+_newest_added_at = 0.0
+
+
+# Create the table of titles whose download is being watched
+def init_downloads():
+    with sqlite3.connect(DATABASE_FILE) as conn:
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS downloads (
+                    service TEXT NOT NULL,
+                    item_id INTEGER NOT NULL,
+                    media_type TEXT NOT NULL,
+                    tmdb_id INTEGER NOT NULL,
+                    added_at REAL NOT NULL,
+                    PRIMARY KEY (service, item_id)
+               )"""
+        )
+        conn.commit()
+
+
+# Watch the download of a title the bot added to Sonarr ("sonarr") or Radarr
+# ("radarr"); item_id is its id there. The requester is taken from the ledger.
+# Finished downloads are found by polling or reported through webhooks.
+def track_download(service, item_id, tmdb_id):
+    config = get_config()
+    if not item_id or not (config.downloads.enabled or config.webhooks.enabled):
+        return
+    with trace_span("db.track_download"), sqlite3.connect(DATABASE_FILE) as conn:
+        conn.execute(
+            """INSERT OR REPLACE INTO downloads (service, item_id, media_type, tmdb_id, added_at)
+               VALUES (?, ?, ?, ?, ?)""",
+            (service, item_id, SERVICE_MEDIA_TYPES[service], tmdb_id, time.time()),
+        )
+        conn.commit()
+
+
+def tracked_downloads():
+    with sqlite3.connect(DATABASE_FILE) as conn:
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM downloads")
+        return [dict(row) for row in cursor.fetchall()]
+
+
+# The tracked download of a Sonarr series or Radarr movie, or None
+def find_download(service, item_id):
+    with sqlite3.connect(DATABASE_FILE) as conn:
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT * FROM downloads WHERE service = ? AND item_id = ?",
+            (service, item_id),
+        )
+        row = cursor.fetchone()
+        return dict(row) if row else None
+
+
+def untrack_download(service, item_id):
+    with sqlite3.connect(DATABASE_FILE) as conn:
+        conn.execute(
+            "DELETE FROM downloads WHERE service = ? AND item_id = ?",
+            (service, item_id),
+        )
+        conn.commit()
+
+
+# Job: look for finished downloads. Each poll reads the download queue and the
+# wanted/missing list of Sonarr and Radarr once and, if a title is in neither,
+# the library, whatever the number of titles being watched. Polls follow each
+# other quickly while something is downloading, then less and less often; with
+# nothing to watch there are none.
+async def check_downloads(context):
+    global _interval, _next_poll_at, _newest_added_at
+    settings = get_config().downloads
+    tracked = tracked_downloads()
+    if not tracked:
+        _interval = None
+        return
+
+    now = time.time()
+    newest_added_at = max(row["added_at"] for row in tracked)
+    if newest_added_at > _newest_added_at:
+        # A title was added since the last poll: look at it right away
+        _newest_added_at = newest_added_at
+        _interval = None
+    elif now < _next_poll_at:
+        return
+
+    downloading = await poll_downloads(context.bot, tracked, now)
+    if downloading or _interval is None:
+        _interval = settings.min_poll_seconds
+    else:
+        _interval = min(_interval * 2, settings.max_poll_seconds)
+    # The job runs every MIN_POLL_SECONDS; leave some slack for its jitter
+    _next_poll_at = now + _interval - settings.min_poll_seconds / 2
+
+
+# Check the tracked titles against the queue and wanted/missing lists. Titles
+# in neither list are looked up in the library listing, streamed once per
+# service, to see whether they have been downloaded. Returns whether any of
+# the titles is in the queue.
+async def poll_downloads(bot, tracked, now):
+    config = get_config()
+    give_up_before = now - config.downloads.give_up_days * 86400
+    by_service = {}
+    for row in tracked:
+        by_service.setdefault(row["service"], []).append(row)
+
+    downloading = False
+    for service, rows in by_service.items():
+        if not getattr(config, service).url:
+            continue
+        try:
+            queued, missing = await asyncio.gather(
+                arr.get_queue_ids(service), arr.get_missing_ids(service)
+            )
+            waiting = [
+                row
+                for row in rows
+                if row["item_id"] not in queued and row["item_id"] not in missing
+            ]
+            library = await _library_files(service, waiting) if waiting else {}
+        except ServiceUnavailable as e:
+            logger.warning(f"DOWNLOADS not checked in {service}: {e}")
+            continue
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            logger.error(f"Failed to check DOWNLOADS in {service}: {e}")
+            continue
+
+        for row in rows:
+            item_id = row["item_id"]
+            if item_id in queued or item_id in missing:
+                downloading = downloading or item_id in queued
+            elif await _finished(bot, row, library.get(item_id)):
+                continue
+            if row["added_at"] < give_up_before:
+                logger.info(
+                    f"DOWNLOAD of {service} item {item_id} not finished after "
+                    f"{config.downloads.give_up_days:g} days, no longer watched."
+                )
+                untrack_download(service, item_id)
+    return downloading
+
+
+# Title and whether there are files, from the library listing, for each of
+# the given rows still in the library. Only those entries are kept while the
+# listing is streamed.
+async def _library_files(service, rows):
+    item_ids = {row["item_id"] for row in rows}
+    files = {}
+    async for item in arr.iter_library(service, DOWNLOAD_FIELDS):
+        if item.get("id") not in item_ids:
+            continue
+        if service == "sonarr":
+            has_files = (item.get("statistics") or {}).get("episodeFileCount", 0) > 0
+        else:
+            has_files = bool(item.get("hasFile"))
+        files[item["id"]] = (item.get("title", ""), has_files)
+    return files
+
+
+# Whether a title that is neither queued nor missing has been downloaded; if
+# so, tell the requester. `files` is its (title, has files) from the library,
+# None if it was deleted. Sonarr may also not know its episodes yet.
+async def _finished(bot, row, files):
+    if files is None:
+        logger.info(
+            f"{row['service']} item {row['item_id']} was deleted, no longer watched."
+        )
+        untrack_download(row["service"], row["item_id"])
+        return True
+    title, has_files = files
+    if not has_files:
+        return False
+
+    await finish_download(bot, row, title)
+    return True
+
+
+# Stop watching a downloaded title, mark its request as downloaded and tell
+# the requester
+async def finish_download(bot, row, title):
+    untrack_download(row["service"], row["item_id"])
+    ledger.set_request_status(row["media_type"], row["tmdb_id"], ledger.DOWNLOADED)
+    request = ledger.find_request(row["media_type"], row["tmdb_id"])
+    title = (request or {}).get("title") or title
+    logger.info(f"DOWNLOAD of '{title}' finished in {row['service']}.")
+    if request and request["user_id"]:
+        await notify_requester(bot, request, title)
+
+
+# Send the requester a direct message. Users who never started a chat with the
+# bot cannot get one; they are mentioned in the chat of the request instead.
+async def notify_requester(bot, request, title):
+    template = (
+        "series_downloaded" if request["media_type"] == "tv" else "movie_downloaded"
+    )
+    try:
+        await bot.send_message(
+            chat_id=request["user_id"],
+            text=rendering.render(template, title=title),
+            parse_mode=rendering.PARSE_MODE,
+        )
+        return
+    except (telegram.error.Forbidden, telegram.error.BadRequest) as e:
+        logger.info(f"No direct message to USER {request['user_id']} possible: {e}")
+    except telegram.error.TelegramError as e:
+        logger.error(f"Failed to notify USER {request['user_id']}: {e}")
+        return
+    if not request["chat_id"] or request["chat_id"] == request["user_id"]:
+        return
+    try:
+        await bot.send_message(
+            chat_id=request["chat_id"],
+            text=rendering.render(
+                "download_ready_mention",
+                name=f"@{request['username']}" if request["username"] else "Hey",
+                user_id=request["user_id"],
+                title=title,
+            ),
+            parse_mode=rendering.PARSE_MODE,
+        )
+    except telegram.error.TelegramError as e:
+        logger.error(f"Failed to notify USER {request['user_id']}: {e}")
@@ -0,0 +1,22 @@
+import logging
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from streamnet.httpclient import ServiceUnavailable, service_unavailable_text
+
+logger = logging.getLogger("bot")
+
+
+# Error handler: tell the user when an upstream service is unavailable and log
+# everything else
+async def handle_error(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
+    error = context.error
+    if isinstance(error, ServiceUnavailable):
+        logger.warning(f"Update not handled: {error}")
+        if isinstance(update, Update) and update.effective_message:
+            await update.effective_message.reply_text(
+                service_unavailable_text(error.service)
+            )
+        return
+    logger.error("Exception while handling an update", exc_info=error)
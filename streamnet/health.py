@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import socket
+import time
+
+from aiohttp import web
+
+from streamnet import arr
+from streamnet.config import get_config
+from streamnet.httpclient import request
+
+logger = logging.getLogger("bot")
+
+# Dependency -> latest result: {"ok", "latency_ms", "detail", "checked_at"}.
+# Empty until the preflight has finished.
+_results = {}
+_started_at = time.monotonic()
+_runner = None
+
+
+# Raised by a check when the dependency answered, but not as expected
+class CheckFailed(Exception):
+    pass
+
+
+async def _check_telegram(application):
+    me = await application.bot.get_me()
+    return f"@{me.username}"
+
+
+async def _check_tmdb(application):
+    tmdb = get_config().tmdb
+    async with request(
+        "tmdb", "GET", f"{tmdb.api_url}/configuration", params={"api_key": tmdb.api_key}
+    ) as response:
+        if response.status == 401:
+            raise CheckFailed("API key rejected")
+        response.raise_for_status()
+    return "authenticated"
+
+
+# Sonarr/Radarr: reachable, API key accepted and the quality profile exists
+async def _check_arr(service):
+    settings = getattr(get_config(), service)
+    async with request(
+        service,
+        "GET",
+        f"{settings.url}/api/v3/system/status",
+        params={"apikey": settings.api_key},
+    ) as response:
+        if response.status == 401:
+            raise CheckFailed("API key rejected")
+        response.raise_for_status()
+        status = await response.json()
+    profile_id = await arr.get_quality_profile_id(
+        settings.url,
+        settings.api_key,
+        settings.quality_profile_name,
+        service.capitalize(),
+    )
+    if profile_id is None:
+        raise CheckFailed(
+            f"quality profile '{settings.quality_profile_name}' not found"
+        )
+    return f"version {status.get('version')}, quality profile {profile_id}"
+
+
+async def _check_sonarr(application):
+    return await _check_arr("sonarr")
+
+
+async def _check_radarr(application):
+    return await _check_arr("radarr")
+
+
+# Dependency -> check; a check returns a short description or raises
+CHECKS = {
+    "telegram": _check_telegram,
+    "tmdb": _check_tmdb,
+    "sonarr": _check_sonarr,
+    "radarr": _check_radarr,
+}
+
+
+async def _run_check(name, check, application, timeout):
+    started = time.perf_counter()
+    try:
+        detail = await asyncio.wait_for(check(application), timeout)
+        ok = True
+    except asyncio.TimeoutError:
+        ok, detail = False, f"no answer within {timeout:g} s"
+    except Exception as e:
+        ok, detail = False, str(e) or type(e).__name__
+    return name, {
+        "ok": ok,
+        "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+        "detail": detail,
+        "checked_at": time.time(),
+    }
+
+
+# Check all dependencies at the same time, each with its own timeout.
+# Sonarr/Radarr are skipped when they are not configured.
+async def check_dependencies(application):
+    config = get_config()
+    checks = {
+        name: check
+        for name, check in CHECKS.items()
+        if name not in ("sonarr", "radarr") or getattr(config, name).url
+    }
+    results = await asyncio.gather(
+        *(
+            _run_check(name, check, application, config.health.check_timeout_seconds)
+            for name, check in checks.items()
+        )
+    )
+    _results.clear()
+    _results.update(results)
+    return dict(results)
+
+
+# Job run once at startup: check everything and log the outcome. Failures do
+# not stop the bot, they show up in the log and on the readiness endpoint.
+async def preflight(context):
+    started = time.perf_counter()
+    results = await check_dependencies(context.application)
+    for name, result in results.items():
+        if result["ok"]:
+            logger.info(
+                f"PREFLIGHT {name} OK in {result['latency_ms']:g} ms: {result['detail']}"
+            )
+        else:
+            logger.error(
+                f"PREFLIGHT {name} FAILED after {result['latency_ms']:g} ms: {result['detail']}"
+            )
+    logger.info(
+        f"PREFLIGHT finished in {(time.perf_counter() - started) * 1000:.0f} ms"
+    )
+
+
+# Job: check the dependencies again every health.INTERVAL_SECONDS
+async def check_health(context):
+    await check_dependencies(context.application)
+
+
+# Whether every dependency passed its last check
+def is_ready():
+    return bool(_results) and all(result["ok"] for result in _results.values())
+
+
+# GET /health/live: the event loop is answering
+async def _live(request):
+    return web.json_response(
+        {"status": "alive", "uptime_seconds": round(time.monotonic() - _started_at)}
+    )
+
+
+# GET /health/ready: 200 when all dependencies are fine, 503 otherwise
+async def _ready(request):
+    if not _results:
+        return web.json_response({"status": "starting", "checks": {}}, status=503)
+    ready = is_ready()
+    return web.json_response(
+        {"status": "ready" if ready else "not ready", "checks": _results},
+        status=200 if ready else 503,
+    )
+
+
+# Serve the health endpoints. With worker processes only the front process
+# serves them; instances on the same host share the port (SO_REUSEPORT).
+async def start_health_server(host, port):
+    global _runner
+    app = web.Application()
+    app.router.add_get("/health/live", _live)
+    app.router.add_get("/health/ready", _ready)
+    _runner = web.AppRunner(app, access_log=None)
+    await _runner.setup()
+    site = web.TCPSite(_runner, host, port, reuse_port=hasattr(socket, "SO_REUSEPORT"))
+    await site.start()
+    logger.info(f"HEALTH endpoint listening on http://{host}:{port}/health/ready")
+
+
+async def stop_health_server():
+    global _runner
+    if _runner is not None:
+        await _runner.cleanup()
+        _runner = None
@@ -0,0 +1,135 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import aiohttp
+
+from streamnet.circuitbreaker import CircuitBreaker
+from streamnet.config import get_config
+
+# Display names of the upstream services, used in messages to users
+SERVICE_NAMES = {"tmdb": "TMDB", "sonarr": "Sonarr", "radarr": "Radarr"}
+
+_session = None
+# Replaced sessions that are still finishing their requests
+_retired = set()
+_breakers = {}
+_timeouts = {}
+
+
+# Raised instead of calling an upstream whose circuit breaker is open
+class ServiceUnavailable(aiohttp.ClientError):
+    def __init__(self, service):
+        super().__init__(f"{SERVICE_NAMES.get(service, service)} is unavailable")
+        self.service = service
+
+
+# Message shown to users when a service is unavailable
+def service_unavailable_text(service):
+    name = SERVICE_NAMES.get(service, service)
+    return f"⚠️ {name} ist gerade nicht erreichbar. Bitte versuche es in ein paar Minuten erneut."
+
+
+# Shared aiohttp session for TMDB, Sonarr and Radarr, created on first use
+def get_session():
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession()
+    return _session
+
+
+# Close the shared session (called when the application shuts down)
+async def close_session():
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+    for session in list(_retired):
+        await session.close()
+    _retired.clear()
+
+
+# Start a new session for the requests from now on (e.g. after the upstream
+# URLs changed). Requests still running on the old session finish first; it
+# is closed after `grace_seconds`.
+def replace_session(grace_seconds=60):
+    global _session
+    old, _session = _session, None
+    if old is None or old.closed:
+        return
+
+    async def close_later():
+        await asyncio.sleep(grace_seconds)
+        _retired.discard(old)
+        await old.close()
+
+    _retired.add(old)
+
+    asyncio.get_running_loop().create_task(close_later())
+
+
+# Forget the circuit breaker and timeouts of a service, so they are created
+# again from the current config
+def reset_service(service):
+    _breakers.pop(service, None)
+    _timeouts.pop(service, None)
+
+
+# The circuit breaker of a service ("tmdb", "sonarr" or "radarr")
+def get_breaker(service):
+    if service not in _breakers:
+        settings = get_config().circuit_breaker
+        _breakers[service] = CircuitBreaker(
+            service,
+            window=settings.window_seconds,
+            min_calls=settings.min_calls,
+            error_rate=settings.error_rate,
+            open_seconds=settings.open_seconds,
+        )
+    return _breakers[service]
+
+
+# State of every circuit breaker used so far, for monitoring
+def breaker_states():
+    return {service: breaker.snapshot() for service, breaker in _breakers.items()}
+
+
+# Connect and read timeouts of a service, from its config section
+def get_timeout(service):
+    if service not in _timeouts:
+        upstream = getattr(get_config(), service)
+        _timeouts[service] = aiohttp.ClientTimeout(
+            total=None,
+            connect=upstream.connect_timeout,
+            sock_read=upstream.read_timeout,
+        )
+    return _timeouts[service]
+
+
+# Make a request to an upstream service through its circuit breaker and with
+# its timeouts. Connection errors, timeouts and 5xx responses count as failures.
+# Raises ServiceUnavailable without making the request while the breaker is open.
+@asynccontextmanager
+async def request(service, method, url, **kwargs):
+    breaker = get_breaker(service)
+    ticket = breaker.allow()
+    if ticket is None:
+        raise ServiceUnavailable(service)
+
+    ok = None
+    try:
+        async with get_session().request(
+            method, url, timeout=get_timeout(service), **kwargs
+        ) as response:
+            ok = response.status < 500
+            yield response
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        # A caller's raise_for_status() on a 4xx is not a failure of the
+        # service; errors while connecting or reading are
+        if not (isinstance(e, aiohttp.ClientResponseError) and e.status < 500):
+            ok = False
+        raise
+    finally:
+        if ok is None:
+            breaker.release(ticket)  # cancelled before there was an outcome
+        else:
+            breaker.record(ticket, ok)
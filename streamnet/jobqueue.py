@@ -0,0 +1,427 @@
+import asyncio
+import importlib
+import json
+import logging
+import os
+import random
+import socket
+import sqlite3
+import time
+import uuid
+
+import aiohttp
+import telegram.error
+
+from streamnet import rendering
+from streamnet.config import get_config
+from streamnet.database import DATABASE_FILE
+from streamnet.tracing import trace_span
+
+logger = logging.getLogger("bot")
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Job kind -> (module, coroutine) that carries it out. The coroutine receives the
+# job payload and returns the text sent to the requester.
+JOB_HANDLERS = {
+    "add_series": ("streamnet.media", "add_series_to_sonarr"),
+    "add_movie": ("streamnet.media", "add_movie_to_radarr"),
+}
+
+# How often idle workers look for jobs whose retry time has come
+POLL_INTERVAL = 5.0
+# Finished jobs are kept this long so repeated requests are recognised
+KEEP_FINISHED_SECONDS = 30 * 24 * 3600
+# Running jobs are marked alive this often by the process running them...
+HEARTBEAT_INTERVAL = 15.0
+# ...and handed to another worker once their last mark is older than this
+STALE_SECONDS = 60.0
+# Pause of a worker after an error outside of a job (e.g. "database is locked")
+WORKER_ERROR_BACKOFF = 5.0
+
+# Marks the jobs claimed by this process
+OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+# Raised by a job handler for errors worth retrying (upstream down, 5xx, ...)
+class RetryableJobError(Exception):
+    pass
+
+
+# Raised by a job handler when retrying cannot help; the message goes to the requester
+class JobFailed(Exception):
+    pass
+
+
+# Create the jobs table and requeue jobs whose process stopped while running them
+def init_job_queue():
+    now = time.time()
+    with sqlite3.connect(DATABASE_FILE) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                            id INTEGER PRIMARY KEY,
+                            kind TEXT NOT NULL,
+                            idempotency_key TEXT NOT NULL UNIQUE,
+                            payload TEXT NOT NULL,
+                            chat_id INTEGER,
+                            user_id INTEGER,
+                            message_id INTEGER,
+                            status TEXT NOT NULL,
+                            attempts INTEGER NOT NULL DEFAULT 0,
+                            next_run_at REAL NOT NULL,
+                            last_error TEXT,
+                            created_at REAL NOT NULL,
+                            updated_at REAL NOT NULL,
+                            owner TEXT,
+                            heartbeat_at REAL
+                          )"""
+        )
+        # Tables created before jobs had owners
+        cursor.execute("PRAGMA table_info(jobs)")
+        columns = {row[1] for row in cursor.fetchall()}
+        for column, kind in (("owner", "TEXT"), ("heartbeat_at", "REAL")):
+            if column not in columns:
+                cursor.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_due ON jobs (status, next_run_at)"
+        )
+        cursor.execute(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+            (DONE, FAILED, now - KEEP_FINISHED_SECONDS),
+        )
+        conn.commit()
+    requeue_stale_jobs()
+
+
+# Requeue running jobs whose process has not marked them alive for
+# STALE_SECONDS (it stopped or crashed). Jobs of live processes, including
+# other workers and replicas, are left alone.
+def requeue_stale_jobs():
+    now = time.time()
+    with sqlite3.connect(DATABASE_FILE) as conn:
+        cursor = conn.execute(
+            """UPDATE jobs SET status = ?, owner = NULL, updated_at = ?
+               WHERE status = ? AND COALESCE(heartbeat_at, updated_at) < ?""",
+            (QUEUED, now, RUNNING, now - STALE_SECONDS),
+        )
+        requeued = cursor.rowcount
+        conn.commit()
+    if requeued:
+        logger.info(f"Requeued {requeued} interrupted JOBS.")
+    return requeued
+
+
+# Mark the given running jobs of this process as alive
+def heartbeat_jobs(job_ids):
+    if not job_ids:
+        return
+    placeholders = ", ".join("?" * len(job_ids))
+    with sqlite3.connect(DATABASE_FILE) as conn:
+        conn.execute(
+            f"""UPDATE jobs SET heartbeat_at = ?
+                WHERE status = ? AND owner = ? AND id IN ({placeholders})""",
+            (time.time(), RUNNING, OWNER, *job_ids),
+        )
+        conn.commit()
+
+
+# Add a job unless one with the same idempotency key is already queued or
+# running. A finished job with the same key is queued again (its handler checks
+# the library first). Returns (job id, status) where status is the state of the
+# job before this call (None if it was created).
+def enqueue_job(kind, idempotency_key, payload, chat_id, user_id, message_id=None):
+    now = time.time()
+    with trace_span("db.enqueue_job"), sqlite3.connect(DATABASE_FILE) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT id, status FROM jobs WHERE idempotency_key = ?",
+            (idempotency_key,),
+        )
+        row = cursor.fetchone()
+        if row and row[1] in (QUEUED, RUNNING):
+            return row[0], row[1]
+
+        if row:
+            cursor.execute(
+                """UPDATE jobs SET payload = ?, chat_id = ?, user_id = ?, message_id = ?, status = ?,
+                   attempts = 0, next_run_at = ?, last_error = NULL, updated_at = ? WHERE id = ?""",
+                (
+                    json.dumps(payload),
+                    chat_id,
+                    user_id,
+                    message_id,
+                    QUEUED,
+                    now,
+                    now,
+                    row[0],
+                ),
+            )
+            job_id = row[0]
+        else:
+            cursor.execute(
+                """INSERT INTO jobs (kind, idempotency_key, payload, chat_id, user_id, message_id,
+                   status, next_run_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (
+                    kind,
+                    idempotency_key,
+                    json.dumps(payload),
+                    chat_id,
+                    user_id,
+                    message_id,
+                    QUEUED,
+                    now,
+                    now,
+                    now,
+                ),
+            )
+            job_id = cursor.lastrowid
+        conn.commit()
+
+    if _pool is not None:
+        _pool.wake()
+    return job_id, row[1] if row else None
+
+
+# Claim the next due job for a worker. Returns the job row as a dict or None.
+def claim_next_job():
+    now = time.time()
+    with sqlite3.connect(DATABASE_FILE) as conn:
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        while True:
+            cursor.execute(
+                "SELECT * FROM jobs WHERE status = ? AND next_run_at <= ? ORDER BY next_run_at, id LIMIT 1",
+                (QUEUED, now),
+            )
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            # Only succeeds for one worker, even across processes
+            cursor.execute(
+                """UPDATE jobs SET status = ?, attempts = attempts + 1, owner = ?, heartbeat_at = ?,
+                   updated_at = ? WHERE id = ? AND status = ?""",
+                (RUNNING, OWNER, now, now, row["id"], QUEUED),
+            )
+            conn.commit()
+            if cursor.rowcount == 1:
+                job = dict(row, status=RUNNING, owner=OWNER, heartbeat_at=now)
+                job["attempts"] += 1
+                job["payload"] = json.loads(job["payload"])
+                return job
+
+
+# Seconds until the next queued job is due (None if there is none)
+def next_job_delay():
+    with sqlite3.connect(DATABASE_FILE) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT MIN(next_run_at) FROM jobs WHERE status = ?", (QUEUED,))
+        next_run_at = cursor.fetchone()[0]
+    if next_run_at is None:
+        return None
+    return max(0.0, next_run_at - time.time())
+
+
+def finish_job(job_id, status, error=None):
+    with sqlite3.connect(DATABASE_FILE) as conn:
+        conn.execute(
+            "UPDATE jobs SET status = ?, last_error = ?, owner = NULL, updated_at = ? WHERE id = ?",
+            (status, error, time.time(), job_id),
+        )
+        conn.commit()
+
+
+def retry_job(job_id, delay, error):
+    now = time.time()
+    with sqlite3.connect(DATABASE_FILE) as conn:
+        conn.execute(
+            """UPDATE jobs SET status = ?, next_run_at = ?, last_error = ?, owner = NULL, updated_at = ?
+               WHERE id = ?""",
+            (QUEUED, now + delay, error, now, job_id),
+        )
+        conn.commit()
+
+
+# Number of jobs per state
+def job_counts():
+    with sqlite3.connect(DATABASE_FILE) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")
+        return dict(cursor.fetchall())
+
+
+# Exponential backoff with jitter for the given attempt (1-based)
+def retry_delay(attempt, base, maximum):
+    delay = min(maximum, base * 2 ** (attempt - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+# Runs queued jobs with a fixed number of asyncio workers
+class JobWorkerPool:
+    def __init__(self, bot, workers=2, max_attempts=5, retry_base=30, retry_max=1800):
+        self.bot = bot
+        self.workers = max(1, int(workers))
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self._wakeup = asyncio.Event()
+        self._tasks = []
+        self._handlers = {}
+        # Ids of the jobs the workers are running
+        self._running = set()
+
+    def start(self):
+        for number in range(self.workers):
+            self._tasks.append(
+                asyncio.create_task(self._worker(), name=f"job-worker-{number}")
+            )
+        self._tasks.append(asyncio.create_task(self._heartbeat(), name="job-heartbeat"))
+        logger.info(f"JOB QUEUE started with {self.workers} workers.")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    # Wake idle workers after a job was queued
+    def wake(self):
+        self._wakeup.set()
+
+    def _handler(self, kind):
+        if kind not in self._handlers:
+            module_name, name = JOB_HANDLERS[kind]
+            self._handlers[kind] = getattr(importlib.import_module(module_name), name)
+        return self._handlers[kind]
+
+    async def _worker(self):
+        while True:
+            try:
+                await self._work_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # e.g. "database is locked" while another process writes
+                logger.exception("JOB WORKER error, retrying")
+                await asyncio.sleep(WORKER_ERROR_BACKOFF)
+
+    # Run the next due job, or wait until one is queued or becomes due
+    async def _work_once(self):
+        # Cleared before claiming, so a job queued in between still wakes us
+        self._wakeup.clear()
+        job = claim_next_job()
+        if job is None:
+            delay = next_job_delay()
+            timeout = POLL_INTERVAL if delay is None else min(delay, POLL_INTERVAL)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            return
+        self._running.add(job["id"])
+        try:
+            await self._run(job)
+        finally:
+            self._running.discard(job["id"])
+
+    # Keep the jobs of this process marked alive and take over the jobs of
+    # processes that stopped
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            try:
+                heartbeat_jobs(list(self._running))
+                if requeue_stale_jobs():
+                    self.wake()
+            except sqlite3.Error as e:
+                logger.error(f"Failed to mark running JOBS alive: {e}")
+
+    async def _run(self, job):
+        job_id, kind = job["id"], job["kind"]
+        try:
+            text = await self._handler(kind)(job["payload"])
+        except asyncio.CancelledError:
+            # Shutting down: leave the job to be picked up after the restart
+            retry_job(job_id, 0, "interrupted")
+            raise
+        except JobFailed as e:
+            logger.error(f"JOB {job_id} ({kind}) failed: {e}")
+            finish_job(job_id, FAILED, str(e))
+            await self._notify(job, str(e))
+            return
+        except (RetryableJobError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+            error = str(e) or type(e).__name__
+        except Exception as e:
+            logger.exception(f"Unexpected error in JOB {job_id} ({kind})")
+            error = str(e) or type(e).__name__
+        else:
+            finish_job(job_id, DONE)
+            logger.info(f"JOB {job_id} ({kind}) done after {job['attempts']} attempts.")
+            await self._notify(job, text)
+            return
+
+        if job["attempts"] >= self.max_attempts:
+            logger.error(
+                f"JOB {job_id} ({kind}) failed after {job['attempts']} attempts: {error}"
+            )
+            finish_job(job_id, FAILED, error)
+            title = job["payload"].get("title", "")
+            await self._notify(job, rendering.render("request_failed", title=title))
+            return
+
+        delay = retry_delay(job["attempts"], self.retry_base, self.retry_max)
+        logger.warning(
+            f"JOB {job_id} ({kind}) attempt {job['attempts']} failed: {error}. Retrying in {delay:.0f} s."
+        )
+        retry_job(job_id, delay, error)
+
+    # Tell the requester how the job ended, by editing the acknowledgement if possible
+    async def _notify(self, job, text):
+        if not job["chat_id"] or not text:
+            return
+        try:
+            if job["message_id"]:
+                try:
+                    await self.bot.edit_message_text(
+                        text,
+                        chat_id=job["chat_id"],
+                        message_id=job["message_id"],
+                        parse_mode=rendering.PARSE_MODE,
+                    )
+                    return
+                except telegram.error.BadRequest:
+                    pass  # deleted or too old, send a new message instead
+            await self.bot.send_message(
+                chat_id=job["chat_id"], text=text, parse_mode=rendering.PARSE_MODE
+            )
+        except telegram.error.TelegramError as e:
+            logger.error(f"Failed to notify about JOB {job['id']}: {e}")
+
+
+_pool = None
+
+
+# Start the worker pool (called once the application is initialised)
+async def start_workers(application):
+    global _pool
+    init_job_queue()
+    jobs = get_config().jobs
+    _pool = JobWorkerPool(
+        application.bot,
+        workers=jobs.workers,
+        max_attempts=jobs.max_attempts,
+        retry_base=jobs.retry_base_seconds,
+        retry_max=jobs.retry_max_seconds,
+    )
+    _pool.start()
+
+
+async def stop_workers():
+    global _pool
+    if _pool is not None:
+        await _pool.stop()
+        _pool = None
@@ -0,0 +1,69 @@
+import codecs
+import json
+import re
+
+# Bytes read from the response at a time
+CHUNK_SIZE = 64 * 1024
+# Largest single array item accepted; guards against buffering a whole
+# malformed body while waiting for an item to complete
+MAX_ITEM_SIZE = 16 * 1024 * 1024
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+# Parse a JSON array from a stream (e.g. aiohttp's response.content) one item
+# at a time. Only the current chunk and the item being parsed are held in
+# memory, so memory use does not grow with the length of the array. With
+# `fields`, each item is reduced to those keys right after it is parsed.
+async def iter_array(stream, fields=None, chunk_size=CHUNK_SIZE):
+    decode = codecs.getincrementaldecoder("utf-8")().decode
+    buffer = ""
+    pos = 0
+    opened = False
+    eof = False
+    while True:
+        while True:
+            pos = _WHITESPACE.match(buffer, pos).end()
+            if pos == len(buffer):
+                break
+            char = buffer[pos]
+            if not opened:
+                if char != "[":
+                    raise ValueError(f"Expected a JSON array, got {char!r}")
+                opened = True
+                pos += 1
+            elif char == ",":
+                pos += 1
+            elif char == "]":
+                return
+            else:
+                try:
+                    item, end = _decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    break  # the item continues in the next chunk
+                # Only take the item once its delimiter is there: a number at
+                # the end of the buffer ("15" of "1500.0") might continue
+                follow = _WHITESPACE.match(buffer, end).end()
+                if follow == len(buffer) or buffer[follow] not in ",]":
+                    if eof:
+                        raise ValueError("Malformed JSON array")
+                    break
+                pos = end
+                if fields is not None and isinstance(item, dict):
+                    item = {key: item[key] for key in fields if key in item}
+                yield item
+
+        if eof:
+            raise ValueError("JSON array ended unexpectedly")
+        if len(buffer) - pos > MAX_ITEM_SIZE:
+            raise ValueError(f"JSON array item larger than {MAX_ITEM_SIZE} bytes")
+        chunk = await stream.read(chunk_size)
+        if chunk:
+            buffer = buffer[pos:] + decode(chunk)
+        else:
+            eof = True
+            buffer = buffer[pos:] + decode(b"", final=True)
+        pos = 0
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import os
+import socket
+import sqlite3
+import time
+import uuid
+
+from streamnet.config import get_config
+from streamnet.database import DATABASE_FILE
+
+logger = logging.getLogger("bot")
+
+# Name of the lease that decides which instance runs the scheduled jobs
+SCHEDULER_LEASE = "scheduler"
+
+
+# Leases in the shared SQLite database. Another store (e.g. a lock service)
+# can be used instead by implementing acquire() and release().
+class SQLiteLeaseStore:
+    def __init__(self, path=DATABASE_FILE):
+        self.path = path
+        with sqlite3.connect(self.path) as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS leases (
+                                name TEXT PRIMARY KEY,
+                                holder TEXT NOT NULL,
+                                expires_at REAL NOT NULL,
+                                acquired_at REAL NOT NULL
+                              )"""
+            )
+            conn.commit()
+
+    # Take or renew the lease for `seconds`. Succeeds if nobody holds it, if
+    # `holder` already holds it, or if the previous holder let it expire.
+    def acquire(self, name, holder, seconds):
+        now = time.time()
+        with sqlite3.connect(self.path) as conn:
+            cursor = conn.execute(
+                """INSERT INTO leases (name, holder, expires_at, acquired_at) VALUES (?, ?, ?, ?)
+                   ON CONFLICT (name) DO UPDATE SET holder = excluded.holder,
+                       expires_at = excluded.expires_at,
+                       acquired_at = CASE WHEN leases.holder = excluded.holder
+                                          THEN leases.acquired_at ELSE excluded.acquired_at END
+                   WHERE leases.holder = excluded.holder OR leases.expires_at < ?""",
+                (name, holder, now + seconds, now, now),
+            )
+            conn.commit()
+            return cursor.rowcount == 1
+
+    # Give up the lease so another instance can take over right away
+    def release(self, name, holder):
+        with sqlite3.connect(self.path) as conn:
+            conn.execute(
+                "DELETE FROM leases WHERE name = ? AND holder = ?", (name, holder)
+            )
+            conn.commit()
+
+
+# Keeps trying to hold a lease and renews it while held. The instance counts
+# as leader only until its last successful renewal plus the lease time, minus
+# one renewal interval as a safety margin, so two instances never both believe
+# they lead.
+class LeaderElection:
+    def __init__(self, store, name, lease_seconds=30, renew_seconds=10):
+        self.store = store
+        self.name = name
+        self.lease_seconds = lease_seconds
+        self.renew_seconds = renew_seconds
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._valid_until = 0.0
+        self._task = None
+
+    @property
+    def is_leader(self):
+        return time.monotonic() < self._valid_until
+
+    # One acquire/renew attempt; logs when leadership changes
+    def campaign(self):
+        was_leader = self.is_leader
+        started = time.monotonic()
+        try:
+            acquired = self.store.acquire(self.name, self.holder, self.lease_seconds)
+        except sqlite3.Error as e:
+            logger.error(f"Failed to renew LEADER LEASE '{self.name}': {e}")
+            acquired = False
+        if acquired:
+            self._valid_until = started + self.lease_seconds - self.renew_seconds
+        if acquired and not was_leader:
+            logger.info(f"LEADER LEASE '{self.name}' acquired by '{self.holder}'")
+        elif was_leader and not self.is_leader:
+            logger.warning(f"LEADER LEASE '{self.name}' lost by '{self.holder}'")
+        return acquired
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.renew_seconds)
+            self.campaign()
+
+    def start(self):
+        self.campaign()
+        self._task = asyncio.create_task(self._run(), name=f"lease-{self.name}")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.is_leader:
+            self._valid_until = 0.0
+            self.store.release(self.name, self.holder)
+            logger.info(f"LEADER LEASE '{self.name}' released by '{self.holder}'")
+
+
+_election = None
+
+
+# Whether this instance runs the scheduled jobs
+def is_leader():
+    return _election is not None and _election.is_leader
+
+
+# Wrap a job callback so it only runs on the leader
+def leader_only(callback):
+    async def job(context):
+        if is_leader():
+            return await callback(context)
+
+    job.__name__ = job.__qualname__ = callback.__name__
+    return job
+
+
+# Start campaigning for the scheduler lease (called once the application is initialised)
+async def start_election(application):
+    global _election
+    settings = get_config().leader
+    _election = LeaderElection(
+        SQLiteLeaseStore(),
+        SCHEDULER_LEASE,
+        lease_seconds=settings.lease_seconds,
+        renew_seconds=settings.renew_seconds,
+    )
+    _election.start()
+
+
+async def stop_election():
+    global _election
+    if _election is not None:
+        await _election.stop()
+        _election = None
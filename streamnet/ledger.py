@@ -0,0 +1,160 @@
+import logging
+import sqlite3
+import time
+
+from streamnet.database import DATABASE_FILE
+from streamnet.tracing import trace_span
+
+logger = logging.getLogger("bot")
+
+# Request states. "requested" covers queued and running adds; a request whose
+# job has failed is reported as "failed".
+REQUESTED = "requested"
+ADDED = "added"
+AVAILABLE = "available"  # was already in Sonarr/Radarr when the job ran
+DOWNLOADED = "downloaded"  # added by the bot and downloaded since
+REMOVED = "removed"  # deleted from Sonarr/Radarr since, can be requested again
+FAILED = "failed"
+
+# States in which a new request for the same title is answered from the ledger
+SETTLED = (REQUESTED, ADDED, AVAILABLE, DOWNLOADED)
+
+_SELECT = """SELECT r.id, r.media_type, r.tmdb_id, r.tvdb_id, r.title, r.user_id, r.username,
+                    r.chat_id, r.job_id, r.request_count, r.requested_at, r.updated_at,
+                    CASE WHEN r.status = 'requested' AND j.status = 'failed'
+                         THEN 'failed' ELSE r.status END AS status
+             FROM requests r LEFT JOIN jobs j ON j.id = r.job_id"""
+
+
+# Create the ledger table and its indexes
+def init_ledger():
+    with sqlite3.connect(DATABASE_FILE) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """CREATE TABLE IF NOT EXISTS requests (
+                            id INTEGER PRIMARY KEY,
+                            media_type TEXT NOT NULL,
+                            tmdb_id INTEGER NOT NULL,
+                            tvdb_id INTEGER,
+                            title TEXT,
+                            user_id INTEGER,
+                            username TEXT,
+                            chat_id INTEGER,
+                            status TEXT NOT NULL,
+                            job_id INTEGER,
+                            request_count INTEGER NOT NULL DEFAULT 1,
+                            requested_at REAL NOT NULL,
+                            updated_at REAL NOT NULL,
+                            UNIQUE (media_type, tmdb_id)
+                          )"""
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS requests_tvdb_id ON requests (tvdb_id)"
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS requests_updated_at ON requests (updated_at)"
+        )
+        conn.commit()
+
+
+# The ledger entry of a title, or None if it was never requested
+def find_request(media_type, tmdb_id):
+    with trace_span("db.find_request"), sqlite3.connect(DATABASE_FILE) as conn:
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute(
+            f"{_SELECT} WHERE r.media_type = ? AND r.tmdb_id = ?",
+            (media_type, tmdb_id),
+        )
+        row = cursor.fetchone()
+        return dict(row) if row else None
+
+
+# The ledger entry of a series by its TVDB id (Sonarr identifies series by it)
+def find_request_by_tvdb_id(tvdb_id):
+    with trace_span("db.find_request"), sqlite3.connect(DATABASE_FILE) as conn:
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute(
+            f"{_SELECT} WHERE r.media_type = 'tv' AND r.tvdb_id = ?", (tvdb_id,)
+        )
+        row = cursor.fetchone()
+        return dict(row) if row else None
+
+
+# Record a request for a title (or a repeated request for it). The latest
+# requester is kept, along with the time of the first request and a count.
+def record_request(
+    media_type,
+    tmdb_id,
+    title,
+    user_id,
+    username,
+    chat_id,
+    tvdb_id=None,
+    status=REQUESTED,
+    job_id=None,
+):
+    now = time.time()
+    with trace_span("db.record_request"), sqlite3.connect(DATABASE_FILE) as conn:
+        conn.execute(
+            """INSERT INTO requests (media_type, tmdb_id, tvdb_id, title, user_id, username, chat_id,
+                                     status, job_id, requested_at, updated_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT (media_type, tmdb_id) DO UPDATE SET
+                   tvdb_id = COALESCE(excluded.tvdb_id, tvdb_id), title = excluded.title,
+                   user_id = excluded.user_id, username = excluded.username,
+                   chat_id = excluded.chat_id, status = excluded.status,
+                   job_id = COALESCE(excluded.job_id, job_id),
+                   request_count = request_count + 1, updated_at = excluded.updated_at""",
+            (
+                media_type,
+                tmdb_id,
+                tvdb_id,
+                title,
+                user_id,
+                username,
+                chat_id,
+                status,
+                job_id,
+                now,
+                now,
+            ),
+        )
+        conn.commit()
+
+
+# Update the state of a requested title (e.g. once the add job has finished)
+def set_request_status(media_type, tmdb_id, status):
+    with trace_span("db.set_request_status"), sqlite3.connect(DATABASE_FILE) as conn:
+        conn.execute(
+            "UPDATE requests SET status = ?, updated_at = ? WHERE media_type = ? AND tmdb_id = ?",
+            (status, time.time(), media_type, tmdb_id),
+        )
+        conn.commit()
+
+
+# The most recently updated requests, optionally only those in one state
+def list_requests(limit=20, status=None):
+    with sqlite3.connect(DATABASE_FILE) as conn:
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        if status is None:
+            cursor.execute(
+                f"{_SELECT} ORDER BY r.updated_at DESC LIMIT ?",
+                (limit,),
+            )
+        else:
+            cursor.execute(
+                f"SELECT * FROM ({_SELECT}) WHERE status = ? ORDER BY updated_at DESC LIMIT ?",
+                (status, limit),
+            )
+        return [dict(row) for row in cursor.fetchall()]
+
+
+# Number of requests per state
+def request_counts():
+    with sqlite3.connect(DATABASE_FILE) as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT status, COUNT(*) FROM ({_SELECT}) GROUP BY status")
+        return dict(cursor.fetchall())
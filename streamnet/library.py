@@ -0,0 +1,229 @@
+import logging
+import re
+import sqlite3
+import time
+import unicodedata
+from difflib import SequenceMatcher
+
+from streamnet import arr
+from streamnet.config import get_config
+from streamnet.database import DATABASE_FILE
+from streamnet.httpclient import ServiceUnavailable
+from streamnet.tracing import trace_span
+
+logger = logging.getLogger("bot")
+
+# Media type stored for the titles of each service
+SERVICE_MEDIA_TYPES = {"sonarr": "tv", "radarr": "movie"}
+
+# Matches scoring below this are not reported
+MIN_SCORE = 0.8
+# Matches scoring this much below the best match are dropped
+SCORE_MARGIN = 0.05
+# Candidates fetched from the index before scoring
+CANDIDATES = 50
+# Upper bound for the trigrams of one query
+MAX_TRIGRAMS = 32
+
+# Release year in parentheses at the end of a query
+_YEAR = re.compile(r"\s*\((\d{4})\)\s*$")
+
+# Whether the index could be created (needs SQLite with the FTS5 trigram tokenizer)
+_available = None
+
+
+# Lowercase, strip accents and punctuation, collapse whitespace
+def normalize_title(text):
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(re.sub(r"[\W_]+", " ", text).split())
+
+
+# Create the full-text index of the Sonarr/Radarr library
+def init_library_index():
+    global _available
+    try:
+        with sqlite3.connect(DATABASE_FILE) as conn:
+            conn.execute(
+                """CREATE VIRTUAL TABLE IF NOT EXISTS library_fts USING fts5(
+                        titles, title UNINDEXED, year UNINDEXED, media_type UNINDEXED,
+                        tmdb_id UNINDEXED, tvdb_id UNINDEXED, tokenize = 'trigram'
+                   )"""
+            )
+            conn.commit()
+        _available = True
+    except sqlite3.OperationalError as e:
+        logger.warning(
+            f"LIBRARY INDEX disabled, SQLite has no FTS5 trigram support: {e}"
+        )
+        _available = False
+    return _available
+
+
+# All title variants of a Sonarr series or Radarr movie, normalised
+def _title_variants(item):
+    variants = [item.get("title"), item.get("originalTitle")]
+    variants += [alt.get("title") for alt in item.get("alternateTitles") or []]
+    normalized = []
+    for variant in variants:
+        if variant:
+            variant = normalize_title(variant)
+            if variant and variant not in normalized:
+                normalized.append(variant)
+    return normalized
+
+
+# Index row of a Sonarr series or Radarr movie, None if it has no title
+def _index_row(item, media_type):
+    variants = _title_variants(item)
+    if not variants:
+        return None
+    return (
+        "\n".join(variants),
+        item.get("title"),
+        item.get("year") or None,
+        media_type,
+        item.get("tmdbId") or None,
+        item.get("tvdbId") or None,
+    )
+
+
+# Replace the indexed titles of one service with its current library
+def rebuild_library_index(service, items):
+    media_type = SERVICE_MEDIA_TYPES[service]
+    rows = [row for row in (_index_row(item, media_type) for item in items) if row]
+    with trace_span("db.rebuild_library_index"), sqlite3.connect(DATABASE_FILE) as conn:
+        conn.execute("DELETE FROM library_fts WHERE media_type = ?", (media_type,))
+        conn.executemany(
+            "INSERT INTO library_fts (titles, title, year, media_type, tmdb_id, tvdb_id) VALUES (?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        conn.commit()
+    return len(rows)
+
+
+# Condition and parameters matching one series (by TVDB id) or movie (by
+# TMDB id) in the index
+def _item_filter(service, item):
+    if service == "sonarr":
+        return "media_type = 'tv' AND tvdb_id = ?", (item.get("tvdbId"),)
+    return "media_type = 'movie' AND tmdb_id = ?", (item.get("tmdbId"),)
+
+
+# Add a series or movie to the index, or update it, without a full refresh
+# (e.g. when Sonarr/Radarr reports a change through a webhook)
+def index_item(service, item):
+    if not _available:
+        return
+    row = _index_row(item, SERVICE_MEDIA_TYPES[service])
+    condition, params = _item_filter(service, item)
+    if row is None or params[0] is None:
+        return
+    with trace_span("db.index_item"), sqlite3.connect(DATABASE_FILE) as conn:
+        conn.execute(f"DELETE FROM library_fts WHERE {condition}", params)
+        conn.execute(
+            "INSERT INTO library_fts (titles, title, year, media_type, tmdb_id, tvdb_id) VALUES (?, ?, ?, ?, ?, ?)",
+            row,
+        )
+        conn.commit()
+
+
+# Remove a deleted series or movie from the index
+def unindex_item(service, item):
+    if not _available:
+        return
+    condition, params = _item_filter(service, item)
+    if params[0] is None:
+        return
+    with trace_span("db.unindex_item"), sqlite3.connect(DATABASE_FILE) as conn:
+        conn.execute(f"DELETE FROM library_fts WHERE {condition}", params)
+        conn.commit()
+
+
+# How well a normalised query matches one normalised title (0..1)
+def _score(query, variant):
+    if query == variant:
+        return 1.0
+    # The query is a whole-word part of the title, e.g. "breaking" in "breaking bad"
+    if len(query) * 2 >= len(variant) and f" {query} " in f" {variant} ":
+        return 0.8 + 0.2 * len(query) / len(variant)
+    return SequenceMatcher(None, query, variant).ratio()
+
+
+# Titles in the library matching a search query, best match first. A year in
+# parentheses at the end of the query ("Dune (2021)") restricts the matches.
+def search_library(query, limit=5):
+    if not _available:
+        return []
+    year = None
+    match = _YEAR.search(query)
+    if match:
+        year = int(match.group(1))
+        query = query[: match.start()]
+    normalized = normalize_title(query)
+    if len(normalized) < 3:
+        return []
+
+    # Any shared trigram makes a candidate, so small typos still match
+    trigrams = sorted({normalized[i : i + 3] for i in range(len(normalized) - 2)})
+    expression = " OR ".join(
+        '"' + trigram.replace('"', '""') + '"' for trigram in trigrams[:MAX_TRIGRAMS]
+    )
+    with trace_span("db.search_library"), sqlite3.connect(DATABASE_FILE) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """SELECT titles, title, year, media_type, tmdb_id, tvdb_id FROM library_fts
+               WHERE library_fts MATCH ? ORDER BY rank LIMIT ?""",
+            (expression, CANDIDATES),
+        )
+        candidates = cursor.fetchall()
+
+    matches = []
+    for titles, title, item_year, media_type, tmdb_id, tvdb_id in candidates:
+        if year and item_year != year:
+            continue
+        score = max(_score(normalized, variant) for variant in titles.split("\n"))
+        if score >= MIN_SCORE:
+            matches.append(
+                {
+                    "title": title,
+                    "year": item_year,
+                    "media_type": media_type,
+                    "tmdb_id": tmdb_id,
+                    "tvdb_id": tvdb_id,
+                    "score": round(score, 3),
+                }
+            )
+    if not matches:
+        return []
+    matches.sort(key=lambda match: match["score"], reverse=True)
+    best = matches[0]["score"]
+    return [match for match in matches if match["score"] >= best - SCORE_MARGIN][:limit]
+
+
+# Job: reload the Sonarr/Radarr library into the index
+async def refresh_library(context):
+    if _available is None:
+        init_library_index()
+    if not _available:
+        return
+
+    config = get_config()
+    started = time.perf_counter()
+    counts = {}
+    for service in SERVICE_MEDIA_TYPES:
+        if not getattr(config, service).url:
+            continue
+        try:
+            counts[service] = rebuild_library_index(
+                service, await arr.get_library(service)
+            )
+        except ServiceUnavailable as e:
+            logger.warning(f"LIBRARY INDEX not refreshed for {service}: {e}")
+        except Exception as e:
+            logger.error(f"Failed to refresh LIBRARY INDEX for {service}: {e}")
+    if counts:
+        logger.info(
+            f"LIBRARY INDEX refreshed in {(time.perf_counter() - started) * 1000:.0f} ms: "
+            + ", ".join(f"{count} from {service}" for service, count in counts.items())
+        )
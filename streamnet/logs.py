@@ -0,0 +1,128 @@
+import atexit
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+from streamnet.tracing import current_trace_id
+
+TEXT_FORMAT = "[%(asctime)s] [%(levelname)s]   %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Upper bound for distinct messages tracked by the dedupe filter
+DEDUPE_MAX_KEYS = 2048
+
+# The running background writer (None until configure_logging is called)
+_listener = None
+
+
+# Drops repeats of an identical message (same logger, level and text) seen
+# within `window` seconds. The next occurrence after the window has passed is
+# logged again with the number of suppressed repeats appended.
+class DedupeFilter(logging.Filter):
+    def __init__(self, window=60.0, max_keys=DEDUPE_MAX_KEYS):
+        super().__init__()
+        self.window = float(window)
+        self.max_keys = max_keys
+        self._seen = {}  # key -> [first seen (monotonic), suppressed count]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if self.window <= 0:
+            return True
+        key = (record.name, record.levelno, record.getMessage())
+        now = time.monotonic()
+        with self._lock:
+            entry = self._seen.get(key)
+            if entry is not None and now - entry[0] < self.window:
+                entry[1] += 1
+                return False
+
+            suppressed = entry[1] if entry is not None else 0
+            if entry is None and len(self._seen) >= self.max_keys:
+                self._prune(now)
+            self._seen[key] = [now, 0]
+
+        if suppressed:
+            record.msg = f"{record.getMessage()} (repeated {suppressed} more times in the last {self.window:g}s)"
+            record.args = None
+        return True
+
+    # Forget expired entries, or the oldest half if everything is still live
+    def _prune(self, now):
+        expired = [
+            k for k, (seen, _) in self._seen.items() if now - seen >= self.window
+        ]
+        if not expired:
+            expired = list(self._seen)[: len(self._seen) // 2]
+        for key in expired:
+            del self._seen[key]
+
+
+# One JSON object per line, for log collectors
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, DATE_FORMAT),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        trace_id = getattr(record, "trace_id", None)
+        if trace_id:
+            entry["trace_id"] = trace_id
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+# Hands records to the queue without blocking. The trace id is captured here,
+# on the thread that logged, because the writer thread has no trace context.
+class _TraceQueueHandler(QueueHandler):
+    def prepare(self, record):
+        record.trace_id = current_trace_id()
+        return super().prepare(record)
+
+
+# Route all logging through a queue and write it from a background thread.
+# Safe to call again (e.g. once config.json has been read) to change the
+# level, format or dedupe window.
+def configure_logging(level="INFO", log_format="text", dedupe_seconds=60.0):
+    global _listener
+
+    # Configure APScheduler logger to suppress INFO logs
+    logging.getLogger("apscheduler").setLevel(logging.WARNING)
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    if log_format == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter(TEXT_FORMAT, DATE_FORMAT))
+
+    queue_handler = _TraceQueueHandler(queue.SimpleQueue())
+    queue_handler.addFilter(DedupeFilter(dedupe_seconds))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    if _listener is not None:
+        _listener.stop()  # flushes whatever the old writer had queued
+    else:
+        atexit.register(stop_logging)
+    _listener = QueueListener(queue_handler.queue, stream_handler)
+    _listener.start()
+    return _listener
+
+
+# Flush the queue and stop the background writer
+def stop_logging():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,219 @@
+import logging
+import os
+import sys
+import time
+
+from streamnet import state
+from streamnet.application import build_application
+from streamnet.config import (
+    CONFIG_DIR,
+    ConfigError,
+    get_config,
+    redact_sensitive_info,
+)
+from streamnet.database import DATABASE_DIR, DATABASE_FILE, init_db
+from streamnet.dispatcher import run_dispatcher
+from streamnet.logs import configure_logging
+
+# Configure the bot logger
+logger = logging.getLogger("bot")
+
+VERSION_FILE = "version.txt"
+
+
+# Function to load version and author info from a file
+def load_version_info(file_path):
+    version_info = {}
+    try:
+        with open(file_path, "r") as file:
+            for line in file:
+                key, value = line.strip().split(
+                    ": ", 1
+                )  # Split on first colon and space
+                version_info[key] = value
+    except Exception as e:
+        logger.error(f"Failed to load VERSION INFO: {e}")
+    return version_info
+
+
+# Function to check and log paths
+def check_and_log_paths():
+    # Check if config directory exists
+    logger.info("=====================================================")
+    logger.info("Checking Directories.....")
+    logger.info("-----------")
+    if not os.path.exists(CONFIG_DIR):
+        os.makedirs(CONFIG_DIR)
+        logger.info("")
+        logger.warning(f"CONFIG directory '{CONFIG_DIR}' not found.")
+        logger.info(f"Creating CONFIG directory....")
+        logger.info(f"CONFIG directory '{CONFIG_DIR}' created.")
+        logger.info("")
+    else:
+        logger.info(f"CONFIG directory '{CONFIG_DIR}' already exists.")
+
+    # Check if database directory exists
+    if not os.path.exists(DATABASE_DIR):
+        os.makedirs(DATABASE_DIR)
+        logger.info("")
+        logger.warning(f"DATABASE directory '{DATABASE_DIR}' not found.")
+        logger.info(f"Creating DATABASE directory....")
+        logger.info(f"DATABASE directory '{DATABASE_DIR}' created.")
+        logger.info("")
+    else:
+        logger.info(f"DATABASE directory '{DATABASE_DIR}' already exists.")
+
+    # Check if database file exists
+    if not os.path.exists(DATABASE_FILE):
+        logger.warning(
+            f"DATABASE FILE '{DATABASE_FILE}' does not exist. It will be created automatically."
+        )
+    else:
+        logger.info(f"DATABASE FILE '{DATABASE_FILE}' already exists.")
+
+
+# Log all config entries, redacting sensitive information
+def log_config_entries(config):
+    sensitive_keys = ["TOKEN", "API_KEY", "SECRET", "KEY"]  # Keys to redact
+    logger.info("Current Config.json settings:")
+    logger.info("-----------")
+    for section, entries in config.raw.items():
+        if isinstance(entries, dict):
+            logger.info(f"Section [{section}]:")
+            for key, value in entries.items():
+                if any(
+                    sensitive_key in key.upper() for sensitive_key in sensitive_keys
+                ):
+                    value = redact_sensitive_info(value)
+                logger.info(f"  {key}: {value}")
+        else:
+            logger.info(f"{section}: {entries}")
+            logger.info("=====================================================")
+
+
+def log_globals(config):
+    logger.info("=====================================================")
+    logger.info("Checking Globals....")
+    logger.info("-----------")
+    # Log the successful retrieval of the token with only the first and last 4 characters visible
+    redacted_token = redact_sensitive_info(config.bot.token)
+    logger.info(f"TOKEN retrieved: '{redacted_token}'")
+    logger.info(f"TIMEZONE is set to '{config.bot.timezone}'.")
+
+
+def print_logo():
+    logo = r"""
+            _      _____           _     _____ _____ _
+           | |    |____ |         | |   |  _  |  ___| |
+  ___ _   _| |__      / /_ __ __ _| |__ | |/' |___ \| |_
+ / __| | | | '_ \     \ \ '__/ _` | '_ \|  /| |   \ \ __|
+| (__| |_| | |_) |.___/ / | | (_| | | | \ |_/ /\__/ / |_
+ \___|\__, |_.__/ \____/|_|  \__, |_| |_|\___/\____/ \__|
+       __/ |                  __/ |
+      |___/                  |___/     TelegramBot 2024
+
+    """
+    print(logo)
+
+
+# Everything that has to happen before polling can start. TMDB, Sonarr/Radarr
+# and night mode are not touched here, they are initialised on first use.
+# Returns the built application and the duration of each startup phase in ms.
+def prepare_startup():
+    timings = {}
+    started = phase_started = time.perf_counter()
+
+    def phase(name):
+        nonlocal phase_started
+        now = time.perf_counter()
+        timings[name] = round((now - phase_started) * 1000, 2)
+        phase_started = now
+
+    config = get_config()
+    phase("config")
+
+    # Load version info and log it
+    version_info = load_version_info(VERSION_FILE)
+    logger.info("=====================================================")
+    logger.info(f"Version: {version_info.get('Version', 'Unknown')}")
+    logger.info(f"Author: {version_info.get('Author', 'Unknown')}")
+    logger.info("=====================================================")
+    logger.info(f"To support this project, please visit")
+    logger.info(f"https://github.com/cyb3rgh05t/telegram-bot")
+    logger.info("=====================================================")
+
+    logger.info("Starting the bot...")
+    logger.info(f"You are running Version {version_info.get('Version', 'Unknown')}")
+    logger.info("-----------")
+
+    # Log all configuration entries
+    log_config_entries(config)
+
+    # Check and log the paths for config and database
+    check_and_log_paths()
+
+    # Log the token and timezone
+    log_globals(config)
+    phase("banner")
+
+    # Initialize Database
+    init_db(config.tmdb.default_language)
+
+    # Initialize group data from db
+    state.initialize_group_data(config.tmdb.default_language)
+    phase("database")
+
+    application = build_application()
+    phase("application")
+
+    timings["total"] = round((time.perf_counter() - started) * 1000, 2)
+    return application, timings
+
+
+# Main function to run the bot
+def run_bot():
+    # Print the logo at startup
+    print_logo()
+    sys.stdout.flush()  # Ensure the logo output is flushed to the console
+
+    try:
+        application, timings = prepare_startup()
+
+        # Start the bot's polling mechanism
+        logger.info("=====================================================")
+        logger.info(f"Startup finished in {timings['total']} ms {timings}")
+        processes = get_config().dispatcher.processes
+        if processes > 1:
+            # Poll here and let worker processes handle the updates
+            run_dispatcher(application, processes)
+            return
+        logger.info("Bot started polling...")
+        logger.info("-----------")
+        application.run_polling()  # Run polling without async/await; let Application manage the loop
+    except Exception as e:
+        logger.error(f"An error occurred during bot operation: {e}")
+    finally:
+        logger.info("Shutting down the bot.")
+
+
+# Entry point
+def main():
+    configure_logging()
+    try:
+        config = get_config()
+    except ConfigError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)  # Exit with status code 1
+    configure_logging(
+        config.bot.log_level, config.bot.log_format, config.bot.log_dedupe_seconds
+    )
+
+    try:
+        # Start the bot in the main thread
+        run_bot()
+    except KeyboardInterrupt:
+        logger.info("Bot stopped by user.")
+    except Exception as e:
+        logger.error(f"An unexpected error occurred: {e}")
+    finally:
+        logger.info("Bot has been stopped, ensuring clean shutdown.")
@@ -0,0 +1,929 @@
+import asyncio
+import logging
+import re
+from datetime import datetime
+
+import aiohttp
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
+from telegram.constants import ChatAction
+from telegram.ext import ContextTypes
+
+from streamnet import (
+    arr,
+    callbackdata,
+    catalogue,
+    downloads,
+    jobqueue,
+    ledger,
+    library,
+    quota,
+    rendering,
+    sessions,
+    tmdb,
+)
+from streamnet.config import get_config
+from streamnet.httpclient import ServiceUnavailable, service_unavailable_text
+from streamnet.jobqueue import JobFailed, RetryableJobError
+
+logger = logging.getLogger("bot")
+
+
+# Convert the rating to a 10-star scale
+def rating_to_stars(rating):
+    stars = (rating / 10) * 10
+
+    # Determine the number of full stars, half stars, and empty stars
+    full_stars = int(stars)  # Full stars
+    half_star = 1 if stars - full_stars >= 0.5 else 0  # Half star
+    empty_stars = 10 - full_stars - half_star  # Empty stars
+
+    # Build the star emoji string
+    star_display = "⭐" * full_stars + "✨" * half_star + "★" * empty_stars
+    return star_display
+
+
+def extract_year_from_input(selected_title):
+    # Use regex to find a year in parentheses, even if the parentheses are incomplete
+    match = re.search(r"\((\d{4})", selected_title)
+    if match:
+        # Ensure the closing parenthesis is present and return the title up to the year
+        return f"{selected_title[:match.end()]})"
+    return selected_title  # If no year is found, return the original title
+
+
+# Search for a movie or TV show using TMDB API with multiple results handling
+async def search_media(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    try:
+        if not context.args:
+            await update.message.reply_text(
+                "Bitte ergänze den Befehl mit einem Film oder Serien Titel (e.g., /search Inception)."
+            )
+            return
+
+        if not await quota.allow(update, context, quota.SEARCH):
+            return
+
+        title = " ".join(context.args)
+        logger.info(f"Searching for media: {title}")
+
+        # Titles that are already on StreamNet TV are answered from the local index
+        matches = library.search_library(title)
+        if matches:
+            # The reply quotes the command, where the TMDB button finds the title
+            await update.message.reply_text(
+                library_matches_text(matches),
+                quote=True,
+                parse_mode=rendering.PARSE_MODE,
+                reply_markup=InlineKeyboardMarkup(
+                    [
+                        [
+                            InlineKeyboardButton(
+                                "🔍 Trotzdem bei TMDB suchen",
+                                callback_data="search_tmdb",
+                            )
+                        ]
+                    ]
+                ),
+            )
+            return
+
+        # Show the typing indicator while the bot is working
+        await context.bot.send_chat_action(
+            chat_id=update.effective_chat.id, action=ChatAction.TYPING
+        )
+        await asyncio.sleep(
+            0.5
+        )  # Small delay to make sure the typing action is visible
+
+        # Send a progress message
+        status_message = await update.message.reply_text(
+            "🔍 Suche nach Ergebnissen, bitte warten...."
+        )
+        await search_tmdb(update, context, title, status_message)
+    except Exception as e:
+        logger.error(f"An unexpected error occurred: {e}")
+        await update.effective_message.reply_text(
+            "🛑 Ein unerwarteter Fehler ist aufgetreten. Bitte versuche es später erneut."
+        )
+
+
+# Reply listing the titles found in the Sonarr/Radarr library
+def library_matches_text(matches):
+    lines = []
+    for match in matches:
+        kind = "Film" if match["media_type"] == "movie" else "Serie"
+        template = "library_match" if match["year"] else "library_match_without_year"
+        lines.append(
+            rendering.render(
+                template, title=match["title"], year=match["year"], kind=kind
+            )
+        )
+    return rendering.render("library_matches", matches="\n".join(lines))
+
+
+# Search TMDB for a title and show the results in the status message
+async def search_tmdb(update, context, title, status_message):
+    try:
+        # Use the local TMDB catalogue if it knows the title, TMDB otherwise
+        media_data = None
+        if get_config().catalogue.enabled:
+            results = catalogue.search_catalogue(title)
+            if results:
+                media_data = {"results": results}
+        if media_data is None:
+            media_data = await tmdb.search_multi(title)
+
+        # Multi search also returns people, which cannot be requested
+        results = [
+            media
+            for media in media_data["results"]
+            if media.get("media_type") in callbackdata.MEDIA_TYPE_CODES
+        ]
+        if not results:
+            await status_message.edit_text(
+                text=rendering.render("no_results", title=title),
+                parse_mode=rendering.PARSE_MODE,
+            )
+            return
+
+        # If more than one result is found, show a list to the user
+        if len(results) > 1:
+            keyboard = []
+            for media in results:
+                media_type = media["media_type"]
+                media_title = media["title"] if media_type == "movie" else media["name"]
+                release_date = media.get(
+                    "release_date", media.get("first_air_date", "N/A")
+                )
+                release_year = release_date[:4] if release_date != "N/A" else "N/A"
+                # Catalogue results have no release date
+                label = (
+                    f"{media_title} ({release_year})"
+                    if release_year != "N/A"
+                    else media_title
+                )
+
+                # The callback data carries the title itself, so no results are kept
+                keyboard.append(
+                    [
+                        InlineKeyboardButton(
+                            label,
+                            callback_data=callbackdata.encode(
+                                callbackdata.SELECT,
+                                media_type,
+                                media["id"],
+                                update.effective_user.id,
+                            ),
+                        )
+                    ]
+                )
+
+            # Create the InlineKeyboardMarkup with the list of results
+            reply_markup = InlineKeyboardMarkup(keyboard)
+
+            await status_message.edit_text(
+                "Mehrere Ergebnisse gefunden, bitte wähle den richtigen Film oder Serie aus:",
+                reply_markup=reply_markup,
+            )
+            logger.info(f"Media options shown: {len(results)} results")
+            return
+
+        # If only one result, continue with displaying details and confirmation
+        media = results[0]
+        await handle_media_selection(update, context, media["media_type"], media["id"])
+
+    except ServiceUnavailable as e:
+        await status_message.edit_text(service_unavailable_text(e.service))
+    except aiohttp.ClientError as http_err:
+        logger.error(f"HTTP error occurred: {http_err}")
+        await status_message.edit_text(
+            "🛑 Ein HTTP Fehler ist beim laden der Metadaten von TMDB aufgetreten. Bitte versuche es später erneut."
+        )
+    except Exception as e:
+        logger.error(f"An unexpected error occurred: {e}")
+        await status_message.edit_text(
+            "🛑 Ein unerwarteter Fehler ist aufgetreten. Bitte versuche es später erneut."
+        )
+
+
+# Job handler: add a series to Sonarr. Returns the text sent to the requester.
+async def add_series_to_sonarr(job):
+    sonarr = get_config().sonarr
+    series_name = job["title"]
+    tvdb_id = job["tvdb_id"]
+
+    # Check if the series is already in Sonarr (also makes retries safe). Its
+    # seasons that were left out before can still be requested.
+    series = await arr.find_series_in_sonarr(tvdb_id)
+    if series is not None:
+        return await add_seasons_in_sonarr(job, series)
+
+    # Proceed with adding the series if it's not found in Sonarr
+    quality_profile_id = await arr.get_quality_profile_id(
+        sonarr.url, sonarr.api_key, sonarr.quality_profile_name, "Sonarr"
+    )
+    if quality_profile_id is None:
+        raise RetryableJobError("Quality profile not found in Sonarr.")
+
+    data = {
+        "title": series_name,
+        "qualityProfileId": quality_profile_id,
+        "rootFolderPath": sonarr.root_folder_path,
+        "seasonFolder": True,
+        "tvdbId": tvdb_id,
+        "monitored": True,
+        "addOptions": {
+            "searchForMissingEpisodes": True  # Attempt to trigger search via addOptions
+        },
+    }
+    # Only the requested seasons are monitored, so only they are searched
+    seasons = job.get("seasons")
+    if seasons:
+        numbers = sorted({0, *job.get("season_numbers", []), *seasons})
+        data["seasons"] = [
+            {"seasonNumber": number, "monitored": number in seasons}
+            for number in numbers
+        ]
+
+    status, series = await arr.post_series(data)
+    if status >= 500:
+        raise RetryableJobError(f"Sonarr returned status {status}")
+    if status != 201:
+        logger.error(
+            f"Failed to add series '{series_name}' to Sonarr. Status code: {status}"
+        )
+        raise JobFailed(
+            rendering.render("series_add_failed", title=series_name, status=status)
+        )
+
+    logger.info(f"Series '{series_name}' added to Sonarr successfully.")
+    ledger.set_request_status("tv", job["tmdb_id"], ledger.ADDED)
+    downloads.track_download("sonarr", series.get("id"), job["tmdb_id"])
+
+    if not series.get("addOptions", {}).get("searchForMissingEpisodes", False):
+        logger.info(f"Triggering manual search for series '{series_name}'.")
+        search_data = {"name": "SeriesSearch", "seriesId": series.get("id")}
+        search_status = await arr.post_command("sonarr", search_data)
+        if search_status == 201:
+            logger.info(f"Manual search for series '{series_name}' started.")
+            if seasons:
+                return rendering.render(
+                    "series_seasons_manual_search_started",
+                    title=series_name,
+                    seasons=", ".join(map(str, seasons)),
+                )
+            return rendering.render("series_manual_search_started", title=series_name)
+        logger.error(
+            f"Failed to start manual search for series '{series_name}'. Status code: {search_status}"
+        )
+        return rendering.render("series_search_failed", title=series_name)
+
+    logger.info(f"Search for series '{series_name}' started automatically.")
+    if seasons:
+        return rendering.render(
+            "series_seasons_search_started",
+            title=series_name,
+            seasons=", ".join(map(str, seasons)),
+        )
+    return rendering.render("series_search_started", title=series_name)
+
+
+# Regular seasons of a Sonarr series that are not monitored, i.e. were left
+# out when the series was requested
+def unmonitored_seasons(series):
+    return sorted(
+        season["seasonNumber"]
+        for season in series.get("seasons") or []
+        if season.get("seasonNumber", 0) > 0 and not season.get("monitored")
+    )
+
+
+# The series is in Sonarr already: monitor the requested seasons (all if none
+# were picked) that are not monitored yet and search them
+async def add_seasons_in_sonarr(job, series):
+    series_name = job["title"]
+    wanted = job.get("seasons")
+    seasons = [
+        number
+        for number in unmonitored_seasons(series)
+        if not wanted or number in wanted
+    ]
+    if not seasons:
+        logger.info(
+            f"Series '{series_name}' already exists in Sonarr, skipping addition."
+        )
+        ledger.set_request_status("tv", job["tmdb_id"], ledger.AVAILABLE)
+        return rendering.render("series_available", title=series_name)
+
+    # Sonarr only takes the whole series back
+    data = await arr.get_series(series["id"])
+    for season in data.get("seasons") or []:
+        if season.get("seasonNumber") in seasons:
+            season["monitored"] = True
+    status = await arr.put_series(data)
+    if status >= 500:
+        raise RetryableJobError(f"Sonarr returned status {status}")
+    if status not in (200, 202):
+        logger.error(
+            f"Failed to monitor seasons {seasons} of series '{series_name}' in Sonarr. Status code: {status}"
+        )
+        raise JobFailed(
+            rendering.render("series_add_failed", title=series_name, status=status)
+        )
+
+    logger.info(f"Seasons {seasons} of series '{series_name}' monitored in Sonarr.")
+    ledger.set_request_status("tv", job["tmdb_id"], ledger.ADDED)
+    downloads.track_download("sonarr", series["id"], job["tmdb_id"])
+
+    for number in seasons:
+        search_data = {
+            "name": "SeasonSearch",
+            "seriesId": series["id"],
+            "seasonNumber": number,
+        }
+        search_status = await arr.post_command("sonarr", search_data)
+        if search_status != 201:
+            logger.error(
+                f"Failed to start search for season {number} of series '{series_name}'. Status code: {search_status}"
+            )
+            return rendering.render("series_search_failed", title=series_name)
+    return rendering.render(
+        "series_seasons_manual_search_started",
+        title=series_name,
+        seasons=", ".join(map(str, seasons)),
+    )
+
+
+# Job handler: add a movie to Radarr. Returns the text sent to the requester.
+async def add_movie_to_radarr(job):
+    radarr = get_config().radarr
+    movie_name = job["title"]
+    movie_tmdb_id = job["tmdb_id"]
+
+    # Check if the movie is already in Radarr (also makes retries safe)
+    if await arr.check_movie_in_radarr(movie_tmdb_id):
+        logger.info(
+            f"Movie '{movie_name}' already exists in Radarr, skipping addition."
+        )
+        ledger.set_request_status("movie", movie_tmdb_id, ledger.AVAILABLE)
+        return rendering.render("movie_available", title=movie_name)
+
+    # Proceed with adding the movie if it's not found in Radarr
+    quality_profile_id = await arr.get_quality_profile_id(
+        radarr.url, radarr.api_key, radarr.quality_profile_name, "Radarr"
+    )
+    if quality_profile_id is None:
+        raise RetryableJobError("Quality profile not found in Radarr.")
+
+    data = {
+        "title": movie_name,
+        "qualityProfileId": quality_profile_id,
+        "rootFolderPath": radarr.root_folder_path,
+        "tmdbId": movie_tmdb_id,
+        "monitored": True,
+        "addOptions": {
+            "searchForMovie": True  # Attempt to trigger search via addOptions
+        },
+    }
+
+    status, movie = await arr.post_movie(data)
+    if status >= 500:
+        raise RetryableJobError(f"Radarr returned status {status}")
+    if status != 201:
+        logger.error(
+            f"Failed to add movie '{movie_name}' to Radarr. Status code: {status}"
+        )
+        raise JobFailed(
+            rendering.render("movie_add_failed", title=movie_name, status=status)
+        )
+
+    logger.info(f"Movie '{movie_name}' added to Radarr successfully.")
+    ledger.set_request_status("movie", movie_tmdb_id, ledger.ADDED)
+    downloads.track_download("radarr", movie.get("id"), movie_tmdb_id)
+
+    if not movie.get("addOptions", {}).get("searchForMovie", False):
+        logger.info(f"Triggering manual search for movie '{movie_name}'.")
+        search_data = {"name": "MoviesSearch", "movieIds": [movie.get("id")]}
+        search_status = await arr.post_command("radarr", search_data)
+        if search_status == 201:
+            logger.info(f"Manual search for movie '{movie_name}' started.")
+            return rendering.render("movie_manual_search_started", title=movie_name)
+        logger.error(
+            f"Failed to start manual search for movie '{movie_name}'. Status code: {search_status}"
+        )
+        return rendering.render("movie_search_failed", title=movie_name)
+
+    logger.info(f"Search for movie '{movie_name}' started automatically.")
+    return rendering.render("movie_search_started", title=movie_name)
+
+
+# Reply for a title that is already in the request ledger
+def request_status_text(title, request):
+    requested_on = datetime.fromtimestamp(
+        request["requested_at"], get_config().bot.tzinfo
+    ).strftime("%d.%m.%Y")
+    if request["status"] == ledger.REQUESTED:
+        return rendering.render("request_pending_since", title=title, date=requested_on)
+    return rendering.render("request_available_since", title=title, date=requested_on)
+
+
+# Whether a title in the request ledger is answered from there. A series in
+# Sonarr can still have seasons that were left out when it was requested, and
+# only Sonarr knows which, so only series still being added are answered.
+def answered_by_ledger(media_type, request):
+    if request is None or request["status"] not in ledger.SETTLED:
+        return False
+    return media_type == "movie" or request["status"] == ledger.REQUESTED
+
+
+# Handle the user's media selection and display media details before confirming
+async def handle_media_selection(
+    update: Update, context: ContextTypes.DEFAULT_TYPE, media_type, media_id
+):
+    reply_target = update.effective_message
+
+    # Titles that were already requested are answered from the ledger
+    request = ledger.find_request(media_type, media_id)
+    if answered_by_ledger(media_type, request):
+        await reply_target.reply_text(
+            request_status_text(request["title"], request),
+            parse_mode=rendering.PARSE_MODE,
+        )
+        return
+
+    # Show the typing indicator while the bot is working
+    await context.bot.send_chat_action(
+        chat_id=update.effective_chat.id, action=ChatAction.TYPING
+    )
+    await asyncio.sleep(0.5)  # Small delay to make sure the typing action is visible
+
+    # Send a progress message
+    status_message = await reply_target.reply_text(
+        "📄 Metadaten werden geladen, bitte warten..."
+    )
+
+    # Fetch additional media details from TMDb
+    try:
+        media_details = await tmdb.fetch_media_details(media_type, media_id)
+        media_title = (
+            media_details.get("title") or media_details.get("name") or "Unbekannt"
+        )
+        logger.info(f"Fetched media details for {media_title} (TMDb ID: {media_id})")
+    except ServiceUnavailable as e:
+        await status_message.edit_text(service_unavailable_text(e.service))
+        return
+    except Exception as e:
+        await status_message.edit_text(
+            "Fehler beim Laden der Metadaten. Bitte versuche es später erneut."
+        )
+        logger.error(f"Failed to fetch media details: {e}")
+        return
+
+    # Convert rating to stars using the helper function
+    rating = media_details.get("vote_average", 0)
+    star_rating = rating_to_stars(rating)
+
+    # Extract the year from the release date for the detailed message as well
+    full_release_date = media_details.get(
+        "release_date", media_details.get("first_air_date", "N/A")
+    )
+    release_year_detailed = (
+        full_release_date[:4] if full_release_date != "N/A" else "N/A"
+    )
+
+    # Remember the selection, so confirming it needs no further lookup
+    choice = sessions.MediaChoice(
+        media_id,
+        media_type,
+        media_title,
+        int(release_year_detailed) if release_year_detailed.isdigit() else None,
+    )
+    sessions.get_store().open(update.effective_user.id).selected = choice
+
+    # Generate the TMDb URL
+    tmdb_url = f"https://www.themoviedb.org/{'movie' if media_type == 'movie' else 'tv'}/{media_id}"
+
+    # Prepare the message with media details, star rating, and the TMDb URL
+    message = rendering.render(
+        "details_card",
+        title=media_title,
+        year=release_year_detailed,
+        stars=star_rating,
+        rating=rating,
+        overview=media_details.get("overview") or "No summary available.",
+        url=tmdb_url,
+    )
+
+    # Send media details regardless of existence in Sonarr/Radarr
+    if media_details.get("poster_path"):
+        poster_url = f"https://image.tmdb.org/t/p/w500{media_details['poster_path']}"
+        await status_message.edit_text(
+            text=rendering.render("details_loaded"), parse_mode=rendering.PARSE_MODE
+        )
+        await reply_target.reply_photo(
+            photo=poster_url, caption=message, parse_mode=rendering.PARSE_MODE
+        )
+    else:
+        await status_message.edit_text(text=message, parse_mode=rendering.PARSE_MODE)
+
+    # Now check if the media already exists in Radarr or Sonarr
+    # Send status message that it's checking if the media exists
+    checking_status_message = await reply_target.reply_text(
+        "👀 Überprüfe, ob der Titel bereits vorhanden ist..."
+    )
+
+    if media_type == "movie":
+        if await arr.check_movie_in_radarr(media_id):
+            await checking_status_message.edit_text(
+                text=rendering.render("movie_available", title=media_title),
+                parse_mode=rendering.PARSE_MODE,
+            )
+        else:
+            # Update the status message to indicate the media is being added
+            await checking_status_message.edit_text("‼️ Titel wurde nicht gefunden...")
+
+            # Ask the user whether they want to add the media
+            await ask_to_add_media(update, context, media_title, "movie", media_id)
+    elif media_type == "tv":
+        try:
+            external_ids_data = await tmdb.fetch_external_ids(media_id)
+        except ServiceUnavailable as e:
+            await checking_status_message.edit_text(service_unavailable_text(e.service))
+            return
+        except Exception as e:
+            await checking_status_message.edit_text(
+                text=rendering.render("tvdb_id_failed", title=media_title, error=e),
+                parse_mode=rendering.PARSE_MODE,
+            )
+            logger.error(f"Error fetching external IDs for series '{media_title}': {e}")
+            return
+
+        tvdb_id = external_ids_data.get("tvdb_id")
+        if not tvdb_id:
+            await checking_status_message.edit_text(
+                text=rendering.render("tvdb_id_missing", title=media_title),
+                parse_mode=rendering.PARSE_MODE,
+            )
+            logger.error(f"No TVDB ID found for the series '{media_title}'")
+            return
+
+        series = await arr.find_series_in_sonarr(tvdb_id)
+        if series is not None:
+            seasons = unmonitored_seasons(series)
+            if not seasons:
+                text = (
+                    request_status_text(media_title, request)
+                    if request and request["status"] in ledger.SETTLED
+                    else rendering.render("series_available", title=media_title)
+                )
+                await checking_status_message.edit_text(
+                    text=text, parse_mode=rendering.PARSE_MODE
+                )
+                return
+
+            # Seasons that were left out before can be requested now
+            choice.seasons = tuple(seasons)
+            await checking_status_message.edit_text(
+                text=rendering.render("series_seasons_missing", title=media_title),
+                parse_mode=rendering.PARSE_MODE,
+            )
+            await ask_to_add_media(
+                update,
+                context,
+                media_title,
+                "tv",
+                media_id,
+                tvdb_id=tvdb_id,
+                seasons=seasons,
+            )
+        else:
+            # Update the status message to indicate the media is being added
+            await checking_status_message.edit_text("‼️ Titel wurde nicht gefunden...")
+
+            # Ask the user whether they want to add the media
+            await ask_to_add_media(
+                update,
+                context,
+                media_title,
+                "tv",
+                media_id,
+                tvdb_id=tvdb_id,
+                seasons=season_numbers(media_details),
+            )
+
+
+# Season buttons shown at most (the latest ones); older seasons can still be
+# requested with "all seasons"
+MAX_SEASON_BUTTONS = 30
+SEASONS_PER_ROW = 5
+
+
+# Regular season numbers of a series from its TMDB details (without specials)
+def season_numbers(details):
+    numbers = sorted(
+        {
+            season.get("season_number")
+            for season in details.get("seasons") or []
+            if isinstance(season.get("season_number"), int)
+            and season["season_number"] > 0
+        }
+    )
+    if not numbers and details.get("number_of_seasons"):
+        numbers = list(range(1, details["number_of_seasons"] + 1))
+    return numbers
+
+
+# Buttons to request the latest season, all seasons or the seasons picked one
+# by one. The picked seasons travel in the callback data of the buttons.
+# Raises ValueError if a selection does not fit into the callback data.
+def seasons_keyboard(tmdb_id, tvdb_id, user_id, seasons, picked=()):
+    picked = set(picked)
+
+    def button(text, action, chosen=None):
+        return InlineKeyboardButton(
+            text,
+            callback_data=callbackdata.encode(
+                action, "tv", tmdb_id, user_id, tvdb_id, chosen
+            ),
+        )
+
+    latest = seasons[-1]
+    keyboard = [
+        [
+            button(f"Neueste Staffel ({latest})", callbackdata.ADD, [latest]),
+            button("Alle Staffeln", callbackdata.ADD),
+        ]
+    ]
+    toggles = [
+        button(
+            f"✅ {number}" if number in picked else str(number),
+            callbackdata.SEASONS,
+            sorted(picked ^ {number}),
+        )
+        for number in seasons[-MAX_SEASON_BUTTONS:]
+    ]
+    keyboard += [
+        toggles[start : start + SEASONS_PER_ROW]
+        for start in range(0, len(toggles), SEASONS_PER_ROW)
+    ]
+    last_row = [button("Abbrechen", callbackdata.CANCEL)]
+    if picked:
+        last_row.insert(0, button("Auswahl anfragen", callbackdata.ADD, sorted(picked)))
+    keyboard.append(last_row)
+    return InlineKeyboardMarkup(keyboard)
+
+
+# Function to ask the user whether they want to add media. Series with more
+# than one season are requested for the seasons the user picks.
+async def ask_to_add_media(
+    update: Update,
+    context: ContextTypes.DEFAULT_TYPE,
+    media_title: str,
+    media_type: str,
+    tmdb_id: int,
+    tvdb_id: int = None,
+    seasons=None,
+):
+
+    # Show typing indicator while adding the movie
+    await context.bot.send_chat_action(
+        chat_id=update.effective_chat.id, action=ChatAction.TYPING
+    )
+    await asyncio.sleep(0.5)  # Small delay to make sure the typing action is visible
+
+    user_id = update.effective_user.id
+    if media_type == "tv" and seasons and len(seasons) > 1:
+        await update.effective_message.reply_text(
+            rendering.render("ask_to_add_seasons", title=media_title),
+            parse_mode=rendering.PARSE_MODE,
+            reply_markup=seasons_keyboard(tmdb_id, tvdb_id, user_id, seasons),
+        )
+        return
+
+    await update.effective_message.reply_text(
+        rendering.render("ask_to_add", title=media_title),
+        parse_mode=rendering.PARSE_MODE,
+        reply_markup=confirm_keyboard(media_type, tmdb_id, user_id, tvdb_id),
+    )
+
+
+# "Yes" and "No" buttons; they carry the ids, so nothing is kept per user
+def confirm_keyboard(media_type, tmdb_id, user_id, tvdb_id=None):
+    keyboard = [
+        [
+            InlineKeyboardButton(
+                "Ja",
+                callback_data=callbackdata.encode(
+                    callbackdata.ADD, media_type, tmdb_id, user_id, tvdb_id
+                ),
+            ),
+            InlineKeyboardButton(
+                "Nein",
+                callback_data=callbackdata.encode(
+                    callbackdata.CANCEL, media_type, tmdb_id, user_id
+                ),
+            ),
+        ]
+    ]
+    return InlineKeyboardMarkup(keyboard)
+
+
+# Quota taken by each button action (cancelling is free)
+CALLBACK_QUOTAS = {callbackdata.SELECT: quota.SELECT, callbackdata.ADD: quota.ADD}
+
+
+# Title of the /search command a message replies to
+def _replied_search_title(message):
+    replied = message.reply_to_message if message else None
+    if replied is None or not replied.text:
+        return None
+    parts = replied.text.split(maxsplit=1)
+    return parts[1].strip() if len(parts) == 2 else None
+
+
+# Handle the user's choice when they press an InlineKeyboard button. Everything
+# needed is in the callback data (or the quoted command), so the buttons work in
+# any process and after a restart.
+async def handle_add_media_callback(
+    update: Update, context: ContextTypes.DEFAULT_TYPE
+) -> None:
+    query = update.callback_query
+
+    if query.data == "search_tmdb":
+        # The title was found in the library, but the user wants the TMDB results
+        if not await quota.allow(update, context, quota.SEARCH):
+            return
+        await query.answer()
+        title = _replied_search_title(query.message)
+        if not title:
+            await query.edit_message_text(
+                "Ungültige Auswahl. Bitte versuche es erneut."
+            )
+            return
+        await query.edit_message_text("🔍 Suche nach Ergebnissen, bitte warten....")
+        await search_tmdb(update, context, title, query.message)
+        return
+
+    try:
+        callback = callbackdata.decode(query.data, query.from_user.id)
+    except callbackdata.InvalidCallbackData:
+        # Outdated button or one made for another user
+        await query.answer(
+            "Diese Auswahl ist nicht (mehr) gültig. Bitte suche selbst nach dem Titel."
+        )
+        logger.warning(f"Rejected callback data from USER ID '{query.from_user.id}'")
+        return
+    action = CALLBACK_QUOTAS.get(callback.action)
+    if action and not await quota.allow(update, context, action):
+        return
+    await query.answer()
+
+    if callback.action == callbackdata.SELECT:
+        await handle_media_selection(
+            update, context, callback.media_type, callback.tmdb_id
+        )
+    elif callback.action == callbackdata.ADD:
+        await add_media_response(update, context, callback)
+    elif callback.action == callbackdata.SEASONS:
+        await pick_seasons(update, context, callback)
+    elif callback.action == callbackdata.CANCEL:
+        sessions.get_store().discard(update.effective_user.id)
+        await query.edit_message_text("Anfrage wurde abgebrochen.")
+
+
+# A season button was pressed: show the keyboard with the new selection. A
+# series in Sonarr offers the seasons left out before, which are in the
+# user's session; otherwise the seasons come from the details card, which is
+# cached.
+async def pick_seasons(update: Update, context: ContextTypes.DEFAULT_TYPE, callback):
+    query = update.callback_query
+    user_id = update.effective_user.id
+    session = sessions.get_store().get(user_id)
+    selected = session.selected if session is not None else None
+    if (
+        selected is not None
+        and selected.seasons
+        and (selected.media_type, selected.tmdb_id) == ("tv", callback.tmdb_id)
+    ):
+        title, seasons = selected.title, list(selected.seasons)
+    else:
+        try:
+            details = await tmdb.fetch_media_details("tv", callback.tmdb_id)
+        except ServiceUnavailable as e:
+            await query.edit_message_text(service_unavailable_text(e.service))
+            return
+        title, seasons = details.get("name", ""), season_numbers(details)
+    if not seasons:
+        await query.edit_message_text("Ungültige Auswahl. Bitte versuche es erneut.")
+        return
+    try:
+        reply_markup = seasons_keyboard(
+            callback.tmdb_id, callback.tvdb_id, user_id, seasons, callback.seasons or ()
+        )
+    except ValueError:
+        # Seasons this far apart do not fit into the callback data; the series
+        # can still be requested with all its seasons
+        await query.edit_message_text(
+            rendering.render("ask_to_add_all_seasons", title=title),
+            parse_mode=rendering.PARSE_MODE,
+            reply_markup=confirm_keyboard(
+                "tv", callback.tmdb_id, user_id, callback.tvdb_id
+            ),
+        )
+        return
+    await query.edit_message_reply_markup(reply_markup)
+
+
+# Queue the Sonarr or Radarr add after user confirmation. The user gets an
+# acknowledgement right away and is notified when the job has finished.
+async def add_media_response(
+    update: Update, context: ContextTypes.DEFAULT_TYPE, callback
+) -> None:
+    message = update.effective_message
+    media_type = callback.media_type
+
+    # Another user may have requested the title in the meantime
+    request = ledger.find_request(media_type, callback.tmdb_id)
+    if answered_by_ledger(media_type, request):
+        await message.reply_text(
+            request_status_text(request["title"], request),
+            parse_mode=rendering.PARSE_MODE,
+        )
+        return
+
+    # The title is in the user's session; once that has expired it comes from
+    # the details card, which is cached
+    session = sessions.get_store().get(update.effective_user.id)
+    selected = session.selected if session is not None else None
+    if selected is not None and (selected.media_type, selected.tmdb_id) == (
+        media_type,
+        callback.tmdb_id,
+    ):
+        title = selected.title
+    else:
+        try:
+            media_details = await tmdb.fetch_media_details(media_type, callback.tmdb_id)
+        except ServiceUnavailable as e:
+            await message.reply_text(service_unavailable_text(e.service))
+            return
+        title = media_details.get("title") or media_details.get("name")
+    if not title or (media_type == "tv" and not callback.tvdb_id):
+        await message.reply_text(
+            "Keine Metadaten Ergebnisse gefunden. Bitte versuche es erneut."
+        )
+        return
+
+    media_info = {"title": title, "media_type": media_type, "tmdb_id": callback.tmdb_id}
+    if media_type == "tv":
+        media_info["tvdb_id"] = callback.tvdb_id
+    if media_type == "tv" and callback.seasons:
+        # Sonarr monitors every season it is not told about, so the job needs
+        # all season numbers, not only the requested ones
+        try:
+            details = await tmdb.fetch_media_details("tv", callback.tmdb_id)
+        except ServiceUnavailable as e:
+            await message.reply_text(service_unavailable_text(e.service))
+            return
+        media_info["seasons"] = list(callback.seasons)
+        media_info["season_numbers"] = season_numbers(details)
+
+    # The flow ends here
+    sessions.get_store().discard(update.effective_user.id)
+
+    acknowledgement = await message.reply_text(
+        rendering.render("request_accepted", title=title),
+        parse_mode=rendering.PARSE_MODE,
+    )
+
+    # The TVDB/TMDB id makes sure a title is only queued once
+    if media_type == "tv":
+        kind, key = "add_series", f"tvdb:{callback.tvdb_id}"
+    else:
+        kind, key = "add_movie", f"tmdb:{callback.tmdb_id}"
+    job_id, previous_status = jobqueue.enqueue_job(
+        kind,
+        key,
+        media_info,
+        chat_id=update.effective_chat.id,
+        user_id=update.effective_user.id,
+        message_id=acknowledgement.message_id,
+    )
+    ledger.record_request(
+        media_type,
+        callback.tmdb_id,
+        title,
+        update.effective_user.id,
+        update.effective_user.username,
+        update.effective_chat.id,
+        tvdb_id=callback.tvdb_id,
+        job_id=job_id,
+    )
+    logger.info(
+        f"Queued JOB {job_id} ({kind}) for '{title}' requested by USER '{update.effective_user.username}' (ID: '{update.effective_user.id}')"
+    )
+
+    if previous_status in (jobqueue.QUEUED, jobqueue.RUNNING):
+        await acknowledgement.edit_text(
+            rendering.render("request_in_progress", title=title),
+            parse_mode=rendering.PARSE_MODE,
+        )
@@ -0,0 +1,23 @@
+import asyncio
+
+from telegram import Update
+from telegram.constants import ChatAction
+from telegram.ext import ContextTypes
+
+from streamnet import leader, nightmode
+
+
+# Message handler for general text
+async def handle_text_message(
+    update: Update, context: ContextTypes.DEFAULT_TYPE
+) -> None:
+    await context.bot.send_chat_action(
+        chat_id=update.effective_chat.id, action=ChatAction.TYPING
+    )
+    await asyncio.sleep(0.5)  # Small delay to make sure the typing action is visible
+
+    # Only the leader switches night mode on or off; the others follow its state
+    if nightmode.is_night_mode_active() or (
+        leader.is_leader() and await nightmode.night_mode_checker(context)
+    ):
+        await nightmode.restrict_night_mode(update, context)
@@ -0,0 +1,345 @@
+import asyncio
+import logging
+import time
+
+import telegram.error
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from streamnet import rendering, state
+from streamnet.config import get_config
+from streamnet.database import (
+    get_group_name,
+    get_night_mode_info,
+    set_night_mode_active,
+    update_night_mode_message_id,
+)
+from streamnet.utils import admin_required, get_current_time
+
+logger = logging.getLogger("bot")
+
+NIGHT_MODE_ON_TEXT = rendering.render("night_mode_on")
+NIGHT_MODE_OFF_TEXT = rendering.render("night_mode_off")
+
+# How long the night mode state read from the database is trusted. Other
+# instances of the bot may change it, so it is read again after this.
+STATE_RELOAD_SECONDS = 30
+
+# Warnings due for deletion within this many seconds of each other are
+# deleted in the same run of the cleanup job
+WARNING_BATCH_SECONDS = 10
+
+# Global variable to track if night mode is active
+night_mode_active = False
+night_mode_message_id = None
+_state_loaded_at = None
+
+# User id -> monotonic time until which the user is not warned again
+_warned_until = {}
+# Warnings waiting to be deleted: (monotonic due time, chat id, message id)
+_pending_warnings = []
+_cleanup_scheduled = False
+
+
+# Load the persisted night mode state on first use, and again once it is older
+# than STATE_RELOAD_SECONDS
+def load_night_mode_state():
+    global night_mode_active, night_mode_message_id, _state_loaded_at
+    now = time.monotonic()
+    if _state_loaded_at is not None:
+        if now - _state_loaded_at < STATE_RELOAD_SECONDS:
+            return
+        state.reload_group_data()
+        night_mode_message_id, active = get_night_mode_info(state.GROUP_CHAT_ID)
+        night_mode_active = bool(active)
+        _state_loaded_at = now
+        return
+    night_mode_message_id, night_mode_active = get_night_mode_info(state.GROUP_CHAT_ID)
+    night_mode_active = bool(night_mode_active)
+    _state_loaded_at = now
+
+    night_mode_start, night_mode_end = get_night_mode_times()
+    logger.info(f"NIGHT MODE set from '{night_mode_start}' to '{night_mode_end}'")
+    if night_mode_active:
+        logger.info(
+            f"NIGHT MODE is currently ACTIVE for GROUP CHAT ID: '{state.GROUP_CHAT_ID}' and MESSAGE ID: '{night_mode_message_id}'"
+        )
+    else:
+        logger.info(
+            f"NIGHT MODE is currently INACTIVE with MESSAGE ID: '{night_mode_message_id}'"
+        )
+
+
+# Whether night mode is currently active (loads the state on first use)
+def is_night_mode_active():
+    load_night_mode_state()
+    return night_mode_active
+
+
+# Enable or disable night mode
+@admin_required
+async def enable_night_mode(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    global night_mode_active
+    load_night_mode_state()
+    if not night_mode_active:
+        night_mode_active = True
+        set_night_mode_active(state.GROUP_CHAT_ID, True)
+        user_id = update.message.from_user.id
+        username = update.message.from_user.username  # Get the username
+        logger.info(f"NIGHT MODE enabled by USER '{username}' (ID: '{user_id}')")
+        await context.bot.send_message(
+            chat_id=state.GROUP_CHAT_ID,
+            text=NIGHT_MODE_ON_TEXT,
+            parse_mode=rendering.PARSE_MODE,
+        )
+
+
+@admin_required
+async def disable_night_mode(
+    update: Update, context: ContextTypes.DEFAULT_TYPE
+) -> None:
+    global night_mode_active
+    load_night_mode_state()
+    if night_mode_active:
+        night_mode_active = False
+        set_night_mode_active(state.GROUP_CHAT_ID, False)
+        user_id = update.message.from_user.id
+        username = update.message.from_user.username  # Get the username
+        logger.info(
+            f"NIGHT MODE disabled by USER '{username}' (ID: '{user_id}')"
+        )  # Log username
+        await context.bot.send_message(
+            chat_id=state.GROUP_CHAT_ID,
+            text=NIGHT_MODE_OFF_TEXT,
+            parse_mode=rendering.PARSE_MODE,
+        )
+
+
+# Function to get the night mode times from the config
+def get_night_mode_times():
+    nightmode = get_config().nightmode
+    return nightmode.start, nightmode.end
+
+
+# Whether a time lies within the night mode window (which may cross midnight)
+def in_night_mode_window(now, night_mode_start, night_mode_end):
+    if night_mode_start < night_mode_end:
+        return night_mode_start <= now < night_mode_end
+    return now >= night_mode_start or now < night_mode_end
+
+
+# Send the activation message and persist the night mode state
+async def _activate_night_mode(context, group_name):
+    global night_mode_active, night_mode_message_id
+    night_mode_active = True
+    logger.info(
+        f"NIGHT MODE activated for GROUP CHAT ID: '{state.GROUP_CHAT_ID}' in GROUP: '{group_name}'"
+    )
+
+    # Send the initial night mode activation message and store its ID
+    try:
+        message = await context.bot.send_message(
+            chat_id=state.GROUP_CHAT_ID,
+            text=NIGHT_MODE_ON_TEXT,
+            parse_mode=rendering.PARSE_MODE,
+        )
+        night_mode_message_id = message.message_id
+
+        # Store the message ID in the database
+        update_night_mode_message_id(state.GROUP_CHAT_ID, night_mode_message_id)
+
+        # Update the database to set night_mode_active to 1 (True)
+        set_night_mode_active(state.GROUP_CHAT_ID, True)
+
+    except telegram.error.BadRequest as e:
+        logger.error(f"Failed to send NIGHT MODE ACTIVATION MESSAGE: {e}")
+
+
+# Night Mode checker function
+async def night_mode_checker(context):
+    global night_mode_active
+
+    # Ensure GROUP_CHAT_ID is only the chat ID (integer) and not a tuple
+    if isinstance(state.GROUP_CHAT_ID, tuple):
+        state.GROUP_CHAT_ID = state.GROUP_CHAT_ID[0]  # Extract only the chat ID part
+
+    load_night_mode_state()
+
+    # Retrieve the group name
+    group_name = get_group_name(state.GROUP_CHAT_ID)
+
+    now = get_current_time().time()  # Get current time only
+    logger.debug(f"Current time (UTC+2): {now.strftime('%H:%M:%S')}")
+
+    # Get night mode times from the config
+    night_mode_start, night_mode_end = get_night_mode_times()
+    logger.debug(f"NIGHT MODE set from '{night_mode_start}' to '{night_mode_end}'")
+
+    if not state.GROUP_CHAT_ID:
+        logger.warning("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
+        logger.warning("Missing GROUP CHAT ID....")
+        logger.warning("GROUP CHAT ID is needed for NIGHT MODE")
+        logger.warning("Please set it using '/set_group_id' <-----")
+        logger.warning("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
+        return
+
+    logger.debug(
+        f"NIGHT MODE CHECKER started for GROUP CHAT ID: '{state.GROUP_CHAT_ID}' in GROUP: '{group_name}'"
+    )
+
+    # Check if current time is within the night mode time
+    if not night_mode_active and in_night_mode_window(
+        now, night_mode_start, night_mode_end
+    ):
+        await _activate_night_mode(context, group_name)
+
+    # If night mode is active and current time is past the end time, deactivate it
+    if night_mode_active and now >= night_mode_end:
+        night_mode_active = False
+        logger.info(
+            f"NIGHT MODE deactivated for GROUP CHAT ID: '{state.GROUP_CHAT_ID}' in GROUP: '{group_name}'"
+        )
+
+        # If there is a previous message ID, delete it and send a new deactivation message
+        try:
+            if night_mode_message_id:
+                # Delete the night mode activation message
+                await context.bot.delete_message(
+                    chat_id=state.GROUP_CHAT_ID, message_id=night_mode_message_id
+                )
+                logger.info(
+                    f"NIGHT MODE ACTIVATION MESSAGE deleted for GROUP CHAT ID: '{state.GROUP_CHAT_ID}'"
+                )
+
+                # Send new message indicating night mode has ended
+                new_message = await context.bot.send_message(
+                    chat_id=state.GROUP_CHAT_ID,
+                    text=NIGHT_MODE_OFF_TEXT,
+                    parse_mode=rendering.PARSE_MODE,
+                )
+
+                # Optionally update the database to clear the message ID
+                update_night_mode_message_id(
+                    state.GROUP_CHAT_ID, new_message.message_id
+                )
+
+                # Update the database to set night_mode_active to 0 (False)
+                set_night_mode_active(state.GROUP_CHAT_ID, False)
+
+            else:
+                logger.warning(
+                    f"No NIGHT MODE MESSAGE ID found to delete for GROUP CHAT ID: '{state.GROUP_CHAT_ID}' in GROUP: '{group_name}'"
+                )
+
+        except telegram.error.BadRequest as e:
+            logger.error(
+                f"Failed to delete NIGHT MODE ACTIVATION MESSAGE for GROUP CHAT ID: '{state.GROUP_CHAT_ID}' in GROUP: '{group_name}': {e}"
+            )
+
+    logger.debug(
+        f"NIGHT MODE CHECKER finished for GROUP CHAT ID: '{state.GROUP_CHAT_ID}' in GROUP: '{group_name}'."
+    )
+
+
+# Restrict messages during night mode
+async def restrict_night_mode(
+    update: Update, context: ContextTypes.DEFAULT_TYPE
+) -> None:
+    now = get_current_time().time()
+
+    # Get night mode times from the config
+    night_mode_start, night_mode_end = get_night_mode_times()
+
+    # Check if night mode is active and within the restricted hours
+    if is_night_mode_active() and (now >= night_mode_start and now < night_mode_end):
+        user_id = update.effective_user.id
+        username = update.effective_user.username  # Get the username
+        chat_id = update.effective_chat.id
+
+        try:
+            # Check the status of the user in the chat
+            member = await context.bot.get_chat_member(chat_id, user_id)
+            is_admin = member.status in ("administrator", "creator")
+
+            # If the user is not an admin, delete their message
+            if not is_admin:
+                logger.info(
+                    f"Deleting message from non-admin USER '{username}' (ID: '{user_id}') due to NIGHT MODE."
+                )
+
+                # Warn the user, but at most once per window
+                await _warn_user(update, context, night_mode_start, night_mode_end)
+
+                # Delete the user's message
+                await context.bot.delete_message(
+                    chat_id=chat_id, message_id=update.message.message_id
+                )
+
+        except telegram.error.BadRequest as e:
+            logger.error(f"Failed to get chat member status or delete message: {e}")
+        except Exception as e:
+            logger.error(f"An unexpected error occurred: {e}")
+
+
+# Tell a user that messages are not allowed right now, unless they were
+# already told within the warning window. The warning deletes itself later.
+async def _warn_user(update, context, night_mode_start, night_mode_end):
+    global _cleanup_scheduled
+    settings = get_config().nightmode
+    user_id = update.effective_user.id
+    now = time.monotonic()
+    if _warned_until.get(user_id, 0) > now:
+        return
+    _warned_until[user_id] = now + settings.warning_window_seconds
+
+    warning = await update.message.reply_text(
+        rendering.render(
+            "night_mode_restricted",
+            start=night_mode_start.strftime("%H:%M"),
+            end=night_mode_end.strftime("%H:%M"),
+        ),
+        parse_mode=rendering.PARSE_MODE,
+    )
+    _pending_warnings.append(
+        (now + settings.warning_delete_seconds, warning.chat_id, warning.message_id)
+    )
+    if not _cleanup_scheduled:
+        _cleanup_scheduled = True
+        context.job_queue.run_once(
+            delete_night_mode_warnings, settings.warning_delete_seconds
+        )
+
+
+# Job: delete the warnings that are due (and those due shortly after, so a
+# burst of warnings goes in one run), then wait for the next one
+async def delete_night_mode_warnings(context):
+    global _pending_warnings, _cleanup_scheduled
+    now = time.monotonic()
+    cutoff = now + WARNING_BATCH_SECONDS
+    due = [warning for warning in _pending_warnings if warning[0] <= cutoff]
+    _pending_warnings = [
+        warning for warning in _pending_warnings if warning[0] > cutoff
+    ]
+
+    results = await asyncio.gather(
+        *(
+            context.bot.delete_message(chat_id=chat_id, message_id=message_id)
+            for _, chat_id, message_id in due
+        ),
+        return_exceptions=True,
+    )
+    failed = sum(isinstance(result, Exception) for result in results)
+    logger.debug(
+        f"Deleted {len(due) - failed} NIGHT MODE warnings ({failed} already gone)."
+    )
+
+    for user_id, until in list(_warned_until.items()):
+        if until <= now:
+            del _warned_until[user_id]
+
+    if _pending_warnings:
+        context.job_queue.run_once(
+            delete_night_mode_warnings, max(_pending_warnings[0][0] - now, 0)
+        )
+    else:
+        _cleanup_scheduled = False
@@ -0,0 +1,259 @@
+import logging
+import sqlite3
+import time
+
+import telegram.error
+from telegram.constants import ChatType
+
+from streamnet import state
+from streamnet.config import get_config
+from streamnet.database import DATABASE_FILE
+from streamnet.tracing import trace_span
+
+logger = logging.getLogger("bot")
+
+# Actions with a quota
+SEARCH = "search"
+SELECT = "select"
+ADD = "add"
+
+# Scopes of the buckets
+USER = "user"
+CHAT = "chat"
+
+# How long a user's admin status is trusted before asking Telegram again
+ADMIN_CACHE_SECONDS = 600
+
+# The refusal is only sent once per user in this many seconds; further
+# requests over the quota are ignored
+REFUSAL_SECONDS = 30
+
+REFUSAL_TEXT = "⏳ Du hast gerade zu viele Anfragen gestellt. Bitte warte einen Moment und versuche es dann erneut."
+
+
+# Token bucket: holds up to `burst` tokens and gains `per_minute` tokens a
+# minute. Times are wall-clock seconds so saved buckets stay valid after a restart.
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated_at")
+
+    def __init__(self, per_minute, burst, tokens=None, updated_at=None):
+        self.rate = per_minute / 60
+        self.capacity = burst
+        self.tokens = burst if tokens is None else min(tokens, burst)
+        self.updated_at = time.time() if updated_at is None else updated_at
+
+    def refill(self, now):
+        if now > self.updated_at:
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated_at) * self.rate
+            )
+        self.updated_at = now
+        return self.tokens
+
+    @property
+    def full(self):
+        return self.tokens >= self.capacity
+
+
+# (scope, id, action) -> TokenBucket
+_buckets = {}
+# Keys of the buckets changed since they were last saved
+_dirty = set()
+# Keys of the buckets this process has saved. Only their rows are deleted
+# again; rows of other worker processes are left to them.
+_saved = set()
+# User id -> (is admin, monotonic time the status was looked up)
+_admins = {}
+# User id -> monotonic time until which no further refusal is sent
+_refused_until = {}
+
+
+def _bucket(scope, key, action, limit):
+    bucket = _buckets.get((scope, key, action))
+    if bucket is None:
+        bucket = _buckets[(scope, key, action)] = TokenBucket(
+            limit.per_minute, limit.burst
+        )
+    return bucket
+
+
+# The saved buckets that have not refilled completely yet, by key
+def _saved_buckets(conn, now):
+    settings = get_config().quota
+    limits = {USER: settings.user, CHAT: settings.chat}
+    buckets = {}
+    rows = conn.execute(
+        "SELECT scope, id, action, tokens, updated_at FROM quota_buckets"
+    ).fetchall()
+    for scope, key, action, tokens, updated_at in rows:
+        limit = limits.get(scope, {}).get(action)
+        if limit is None:
+            continue
+        bucket = TokenBucket(limit.per_minute, limit.burst, tokens, updated_at)
+        bucket.refill(now)
+        if not bucket.full:
+            buckets[(scope, key, action)] = bucket
+    return buckets
+
+
+# Create the table holding the buckets and drop the saved ones that have
+# refilled completely in the meantime; they are not needed any more. Runs
+# once, before the worker processes load the buckets.
+def init_quota():
+    with sqlite3.connect(DATABASE_FILE) as conn:
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS quota_buckets (
+                            scope TEXT NOT NULL,
+                            id INTEGER NOT NULL,
+                            action TEXT NOT NULL,
+                            tokens REAL NOT NULL,
+                            updated_at REAL NOT NULL,
+                            PRIMARY KEY (scope, id, action)
+                          )"""
+        )
+        kept = _saved_buckets(conn, time.time())
+        rows = conn.execute("SELECT scope, id, action FROM quota_buckets").fetchall()
+        conn.executemany(
+            "DELETE FROM quota_buckets WHERE scope = ? AND id = ? AND action = ?",
+            [row for row in rows if row not in kept],
+        )
+        conn.commit()
+
+
+# Load the saved buckets into memory (in every process handling updates)
+def load_buckets():
+    with sqlite3.connect(DATABASE_FILE) as conn:
+        buckets = _saved_buckets(conn, time.time())
+    _buckets.clear()
+    _buckets.update(buckets)
+    _dirty.clear()
+    _saved.clear()
+    logger.info(f"QUOTA enabled, {len(_buckets)} buckets restored.")
+
+
+# Write the changed buckets to the database. Full buckets are the same as no
+# bucket, so they are dropped from memory and from the database.
+def save_buckets():
+    now = time.time()
+    upserts, deletes = [], []
+    for key, bucket in list(_buckets.items()):
+        if bucket.refill(now) >= bucket.capacity:
+            del _buckets[key]
+            if key in _saved:
+                _saved.discard(key)
+                deletes.append(key)
+        elif key in _dirty:
+            upserts.append((*key, bucket.tokens, bucket.updated_at))
+            _saved.add(key)
+    _dirty.clear()
+    if not upserts and not deletes:
+        return
+    with trace_span("db.save_quota"), sqlite3.connect(DATABASE_FILE) as conn:
+        conn.executemany(
+            """INSERT INTO quota_buckets (scope, id, action, tokens, updated_at)
+               VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT (scope, id, action) DO UPDATE SET
+                   tokens = excluded.tokens, updated_at = excluded.updated_at""",
+            upserts,
+        )
+        conn.executemany(
+            "DELETE FROM quota_buckets WHERE scope = ? AND id = ? AND action = ?",
+            deletes,
+        )
+        conn.commit()
+
+    # Forget cached admin states and refusals that have expired
+    monotonic = time.monotonic()
+    for user_id, (_, checked_at) in list(_admins.items()):
+        if monotonic - checked_at > ADMIN_CACHE_SECONDS:
+            del _admins[user_id]
+    for user_id, until in list(_refused_until.items()):
+        if until <= monotonic:
+            del _refused_until[user_id]
+
+
+# Give the buckets in memory the limits of the current config (after a reload)
+def apply_limits():
+    settings = get_config().quota
+    limits = {USER: settings.user, CHAT: settings.chat}
+    now = time.time()
+    for (scope, _, action), bucket in _buckets.items():
+        limit = limits[scope][action]
+        bucket.refill(now)
+        bucket.rate = limit.per_minute / 60
+        bucket.capacity = limit.burst
+        bucket.tokens = min(bucket.tokens, bucket.capacity)
+
+
+# Job: save the buckets every quota.PERSIST_SECONDS
+async def save_quota(context):
+    save_buckets()
+
+
+# The remembered admin status of a user, or None if it is unknown or older
+# than ADMIN_CACHE_SECONDS
+def _cached_admin(user_id):
+    cached = _admins.get(user_id)
+    if cached is not None and time.monotonic() - cached[1] < ADMIN_CACHE_SECONDS:
+        return cached[0]
+    return None
+
+
+# Whether the user is an admin of the group. Telegram is only asked when a
+# user is over the quota; the answer is remembered for ADMIN_CACHE_SECONDS.
+async def _is_admin(context, chat_id, user_id):
+    cached = _cached_admin(user_id)
+    if cached is not None:
+        return cached
+    try:
+        member = await context.bot.get_chat_member(
+            state.GROUP_CHAT_ID or chat_id, user_id
+        )
+        is_admin = member.status in ("administrator", "creator")
+    except telegram.error.TelegramError as e:
+        logger.warning(f"Failed to look up admin status of USER ID '{user_id}': {e}")
+        is_admin = False
+    _admins[user_id] = (is_admin, time.monotonic())
+    return is_admin
+
+
+# Take one token for `action` from the user's and the chat's bucket. Returns
+# False, after telling the user (at most once per REFUSAL_SECONDS), if either
+# is empty and the user is not an admin. Users known to be admins take no
+# tokens, so they do not use up the group's quota.
+async def allow(update, context, action):
+    settings = get_config().quota
+    if not settings.enabled:
+        return True
+
+    user_id = update.effective_user.id
+    if _cached_admin(user_id):
+        return True
+    chat = update.effective_chat
+    now = time.time()
+    keys = [(USER, user_id, action, settings.user[action])]
+    # In a private chat the chat bucket would only repeat the user bucket
+    if chat.type != ChatType.PRIVATE:
+        keys.append((CHAT, chat.id, action, settings.chat[action]))
+    buckets = [_bucket(*key) for key in keys]
+
+    if all(bucket.refill(now) >= 1 for bucket in buckets):
+        for bucket, key in zip(buckets, keys):
+            bucket.tokens -= 1
+            _dirty.add(key[:3])
+        return True
+
+    if await _is_admin(context, chat.id, user_id):
+        return True
+
+    logger.info(
+        f"QUOTA for {action} exceeded by USER ID '{user_id}' in CHAT ID '{chat.id}'"
+    )
+    query = update.callback_query
+    if query is not None:
+        # Button presses have to be answered anyway; the answer is a small popup
+        await query.answer(REFUSAL_TEXT)
+    elif _refused_until.get(user_id, 0) <= time.monotonic():
+        _refused_until[user_id] = time.monotonic() + REFUSAL_SECONDS
+        await update.effective_message.reply_text(REFUSAL_TEXT)
+    return False
@@ -0,0 +1,159 @@
+import re
+import string
+
+from telegram.constants import ParseMode
+
+# All rendered messages are sent with this parse mode
+PARSE_MODE = ParseMode.MARKDOWN_V2
+
+
+# Escapes for values inserted into MarkdownV2 text and into link targets: a
+# pattern that finds whether a value needs escaping at all, and a table for
+# str.translate. Lists indexed by code point are the fastest tables; code
+# points past the end of the list are kept as they are.
+def _escape(reserved):
+    table = [
+        ("\\" + chr(code)) if chr(code) in reserved else code for code in range(128)
+    ]
+    return re.compile(f"[{re.escape(reserved)}]"), table
+
+
+# Format spec of a template field -> escape (None inserts the value as is)
+_ESCAPES = {
+    "": _escape("\\_*[]()~`>#+-=|{}.!"),
+    "url": _escape("\\)"),
+    "raw": None,
+}
+
+# Characters that must be escaped in the literal text of a template; markup
+# characters (*, _, ~, |, `, [ and ]) and link targets are allowed
+_LINK_TARGET = re.compile(r"\]\([^)]*\)")
+_UNESCAPED = re.compile(r"(?<!\\)[()>#+\-=.!]")
+
+_formatter = string.Formatter()
+
+
+# A MarkdownV2 message with {fields}. The source is parsed and checked once;
+# rendering escapes the values that need it with str.translate and fills them in.
+# `{name:url}` escapes a link target, `{name:raw}` inserts already rendered text.
+class Template:
+    __slots__ = ("name", "_format", "_fields")
+
+    def __init__(self, name, source):
+        self.name = name
+        literal_text = []
+        parts = []
+        fields = {}
+        for literal, field, spec, conversion in _formatter.parse(source):
+            literal_text.append(literal)
+            parts.append(literal.replace("{", "{{").replace("}", "}}"))
+            if field is None:
+                continue
+            if not field.isidentifier() or conversion or spec not in _ESCAPES:
+                raise ValueError(f"Template '{name}': invalid field {{{field}}}")
+            literal_text.append("0")
+            parts.append(f"{{{field}}}")
+            fields[field] = _ESCAPES[spec]
+        unescaped = _UNESCAPED.search(_LINK_TARGET.sub("]", "".join(literal_text)))
+        if unescaped:
+            raise ValueError(
+                f"Template '{name}': unescaped {unescaped.group()!r} in MarkdownV2 text"
+            )
+        self._format = "".join(parts)
+        self._fields = tuple(fields.items())
+
+    def render(self, /, **values):
+        escaped = {}
+        for field, escape in self._fields:
+            value = values[field]
+            value = "" if value is None else str(value)
+            if escape is not None and escape[0].search(value):
+                value = value.translate(escape[1])
+            escaped[field] = value
+        return self._format.format_map(escaped)
+
+
+_SOURCES = {
+    # Search and details
+    "library_match": "• *{title}* \\({year}\\) – {kind}",
+    "library_match_without_year": "• *{title}* – {kind}",
+    "library_matches": "✅ Bereits bei StreamNet TV vorhanden:\n\n{matches:raw}",
+    "no_results": "🛑 Keine Ergebnisse gefunden für *{title}*\\. Bitte versuche einen anderen Titel\\.",
+    "details_card": (
+        "🎬 *{title}* \\({year}\\) \n\n"
+        "{stars} \\- {rating}/10\n\n"
+        "{overview}\n\n"
+        "[Weitere Infos bei TMDb]({url:url})"
+    ),
+    "details_loaded": "🎬 Metadaten geladen\\!",
+    "movie_available": "✅ Der Film *{title}* ist bereits bei StreamNet TV vorhanden\\.",
+    "series_available": "✅ Die Serie *{title}* ist bereits bei StreamNet TV vorhanden\\.",
+    "series_seasons_missing": "‼️ Von der Serie *{title}* wurden noch nicht alle Staffeln angefragt\\.",
+    "tvdb_id_failed": "🛑 Fehler beim Abrufen der TVDB ID für die Serie *{title}*\\. {error}",
+    "tvdb_id_missing": "🛑 Keine TVDB ID gefunden für die Serie *{title}*\\.",
+    # Requests
+    "ask_to_add": "Willst du *{title}* anfragen?",
+    "ask_to_add_seasons": (
+        "Welche Staffeln von *{title}* willst du anfragen? "
+        "Wähle die neueste Staffel, alle Staffeln oder einzelne Staffeln aus\\."
+    ),
+    "ask_to_add_all_seasons": (
+        "Diese Staffeln von *{title}* können nicht zusammen ausgewählt werden\\. "
+        "Willst du *{title}* mit allen Staffeln anfragen?"
+    ),
+    "request_accepted": (
+        "📥 Deine Anfrage für *{title}* wurde angenommen\\. "
+        "Du bekommst hier Bescheid, sobald sie bearbeitet wurde\\."
+    ),
+    "request_in_progress": "⏳ *{title}* wurde bereits angefragt und wird gerade bearbeitet\\.",
+    "request_pending_since": "⏳ *{title}* wurde bereits am {date} angefragt und wird gerade bearbeitet\\.",
+    "request_available_since": "✅ *{title}* wurde bereits am {date} angefragt und ist bei StreamNet TV vorhanden\\.",
+    "request_failed": "🛑 Anfragen von *{title}* gescheitert\\. Bitte versuche es später erneut\\.",
+    # Job results
+    "movie_add_failed": "🛑 Anfragen des Films *{title}* gescheitert\\.\nStatus code: *{status}*",
+    "movie_search_started": "✅ Der Film *{title}* wurde angefragt und die Suche wurde gestartet\\.",
+    "movie_manual_search_started": "✅ Der Film *{title}* wurde angefragt\\. Manuelle Suche wurde gestartet\\.",
+    "movie_search_failed": "🛑 Suche für den Film *{title}* gescheitert\\.",
+    "series_add_failed": "🛑 Anfragen der Serie *{title}* gescheitert\\.\nStatus code: *{status}*",
+    "series_search_started": "✅ Die Serie *{title}* wurde angefragt und die Suche wurde gestartet\\.",
+    "series_manual_search_started": "✅ Die Serie *{title}* wurde angefragt\\. Manuelle Suche wurde gestartet\\.",
+    "series_seasons_search_started": "✅ Die Serie *{title}* \\(Staffel {seasons}\\) wurde angefragt und die Suche wurde gestartet\\.",
+    "series_seasons_manual_search_started": "✅ Die Serie *{title}* \\(Staffel {seasons}\\) wurde angefragt\\. Manuelle Suche wurde gestartet\\.",
+    "series_search_failed": "🛑 Suche für die Serie *{title}* gescheitert\\.",
+    # Download tracker
+    "movie_downloaded": "🍿 Der Film *{title}*, den du angefragt hast, ist jetzt bei StreamNet TV verfügbar\\. Viel Spaß\\!",
+    "series_downloaded": "🍿 Die Serie *{title}*, die du angefragt hast, ist jetzt bei StreamNet TV verfügbar\\. Viel Spaß\\!",
+    "episodes_announced": "🆕 Neu bei StreamNet TV: *{title}* {episodes}",
+    "movie_announced": "🆕 Neu bei StreamNet TV: der Film *{title}*",
+    "download_ready_mention": "🍿 [{name}](tg://user?id={user_id:url}), *{title}* ist jetzt bei StreamNet TV verfügbar\\. Viel Spaß\\!",
+    # Group
+    "welcome": (
+        "\n🎉 Howdy, *{name}*\\!\n\n"
+        "Vielen Dank, dass du diesen *Service* ausgewählt hast ❤️\\.\n\n"
+        "Username: *{username}*\n"
+        "Beitritt: *{joined}*\n\n"
+        "Wir hoffen, du hast eine gute Unterhaltung mit *StreamNet TV*\\.\n\n"
+        "Bei Fragen einfach in den verschiedenen *Kategorien* schreiben\\.\n\n"
+        "Happy streamnet\\-ing 📺"
+    ),
+    "night_mode_on": (
+        "🌙 NACHTMODUS AKTIVIERT\\.\n\n"
+        "StreamNet TV Staff Team braucht auch mal eine Pause 😴😪🥱💤🛌🏼"
+    ),
+    "night_mode_off": (
+        "☀️ ENDE DES NACHTMODUS\\.\n\n"
+        "✅ Ab jetzt kannst du wieder Mitteilungen in der Gruppe senden\\."
+    ),
+    "night_mode_restricted": (
+        "🛑 Sorry, solange der NACHTMODUS aktiviert ist \\({start} \\- {end}\\), "
+        "kannst du keine Mitteilungen in der Gruppe oder in den Topics senden\\."
+    ),
+}
+
+# Compiled when the module is imported, so a broken template stops the bot at startup
+TEMPLATES = {name: Template(name, source) for name, source in _SOURCES.items()}
+
+
+# Render a template to MarkdownV2 text (send it with parse_mode=PARSE_MODE)
+def render(template, /, **values):
+    return TEMPLATES[template].render(**values)
@@ -0,0 +1,112 @@
+import sys
+import time
+from collections import OrderedDict
+
+from streamnet.config import get_config
+
+
+# A title chosen by a user: only what the flow needs of the TMDB details.
+# `seasons` are the seasons offered for a series that is in Sonarr already
+# (the ones left out before), None when all of its seasons are offered.
+class MediaChoice:
+    __slots__ = ("tmdb_id", "media_type", "title", "year", "seasons")
+
+    def __init__(self, tmdb_id, media_type, title, year=None, seasons=None):
+        self.tmdb_id = tmdb_id
+        self.media_type = media_type
+        self.title = title
+        self.year = year
+        self.seasons = seasons
+
+
+# The request flow of one user. The search results are not kept: the
+# buttons carry the ids, so only the title the user selected is remembered.
+class Session:
+    __slots__ = ("selected", "touched_at")
+
+    def __init__(self, now):
+        self.selected = None
+        self.touched_at = now
+
+
+# Bytes held by a session, including its records and their strings
+def session_size(session):
+    size = sys.getsizeof(session)
+    choice = session.selected
+    if choice is not None:
+        size += sys.getsizeof(choice) + sys.getsizeof(choice.title)
+        if choice.seasons is not None:
+            size += sys.getsizeof(choice.seasons)
+    return size
+
+
+# Sessions by user id. Sessions not used for `ttl` seconds expire, and once
+# there are `max_sessions` the least recently used one is dropped. The dict
+# is kept in order of last use, so expired sessions are always at the front.
+class SessionStore:
+    def __init__(self, ttl, max_sessions):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _expire(self, now):
+        while self._sessions:
+            user_id, session = next(iter(self._sessions.items()))
+            if now - session.touched_at < self.ttl:
+                break
+            del self._sessions[user_id]
+
+    # The user's session, or None
+    def get(self, user_id):
+        now = time.monotonic()
+        self._expire(now)
+        session = self._sessions.get(user_id)
+        if session is not None:
+            session.touched_at = now
+            self._sessions.move_to_end(user_id)
+        return session
+
+    # The user's session, started if there is none
+    def open(self, user_id):
+        session = self.get(user_id)
+        if session is None:
+            session = self._sessions[user_id] = Session(time.monotonic())
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return session
+
+    def discard(self, user_id):
+        self._sessions.pop(user_id, None)
+
+    # Number of sessions, their total size and the average size in bytes
+    def memory(self):
+        self._expire(time.monotonic())
+        total = sum(session_size(session) for session in self._sessions.values())
+        total += sys.getsizeof(self._sessions)
+        count = len(self._sessions)
+        return count, total, total // count if count else 0
+
+
+_store = None
+
+
+# The session store of this process, set up from the sessions config
+def get_store():
+    global _store
+    if _store is None:
+        settings = get_config().sessions
+        _store = SessionStore(settings.ttl_seconds, settings.max_sessions)
+    return _store
+
+
+# Apply changed session limits (after a config reload)
+def apply_limits():
+    settings = get_config().sessions
+    store = get_store()
+    store.ttl = settings.ttl_seconds
+    store.max_sessions = settings.max_sessions
+    while len(store._sessions) > store.max_sessions:
+        store._sessions.popitem(last=False)
@@ -0,0 +1,39 @@
+import logging
+
+from streamnet.database import load_group_data
+
+logger = logging.getLogger("bot")
+
+# Global reference for the group data
+GROUP_CHAT_ID = None
+LANGUAGE = None
+
+
+# Check group data in database
+def initialize_group_data(default_language):
+    global GROUP_CHAT_ID, LANGUAGE
+    group_chat_id, language = load_group_data(default_language)
+
+    GROUP_CHAT_ID = group_chat_id  # Only assign the chat ID
+    LANGUAGE = language or default_language
+
+    if GROUP_CHAT_ID is None:
+        logger.info("")
+        logger.warning("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
+        logger.warning("Missing GROUP CHAT ID....")
+        logger.warning("GROUP CHAT ID is needed for NIGHT MODE")
+        logger.warning("Please set it using '/set_group_id' <-----")
+        logger.warning("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
+        logger.info("")
+        logger.info(f"TMDb LANGUAGE is set to: '{LANGUAGE}'")
+    else:
+        logger.info(f"GROUP CHAT ID is set to: '{GROUP_CHAT_ID}'")
+        logger.info(f"TMDb LANGUAGE is set to: '{LANGUAGE}'")
+
+
+# Re-read the group chat id and language, which another instance may have changed
+def reload_group_data():
+    global GROUP_CHAT_ID, LANGUAGE
+    group_chat_id, language = load_group_data(LANGUAGE)
+    GROUP_CHAT_ID = group_chat_id
+    LANGUAGE = language or LANGUAGE
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+
+from streamnet import detailscache, state
+from streamnet.config import get_config
+from streamnet.httpclient import request
+from streamnet.tracing import trace_span
+
+logger = logging.getLogger("bot")
+
+
+# Search for movies and TV shows on TMDb (retries once when rate limited)
+async def search_multi(title, language=None):
+    config = get_config()
+    url = f"{config.tmdb.api_url}/search/multi"
+    # As params, so titles like "Fast & Furious" are escaped
+    params = {
+        "api_key": config.tmdb.api_key,
+        "query": title,
+        "language": language or state.LANGUAGE,
+    }
+    async with trace_span("tmdb.search_multi"):
+        async with request("tmdb", "GET", url, params=params) as response:
+            if response.status == 429:
+                retry_after = int(response.headers.get("Retry-After", 1))
+                logger.warning(
+                    f"Rate limited by TMDb. Retrying after {retry_after} seconds."
+                )
+                await asyncio.sleep(retry_after)
+                async with request("tmdb", "GET", url, params=params) as retry_response:
+                    return await retry_response.json()
+            return await response.json()
+
+
+# Search only movies ("movie") or only TV shows ("tv") on TMDb, optionally
+# narrowed down to a release year
+async def search_title(media_type, title, year=None):
+    config = get_config()
+    url = f"{config.tmdb.api_url}/search/{media_type}"
+    params = {"api_key": config.tmdb.api_key, "query": title}
+    if year:
+        year_param = "year" if media_type == "movie" else "first_air_date_year"
+        params[year_param] = str(year)
+    async with trace_span(f"tmdb.search_{media_type}"):
+        async with request("tmdb", "GET", url, params=params) as response:
+            return await response.json()
+
+
+# Fetch additional details of a movie/TV show. Cached details are returned
+# right away; once they are older than the soft TTL they are refreshed in the
+# background, and past the hard TTL they are fetched again before returning.
+async def fetch_media_details(media_type, media_id, language=None):
+    language = language or state.LANGUAGE
+    settings = get_config().details_cache
+    if settings.enabled:
+        cached = detailscache.get_cached_details(
+            media_type, media_id, language, settings.hard_ttl_hours * 3600
+        )
+        if cached is not None:
+            media_details, age = cached
+            if age >= settings.soft_ttl_hours * 3600:
+                _revalidate_details(media_type, media_id, language)
+            logger.info(f"Details for {media_type} {media_id} served from cache")
+            return media_details
+
+    return await _fetch_and_store_details(media_type, media_id, language)
+
+
+async def _fetch_and_store_details(media_type, media_id, language):
+    config = get_config()
+    url = f"{config.tmdb.api_url}/{media_type}/{media_id}?api_key={config.tmdb.api_key}&language={language}"
+    logger.info(f"Fetching details for {media_type} {media_id} from TMDb")
+
+    async with trace_span("tmdb.details"):
+        async with request("tmdb", "GET", url) as response:
+            media_details = await response.json()
+            status = response.status
+
+    logger.info(f"Details fetched successfully for media_id: {media_id}")
+    if status == 200 and config.details_cache.enabled:
+        detailscache.store_details(
+            media_type,
+            media_id,
+            language,
+            media_details,
+            config.details_cache.max_entries,
+        )
+    return media_details
+
+
+# Keys of the details being refreshed in the background, with their tasks
+_revalidating = {}
+
+
+# Refresh stale details in the background (at most once per title at a time)
+def _revalidate_details(media_type, media_id, language):
+    key = (media_type, media_id, language)
+    if key in _revalidating:
+        return
+
+    async def revalidate():
+        try:
+            await _fetch_and_store_details(media_type, media_id, language)
+        except Exception as e:
+            logger.warning(
+                f"Failed to refresh details for {media_type} {media_id}: {e}"
+            )
+        finally:
+            _revalidating.pop(key, None)
+
+    _revalidating[key] = asyncio.create_task(revalidate())
+
+
+# Fetch the external IDs (TVDB, IMDb, ...) of a TV show from TMDb
+async def fetch_external_ids(series_tmdb_id):
+    config = get_config()
+    url = f"{config.tmdb.api_url}/tv/{series_tmdb_id}/external_ids?api_key={config.tmdb.api_key}"
+    async with trace_span("tmdb.external_ids"):
+        async with request("tmdb", "GET", url) as response:
+            if response.status != 200:
+                raise Exception(
+                    f"Failed to fetch external IDs, status code: {response.status}"
+                )
+            return await response.json()
@@ -0,0 +1,181 @@
+import json
+import logging
+import time
+import uuid
+from contextvars import ContextVar
+
+from telegram import Update
+from telegram.ext import Application
+from telegram.request import HTTPXRequest
+
+# Dedicated logger so traces can be routed or filtered separately from bot logs
+trace_logger = logging.getLogger("bot.trace")
+
+# Tracing settings (set from config.json through configure_tracing)
+TRACING_ENABLED = False
+SLOW_UPDATE_THRESHOLD_MS = 2000
+LOG_ALL_TRACES = False
+
+# The trace of the update currently being processed (None when tracing is off)
+_current_trace = ContextVar("current_trace", default=None)
+
+
+# Configure tracing from the "tracing" config section
+def configure_tracing(enabled=False, slow_update_threshold_ms=2000, log_all=False):
+    global TRACING_ENABLED, SLOW_UPDATE_THRESHOLD_MS, LOG_ALL_TRACES
+    TRACING_ENABLED = bool(enabled)
+    SLOW_UPDATE_THRESHOLD_MS = float(slow_update_threshold_ms)
+    LOG_ALL_TRACES = bool(log_all)
+
+
+# Span used when no trace is active, shared so the disabled path allocates nothing
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+# A timed step inside a trace, usable with both "with" and "async with"
+class Span:
+    __slots__ = ("trace", "name", "attrs", "start")
+
+    def __init__(self, trace, name, attrs):
+        self.trace = trace
+        self.name = name
+        self.attrs = attrs
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.trace.add_span(self, time.perf_counter(), exc_type)
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+
+# All spans recorded while processing a single Telegram update
+class Trace:
+    __slots__ = (
+        "trace_id",
+        "update_id",
+        "kind",
+        "chat_id",
+        "user_id",
+        "start",
+        "spans",
+    )
+
+    def __init__(self, update):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.update_id = update.update_id
+        self.kind = describe_update(update)
+        self.chat_id = update.effective_chat.id if update.effective_chat else None
+        self.user_id = update.effective_user.id if update.effective_user else None
+        self.start = time.perf_counter()
+        self.spans = []
+
+    def add_span(self, span, end, exc_type=None):
+        entry = {
+            "name": span.name,
+            "start_ms": round((span.start - self.start) * 1000, 2),
+            "duration_ms": round((end - span.start) * 1000, 2),
+        }
+        if span.attrs:
+            entry.update(span.attrs)
+        if exc_type is not None:
+            entry["error"] = exc_type.__name__
+        self.spans.append(entry)
+
+    def to_dict(self, duration_ms):
+        return {
+            "trace_id": self.trace_id,
+            "update_id": self.update_id,
+            "kind": self.kind,
+            "chat_id": self.chat_id,
+            "user_id": self.user_id,
+            "duration_ms": round(duration_ms, 2),
+            "slow": duration_ms >= SLOW_UPDATE_THRESHOLD_MS,
+            "spans": self.spans,
+        }
+
+
+# Short description of what triggered an update (command, callback, message, ...).
+# For signed callback data only the head (action and media type) is kept, so
+# all presses of one kind of button share a kind.
+def describe_update(update):
+    if update.callback_query:
+        data = update.callback_query.data or ""
+        return f"callback:{data.split('.', 1)[0]}"
+    message = update.effective_message
+    if message is not None:
+        if message.new_chat_members:
+            return "new_chat_members"
+        if message.text and message.text.startswith("/"):
+            return f"command:{message.text.split()[0][1:].split('@', 1)[0]}"
+        return "message"
+    return "other"
+
+
+# Open a span in the current trace (no-op singleton when tracing is off)
+def trace_span(name, **attrs):
+    trace = _current_trace.get()
+    if trace is None:
+        return _NULL_SPAN
+    return Span(trace, name, attrs)
+
+
+# Trace id of the update being processed, e.g. for correlating log lines
+def current_trace_id():
+    trace = _current_trace.get()
+    return trace.trace_id if trace is not None else None
+
+
+# Emit a finished trace as one JSON line
+def emit_trace(trace):
+    duration_ms = (time.perf_counter() - trace.start) * 1000
+    if duration_ms >= SLOW_UPDATE_THRESHOLD_MS:
+        trace_logger.warning(json.dumps(trace.to_dict(duration_ms), ensure_ascii=False))
+    elif LOG_ALL_TRACES:
+        trace_logger.info(json.dumps(trace.to_dict(duration_ms), ensure_ascii=False))
+
+
+# Application that opens a trace around every update it processes
+class TracingApplication(Application):
+    async def process_update(self, update):
+        if not TRACING_ENABLED or not isinstance(update, Update):
+            return await super().process_update(update)
+
+        trace = Trace(update)
+        token = _current_trace.set(trace)
+        try:
+            await super().process_update(update)
+        finally:
+            _current_trace.reset(token)
+            emit_trace(trace)
+
+
+# Bot API request backend that records every Telegram call as a span
+class TracingRequest(HTTPXRequest):
+    async def do_request(self, url, method, *args, **kwargs):
+        async with trace_span(f"telegram.{url.rsplit('/', 1)[-1]}"):
+            return await super().do_request(url, method, *args, **kwargs)
@@ -0,0 +1,31 @@
+from datetime import datetime
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from streamnet.config import get_config
+
+
+# Get the current time in the desired timezone
+def get_current_time():
+    return datetime.now(get_config().bot.tzinfo)
+
+
+# Function for admin commands
+def admin_required(func):
+    async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        chat_id = update.effective_chat.id
+        user_id = update.effective_user.id
+
+        # Check if the user is an admin
+        member = await context.bot.get_chat_member(chat_id, user_id)
+        is_admin = member.status in ("administrator", "creator")
+
+        if not is_admin:
+            await update.message.reply_text(
+                "🚫 Dieser Befehl ist nur für Staff Mitglieder..."
+            )
+            return
+        return await func(update, context)
+
+    return wrapper
@@ -0,0 +1,208 @@
+import asyncio
+import collections
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+import traceback
+
+logger = logging.getLogger("bot")
+
+# How often the event loop reports that it is alive
+HEARTBEAT_SECONDS = 0.1
+# Longest profile /profile takes
+MAX_PROFILE_SECONDS = 60
+# How often the profiler looks at the event loop
+SAMPLE_SECONDS = 0.005
+
+_watchdog = None
+
+
+def _function(code):
+    path = os.path.relpath(code.co_filename)
+    if path.startswith(".."):
+        path = code.co_filename
+    return f"{path} {code.co_name}"
+
+
+# Where a frame is, e.g. "streamnet/arr.py:42 get_quality_profile_id"
+def describe_frame(frame):
+    path, name = _function(frame.f_code).rsplit(" ", 1)
+    return f"{path}:{frame.f_lineno} {name}"
+
+
+def _loop_frame(thread_id):
+    return sys._current_frames().get(thread_id)
+
+
+# Watches the event loop from a separate thread. A task on the loop updates a
+# heartbeat; when the heartbeat is older than the threshold, the loop is
+# blocked and the thread logs the stack the loop thread is stuck in, together
+# with the task that is running. The full lag is logged once the loop is back.
+class LoopWatchdog:
+    def __init__(self, threshold_ms):
+        self.threshold = threshold_ms / 1000
+        self.stalls = 0
+        self.max_lag_ms = 0.0
+        self._loop = None
+        self._thread_id = None
+        self._heartbeat = time.monotonic()
+        self._task = None
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._task = asyncio.create_task(self._beat(), name="loop-watchdog")
+        self._thread = threading.Thread(
+            target=self._watch, name="loop-watchdog", daemon=True
+        )
+        self._thread.start()
+
+    async def stop(self):
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._thread is not None:
+            self._thread.join(1)
+            self._thread = None
+
+    # Runs on the loop: sleep, then note how late the loop woke us up
+    async def _beat(self):
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(HEARTBEAT_SECONDS)
+            now = time.monotonic()
+            self._heartbeat = now
+            lag_ms = (now - started - HEARTBEAT_SECONDS) * 1000
+            if lag_ms > self.max_lag_ms:
+                self.max_lag_ms = lag_ms
+            if lag_ms >= self.threshold * 1000:
+                logger.warning(f"EVENT LOOP was blocked for {lag_ms:.0f} ms")
+
+    # Runs in its own thread: catch the loop while it is blocked
+    def _watch(self):
+        reported = None
+        while not self._stopped.wait(self.threshold / 2):
+            heartbeat = self._heartbeat
+            if time.monotonic() - heartbeat < self.threshold:
+                continue
+            if reported == heartbeat:
+                continue  # already reported this stall
+            reported = heartbeat
+            self.stalls += 1
+            frame = _loop_frame(self._thread_id)
+            if frame is None:
+                continue
+            task = asyncio.current_task(self._loop)
+            stack = "".join(traceback.format_stack(frame))
+            logger.warning(
+                f"EVENT LOOP blocked for more than {self.threshold * 1000:.0f} ms "
+                f"in task '{task.get_name() if task else None}' at "
+                f"{describe_frame(frame)}:\n{stack}"
+            )
+
+
+# Start watching the event loop this is called from
+def start_watchdog(threshold_ms):
+    global _watchdog
+    _watchdog = LoopWatchdog(threshold_ms)
+    _watchdog.start()
+    logger.info(f"EVENT LOOP WATCHDOG started, threshold {threshold_ms:g} ms")
+
+
+async def stop_watchdog():
+    global _watchdog
+    if _watchdog is not None:
+        await _watchdog.stop()
+        _watchdog = None
+
+
+# Raised when the profiler cannot run in this process or is already running
+class ProfilerUnavailable(Exception):
+    pass
+
+
+# Frames below this one belong to the event loop itself
+_HANDLE_RUN = asyncio.events.Handle._run.__code__
+
+
+# Counts where the event loop thread is at each sample. Samples where the loop
+# was not running a callback count as idle. For the others, counts per
+# function how often it was running itself (own) and how often it was anywhere
+# on the stack above the loop (total).
+class _Samples:
+    def __init__(self):
+        self.samples = 0
+        self.idle = 0
+        self.own = collections.Counter()
+        self.total = collections.Counter()
+
+    def add(self, frame):
+        self.samples += 1
+        stack = []
+        while frame is not None and frame.f_code is not _HANDLE_RUN:
+            stack.append(frame)
+            frame = frame.f_back
+        if frame is None or not stack:
+            self.idle += 1
+            return
+        self.own[describe_frame(stack[0])] += 1
+        for name in {_function(frame.f_code) for frame in stack}:
+            self.total[name] += 1
+
+
+_profiling = False
+
+
+# Profile the event loop for `seconds`. A wall-clock timer interrupts the
+# loop every SAMPLE_SECONDS and the signal handler, which Python runs on the
+# main thread, records the frame it interrupted; this also catches blocking
+# calls that use no CPU. Needs the loop to run in the main thread on Unix.
+async def profile_loop(seconds):
+    global _profiling
+    if not hasattr(signal, "setitimer"):
+        raise ProfilerUnavailable("Profiling is not supported on this platform.")
+    if threading.current_thread() is not threading.main_thread():
+        raise ProfilerUnavailable("The event loop does not run in the main thread.")
+    if _profiling:
+        raise ProfilerUnavailable("A profile is already running.")
+
+    samples = _Samples()
+    _profiling = True
+    previous = signal.signal(signal.SIGALRM, lambda signum, frame: samples.add(frame))
+    signal.setitimer(signal.ITIMER_REAL, SAMPLE_SECONDS, SAMPLE_SECONDS)
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+        _profiling = False
+    return samples.samples, samples.idle, samples.own, samples.total
+
+
+# Text of a profile: the functions the loop spent most time in
+def profile_report(seconds, samples, idle, own, total, limit=10):
+    lines = [f"Profil über {seconds:g} s, {samples} Stichproben"]
+    if samples:
+        lines.append(f"Leerlauf: {idle * 100 / samples:.1f}%")
+    if own:
+        lines += ["", "Selbst:"]
+        for name, count in own.most_common(limit):
+            lines.append(f"{count * 100 / samples:5.1f}%  {name}")
+        lines += ["", "Gesamt:"]
+        for name, count in total.most_common(limit):
+            lines.append(f"{count * 100 / samples:5.1f}%  {name}")
+    if _watchdog is not None:
+        lines += [
+            "",
+            f"Event Loop: {_watchdog.stalls} Blockaden, "
+            f"maximale Verzögerung {_watchdog.max_lag_ms:.0f} ms",
+        ]
+    return "\n".join(lines)
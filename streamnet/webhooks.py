@@ -0,0 +1,179 @@
+import asyncio
+import hmac
+import logging
+import socket
+from datetime import datetime, timezone
+
+import aiohttp
+import telegram.error
+from aiohttp import web
+
+from streamnet import arr, downloads, ledger, library, rendering, state
+from streamnet.config import get_config
+from streamnet.httpclient import ServiceUnavailable
+
+logger = logging.getLogger("bot")
+
+# Key of the series/movie in the webhook payloads of each service
+ITEM_KEYS = {"sonarr": "series", "radarr": "movie"}
+# Episodes listed when a download is announced in the group
+MAX_ANNOUNCED_EPISODES = 5
+
+_runner = None
+# Bot used to send the notifications
+_bot = None
+
+
+# Whether every aired, monitored episode of a Sonarr series has a file
+async def _series_complete(series_id):
+    episodes = await arr.get_episodes(series_id)
+    now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    return all(
+        episode.get("hasFile")
+        for episode in episodes
+        if episode.get("monitored") and (episode.get("airDateUtc") or now) < now
+    )
+
+
+# The ledger entry of a series or movie from a webhook payload
+def _find_request(service, item):
+    if service == "radarr":
+        return ledger.find_request("movie", item.get("tmdbId"))
+    if item.get("tvdbId"):
+        return ledger.find_request_by_tvdb_id(item["tvdbId"])
+    return ledger.find_request("tv", item.get("tmdbId"))
+
+
+# Grab, Rename, SeriesAdd, MovieAdded: keep the library index up to date
+async def _update(bot, service, item, payload):
+    library.index_item(service, item)
+
+
+# Download: a title the bot is watching is done once all its wanted files are
+# there; other downloads are announced in the group when ANNOUNCE is set
+async def _download(bot, service, item, payload):
+    library.index_item(service, item)
+    if payload.get("isUpgrade"):
+        return
+    row = downloads.find_download(service, item.get("id"))
+    if row is not None:
+        try:
+            complete = service == "radarr" or await _series_complete(item["id"])
+        except (ServiceUnavailable, aiohttp.ClientError, asyncio.TimeoutError) as e:
+            # The download tracker finds out on its next poll
+            logger.warning(f"WEBHOOK could not check '{item.get('title')}': {e}")
+            return
+        if complete:
+            await downloads.finish_download(bot, row, item.get("title", ""))
+        return
+    if get_config().webhooks.announce and state.GROUP_CHAT_ID:
+        await _announce(bot, service, item, payload)
+
+
+async def _announce(bot, service, item, payload):
+    if service == "sonarr":
+        episodes = payload.get("episodes") or []
+        codes = [
+            f"S{episode.get('seasonNumber', 0):02d}E{episode.get('episodeNumber', 0):02d}"
+            for episode in episodes[:MAX_ANNOUNCED_EPISODES]
+        ]
+        if len(episodes) > MAX_ANNOUNCED_EPISODES:
+            codes.append("…")
+        text = rendering.render(
+            "episodes_announced", title=item.get("title", ""), episodes=", ".join(codes)
+        )
+    else:
+        text = rendering.render("movie_announced", title=item.get("title", ""))
+    try:
+        await bot.send_message(
+            chat_id=state.GROUP_CHAT_ID, text=text, parse_mode=rendering.PARSE_MODE
+        )
+    except telegram.error.TelegramError as e:
+        logger.error(f"Failed to announce '{item.get('title')}': {e}")
+
+
+# SeriesDelete, MovieDelete: forget the title, so it can be requested again
+async def _delete(bot, service, item, payload):
+    library.unindex_item(service, item)
+    if item.get("id"):
+        downloads.untrack_download(service, item["id"])
+    request = _find_request(service, item)
+    if request and request["status"] in (
+        ledger.ADDED,
+        ledger.AVAILABLE,
+        ledger.DOWNLOADED,
+    ):
+        ledger.set_request_status(
+            request["media_type"], request["tmdb_id"], ledger.REMOVED
+        )
+
+
+# Event type -> handler. Test, Health and file deletions are only logged.
+EVENT_HANDLERS = {
+    "Grab": _update,
+    "Download": _download,
+    "Rename": _update,
+    "SeriesAdd": _update,
+    "MovieAdded": _update,
+    "SeriesDelete": _delete,
+    "MovieDelete": _delete,
+}
+
+
+# Apply a Sonarr ("sonarr") or Radarr ("radarr") webhook event
+async def handle_event(bot, service, payload):
+    event = payload.get("eventType")
+    item = payload.get(ITEM_KEYS[service]) or {}
+    logger.info(f"WEBHOOK {service} {event}: '{item.get('title', '')}'")
+    handler = EVENT_HANDLERS.get(event)
+    if handler is not None and item:
+        await handler(bot, service, item, payload)
+
+
+# POST /webhooks/{service}/{secret}. Requests with a wrong secret get the same
+# 404 as unknown paths.
+async def _receive(request):
+    service = request.match_info["service"]
+    secret = get_config().webhooks.secret
+    if (
+        service not in ITEM_KEYS
+        or not secret
+        or not hmac.compare_digest(
+            request.match_info["secret"].encode(), secret.encode()
+        )
+    ):
+        raise web.HTTPNotFound()
+    try:
+        payload = await request.json()
+    except ValueError:
+        raise web.HTTPBadRequest(text="Invalid JSON") from None
+    if not isinstance(payload, dict):
+        raise web.HTTPBadRequest(text="Expected a JSON object")
+    try:
+        await handle_event(_bot, service, payload)
+    except Exception:
+        logger.exception(f"Failed to handle WEBHOOK from {service}")
+        raise web.HTTPInternalServerError() from None
+    return web.Response(status=204)
+
+
+# Receive Sonarr/Radarr webhooks. With worker processes only the front process
+# receives them; instances on the same host share the port (SO_REUSEPORT),
+# like the health endpoints.
+async def start_webhook_server(application, host, port):
+    global _runner, _bot
+    _bot = application.bot
+    app = web.Application()
+    app.router.add_post("/webhooks/{service}/{secret}", _receive)
+    _runner = web.AppRunner(app, access_log=None)
+    await _runner.setup()
+    site = web.TCPSite(_runner, host, port, reuse_port=hasattr(socket, "SO_REUSEPORT"))
+    await site.start()
+    logger.info(f"WEBHOOKS listening on http://{host}:{port}/webhooks/<service>/...")
+
+
+async def stop_webhook_server():
+    global _runner
+    if _runner is not None:
+        await _runner.cleanup()
+        _runner = None
@@ -0,0 +1,39 @@
+import os
+
+import pytest
+
+from streamnet import config, httpclient
+
+
+# Build a config from the given sections (plus a bot token) and make it the
+# active one
+@pytest.fixture
+def make_config():
+    def make(**sections):
+        raw = {"bot": {"TOKEN": "123456:TEST-TOKEN"}}
+        raw.update(sections)
+        active = config.parse_config(raw)
+        config.set_config(active)
+        return active
+
+    yield make
+    config.set_config(None)
+
+
+# Run in an empty directory, so the SQLite database (database/group_data.db,
+# relative to the working directory) starts out empty
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("database")
+    return tmp_path
+
+
+# Fresh circuit breakers and timeouts for every test
+@pytest.fixture(autouse=True)
+def reset_httpclient():
+    httpclient._breakers.clear()
+    httpclient._timeouts.clear()
+    yield
+    httpclient._breakers.clear()
+    httpclient._timeouts.clear()
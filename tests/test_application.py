@@ -0,0 +1,35 @@
+from telegram.ext import ApplicationBuilder
+
+from streamnet import application
+
+
+def _build(worker):
+    builder = ApplicationBuilder().token("123456:TEST-TOKEN")
+    return application.build_application(builder, worker=worker)
+
+
+def _job_names(app):
+    return sorted(job.name for job in app.job_queue.jobs())
+
+
+def test_worker_build_only_runs_handlers(make_config):
+    make_config(quota={"ENABLED": True}, downloads={"ENABLED": True})
+    worker = _build(worker=True)
+
+    assert worker.post_init is application.start_worker_subsystems
+    assert _job_names(worker) == ["save_quota", "watch_config"]
+    # The same handlers as a single process
+    front = _build(worker=False)
+    assert [type(handler) for handler in worker.handlers[0]] == [
+        type(handler) for handler in front.handlers[0]
+    ]
+
+
+def test_full_build_runs_scheduled_jobs(make_config):
+    make_config(quota={"ENABLED": True}, downloads={"ENABLED": True})
+    front = _build(worker=False)
+
+    assert front.post_init is application.start_subsystems
+    assert {"check_downloads", "night_mode_checker", "preflight"} <= set(
+        _job_names(front)
+    )
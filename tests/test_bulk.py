@@ -0,0 +1,127 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from aiohttp.test_utils import TestServer
+
+from benchmarks.stubs import RadarrStub
+from streamnet import bulk, httpclient, jobqueue, ledger
+from streamnet.bulk import BulkEntry, parse_bulk_line, parse_bulk_list
+
+
+def test_ids_need_the_tmdb_prefix():
+    assert parse_bulk_line("tmdb:movie:603") == BulkEntry(
+        line="tmdb:movie:603", tmdb_id=603, media_type="movie"
+    )
+    assert parse_bulk_line("TMDB: tv: 1399").tmdb_id == 1399
+    assert parse_bulk_line("TMDB: tv: 1399").media_type == "tv"
+    assert parse_bulk_line("tmdb:603").media_type == "movie"
+
+
+def test_numbers_after_a_type_are_titles():
+    assert parse_bulk_line("movie: 1917") == BulkEntry(
+        line="movie: 1917", title="1917", media_type="movie"
+    )
+    assert parse_bulk_line("tv: 24") == BulkEntry(
+        line="tv: 24", title="24", media_type="tv"
+    )
+
+
+def test_titles_with_years_and_comments():
+    assert parse_bulk_line("Inception (2010)") == BulkEntry(
+        line="Inception (2010)", title="Inception", year=2010
+    )
+    assert parse_bulk_line("  # a comment") is None
+    assert parse_bulk_line("   ") is None
+    assert [
+        entry.title
+        for entry in parse_bulk_list("Fast & Furious\nfast & furious\nAlien")
+    ] == [
+        "Fast & Furious",
+        "Alien",
+    ]
+
+
+class FakeMessage:
+    def __init__(self, text):
+        self.text = text
+        self.document = None
+        self.reply_to_message = None
+        self.edits = []
+
+    async def reply_text(self, text):
+        return self
+
+    async def edit_text(self, text):
+        self.edits.append(text)
+
+
+class FakeBot:
+    async def get_chat_member(self, chat_id, user_id):
+        return SimpleNamespace(status="administrator")
+
+
+async def _resolve(entry):
+    tvdb_id = 5000 + entry.tmdb_id if entry.media_type == "tv" else None
+    return bulk.ResolvedMedia(
+        entry=entry,
+        media_type=entry.media_type,
+        tmdb_id=entry.tmdb_id,
+        title=f"Title {entry.tmdb_id}",
+        tvdb_id=tvdb_id,
+    )
+
+
+# Run /bulk against the Radarr stub, with Sonarr at `sonarr_url`
+async def _bulk(make_config, stub, text, sonarr_url):
+    message = FakeMessage(f"/bulk\n{text}")
+    update = SimpleNamespace(
+        message=message,
+        effective_chat=SimpleNamespace(id=-100),
+        effective_user=SimpleNamespace(id=1, username="admin"),
+    )
+    async with TestServer(stub.app) as server:
+        make_config(
+            radarr={
+                "URL": str(server.make_url("")).rstrip("/"),
+                "API_KEY": "key",
+                "QUALITY_PROFILE_NAME": "HD",
+            },
+            sonarr={"URL": sonarr_url, "API_KEY": "key"},
+        )
+        try:
+            await bulk.bulk_request(update, SimpleNamespace(bot=FakeBot()))
+        finally:
+            await httpclient.close_session()
+    return message.edits[-1]
+
+
+@pytest.fixture
+def bulk_tables(workdir, monkeypatch):
+    jobqueue.init_job_queue()
+    ledger.init_ledger()
+    monkeypatch.setattr(bulk, "resolve_entry", _resolve)
+
+
+def test_movie_list_does_not_need_sonarr(make_config, bulk_tables):
+    stub = RadarrStub(library_size=10)
+    text = asyncio.run(
+        _bulk(make_config, stub, "tmdb:movie:5\ntmdb:movie:603", sonarr_url="")
+    )
+    assert "Hinzugefügt: 1" in text
+    assert "Bereits vorhanden: 1" in text
+    assert "Fehlgeschlagen" not in text
+
+
+def test_series_fail_alone_when_sonarr_is_down(make_config, bulk_tables):
+    stub = RadarrStub(library_size=10)
+    text = asyncio.run(
+        _bulk(
+            make_config,
+            stub,
+            "tmdb:movie:603\ntmdb:tv:1399",
+            sonarr_url="http://127.0.0.1:9",
+        )
+    )
+    assert "Hinzugefügt: 1" in text
+    assert "Fehlgeschlagen: Title 1399" in text
@@ -0,0 +1,57 @@
+import pytest
+
+from streamnet import callbackdata
+from streamnet.media import MAX_SEASON_BUTTONS, seasons_keyboard
+
+USER = 4242
+
+
+@pytest.fixture(autouse=True)
+def signing_key(make_config, monkeypatch):
+    make_config()
+    monkeypatch.setattr(callbackdata, "_key", None)
+
+
+def _roundtrip(*args, **kwargs):
+    data = callbackdata.encode(*args, USER, **kwargs)
+    assert len(data.encode()) <= callbackdata.MAX_LENGTH
+    return callbackdata.decode(data, USER)
+
+
+def test_roundtrip():
+    assert _roundtrip(callbackdata.SELECT, "movie", 603) == callbackdata.MediaCallback(
+        "s", "movie", 603
+    )
+    assert _roundtrip(
+        callbackdata.ADD, "tv", 1399, tvdb_id=121361, seasons=[3, 1]
+    ) == callbackdata.MediaCallback("a", "tv", 1399, 121361, (1, 3))
+
+
+def test_other_users_cannot_press_a_button():
+    data = callbackdata.encode(callbackdata.ADD, "movie", 603, USER)
+    with pytest.raises(callbackdata.InvalidCallbackData):
+        callbackdata.decode(data, USER + 1)
+
+
+def test_seasons_numbered_by_year_fit():
+    seasons = list(range(1990, 2025))
+    callback = _roundtrip(
+        callbackdata.ADD, "tv", 999999, tvdb_id=9999999, seasons=seasons[-30:]
+    )
+    assert callback.seasons == tuple(seasons[-30:])
+
+
+def test_seasons_too_far_apart_do_not_fit():
+    with pytest.raises(ValueError):
+        callbackdata.encode(callbackdata.ADD, "tv", 1, USER, 2, seasons=[1, 2019])
+
+
+def test_keyboard_of_a_long_running_daily_show():
+    seasons = list(range(1990, 2025))
+    picked = seasons[-MAX_SEASON_BUTTONS:][::2]
+    keyboard = seasons_keyboard(999999, 9999999, USER, seasons, picked)
+    for row in keyboard.inline_keyboard:
+        for button in row:
+            callbackdata.decode(button.callback_data, USER)
+    confirm = keyboard.inline_keyboard[-1][0]
+    assert callbackdata.decode(confirm.callback_data, USER).seasons == tuple(picked)
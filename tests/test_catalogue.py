@@ -0,0 +1,98 @@
+import os
+import sqlite3
+
+import pytest
+
+from streamnet import catalogue
+from streamnet.database import DATABASE_FILE
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def _fixture(name):
+    return os.path.join(FIXTURES, name)
+
+
+def _titles():
+    with sqlite3.connect(DATABASE_FILE) as conn:
+        return dict(conn.execute("SELECT tmdb_id, title FROM catalogue").fetchall())
+
+
+def _fts_matches(word):
+    with sqlite3.connect(DATABASE_FILE) as conn:
+        rows = conn.execute(
+            "SELECT rowid FROM catalogue_fts WHERE catalogue_fts MATCH ?", (word,)
+        ).fetchall()
+    return len(rows)
+
+
+@pytest.fixture
+def ingested(workdir, monkeypatch):
+    monkeypatch.setattr(catalogue, "_ready", None)
+    catalogue.init_catalogue()
+    catalogue.ingest_export(_fixture("movie_ids_v1.json.gz"), "movie", "2024-05-14")
+    catalogue.init_catalogue()
+
+
+def test_first_ingest(ingested):
+    # Adult, untitled and malformed lines are skipped
+    assert _titles() == {
+        1: "Alien",
+        2: "Aliens",
+        3: "The Matrix",
+        7: "The Matrix Reloaded",
+    }
+    assert catalogue.ingested_exports() == {"movie": "2024-05-14"}
+    with sqlite3.connect(DATABASE_FILE) as conn:
+        entries = conn.execute("SELECT entries FROM catalogue_exports").fetchone()[0]
+    assert entries == 4
+
+
+def test_parse_export_line_skips_malformed_lines():
+    assert catalogue.parse_export_line('{"id": 5, "original_title": "Broken') is None
+    assert catalogue.parse_export_line('{"id": "x", "original_title": "A"}') is None
+    assert catalogue.parse_export_line("[]") is None
+    assert catalogue.parse_export_line(
+        '{"id": 8, "original_name": "Dark", "popularity": 2}'
+    ) == (8, "Dark", 2.0)
+
+
+def test_reingest_updates_renamed_titles(ingested):
+    catalogue.ingest_export(_fixture("movie_ids_v2.json.gz"), "movie", "2024-05-15")
+
+    assert _titles()[3] == "Matrix"
+    # The full-text index follows the rename: "the" is now only in one title
+    assert _fts_matches("the") == 1
+    assert [r["title"] for r in catalogue.search_catalogue("matrix")] == [
+        "Matrix",
+        "The Matrix Reloaded",
+    ]
+
+
+def test_reingest_removes_missing_ids(ingested):
+    catalogue.ingest_export(_fixture("movie_ids_v2.json.gz"), "movie", "2024-05-15")
+
+    assert 2 not in _titles()
+    assert _fts_matches("aliens") == 0
+    assert catalogue.ingested_exports() == {"movie": "2024-05-15"}
+
+
+def test_search_catalogue(ingested):
+    # The last word is a prefix; exact titles come before more popular ones
+    results = catalogue.search_catalogue("alien")
+    assert [r["title"] for r in results] == ["Alien", "Aliens"]
+    assert results[0] == {
+        "id": 1,
+        "media_type": "movie",
+        "popularity": 50.5,
+        "title": "Alien",
+    }
+    assert [r["id"] for r in catalogue.search_catalogue("matrix")] == [3, 7]
+    assert catalogue.search_catalogue("matrix", media_type="tv") == []
+    assert catalogue.search_catalogue("?!") == []
+
+
+def test_search_before_first_ingest(workdir, monkeypatch):
+    monkeypatch.setattr(catalogue, "_ready", None)
+    catalogue.init_catalogue()
+    assert catalogue.search_catalogue("alien") == []
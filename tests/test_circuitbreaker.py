@@ -0,0 +1,39 @@
+from streamnet.circuitbreaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+# A breaker that is open and lets its probe through on the next allow()
+def _half_open():
+    breaker = CircuitBreaker("test", min_calls=2, open_seconds=0)
+    slow = breaker.allow()
+    for _ in range(2):
+        breaker.record(breaker.allow(), False)
+    assert breaker.state == OPEN
+    return breaker, slow
+
+
+def test_only_the_probe_closes_the_breaker():
+    breaker, slow = _half_open()
+    probe = breaker.allow()
+    assert breaker.state == HALF_OPEN
+    breaker.record(slow, True)
+    assert breaker.state == HALF_OPEN
+    breaker.record(probe, True)
+    assert breaker.state == CLOSED
+
+
+def test_failure_of_a_call_from_before_does_not_reopen():
+    breaker, slow = _half_open()
+    probe = breaker.allow()
+    breaker.record(slow, False)
+    assert breaker.state == HALF_OPEN
+    breaker.record(probe, False)
+    assert breaker.state == OPEN
+
+
+def test_release_of_another_call_keeps_the_probe_in_flight():
+    breaker, slow = _half_open()
+    probe = breaker.allow()
+    breaker.release(slow)
+    assert breaker.allow() is None
+    breaker.release(probe)
+    assert breaker.allow() is not None
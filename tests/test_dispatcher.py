@@ -0,0 +1,84 @@
+import asyncio
+import multiprocessing
+import queue
+from types import SimpleNamespace
+
+from telegram import Update
+
+from streamnet import dispatcher
+
+
+class FakeBot:
+    def __init__(self, batches):
+        self.batches = list(batches)
+        self.calls = []
+        self.idle = asyncio.Event()
+
+    async def get_updates(self, offset=None, timeout=None, **kwargs):
+        self.calls.append((offset, timeout))
+        if self.batches:
+            return self.batches.pop(0)
+        if timeout == 0:
+            return []
+        self.idle.set()
+        await asyncio.Event().wait()
+
+
+def test_full_queue_drops_the_update_and_polling_goes_on(monkeypatch):
+    monkeypatch.setattr(dispatcher, "PUT_TIMEOUT", 0.05)
+    stuck = queue.Queue(1)
+    stuck.put("waiting")
+    bot = FakeBot([[Update(5)], [Update(6)]])
+
+    async def poll():
+        task = asyncio.create_task(dispatcher._poll(bot, [stuck]))
+        await bot.idle.wait()
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(poll())
+    assert bot.calls[:3] == [(None, 30), (6, 30), (7, 30)]
+
+
+def test_stopping_confirms_the_updates_handed_out():
+    updates = queue.Queue()
+    bot = FakeBot([[Update(5), Update(6)]])
+
+    async def poll():
+        task = asyncio.create_task(dispatcher._poll(bot, [updates]))
+        await bot.idle.wait()
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(poll())
+    assert updates.qsize() == 2
+    assert bot.calls[-1] == (7, 0)
+
+
+def test_dead_worker_is_restarted_on_its_queue(monkeypatch):
+    monkeypatch.setattr(dispatcher, "WORKER_CHECK_SECONDS", 0.01)
+    spawned = []
+
+    def spawn(context, number, updates):
+        spawned.append((number, updates))
+        return SimpleNamespace(is_alive=lambda: True)
+
+    monkeypatch.setattr(dispatcher, "_spawn", spawn)
+    context = multiprocessing.get_context("spawn")
+    queues = [context.Queue(), context.Queue()]
+    lock = queues[1]._rlock
+    workers = [
+        SimpleNamespace(is_alive=lambda: True, exitcode=None),
+        SimpleNamespace(is_alive=lambda: False, exitcode=-9),
+    ]
+
+    async def watch():
+        task = asyncio.create_task(dispatcher._watch_workers(context, workers, queues))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(watch())
+    assert spawned == [(1, queues[1])]
+    assert workers[1].is_alive()
+    assert queues[1]._rlock is not lock
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+from aiohttp.test_utils import TestServer
+
+from benchmarks.stubs import RadarrStub
+from streamnet import downloads, httpclient, jobqueue, ledger
+
+
+class FakeBot:
+    def __init__(self):
+        self.messages = []
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        self.messages.append((chat_id, text))
+
+
+@pytest.fixture
+def tables(workdir):
+    jobqueue.init_job_queue()
+    ledger.init_ledger()
+    downloads.init_downloads()
+
+
+def _track(item_id, user_id=None):
+    ledger.record_request(
+        "movie", item_id, f"Movie {item_id}", user_id, None, None, status=ledger.ADDED
+    )
+    downloads.track_download("radarr", item_id, item_id)
+
+
+async def _poll(make_config, stub, polls=1):
+    bot = FakeBot()
+    async with TestServer(stub.app) as server:
+        make_config(
+            radarr={"URL": str(server.make_url("")).rstrip("/"), "API_KEY": "key"},
+            downloads={"ENABLED": True},
+        )
+        try:
+            for _ in range(polls):
+                await downloads.poll_downloads(bot, downloads.tracked_downloads(), 0)
+        finally:
+            await httpclient.close_session()
+    return bot
+
+
+def test_poll_cost_does_not_grow_with_waiting_titles(make_config, tables):
+    make_config(downloads={"ENABLED": True})
+    stub = RadarrStub(library_size=60)
+    # Unreleased movies that are not monitored yet: neither queued nor missing
+    for item in stub.library:
+        item["monitored"] = False
+        item["hasFile"] = False
+    for item_id in range(1, 61):
+        _track(item_id)
+
+    asyncio.run(_poll(make_config, stub, polls=3))
+
+    assert len(downloads.tracked_downloads()) == 60
+    assert stub.calls == {
+        "GET /api/v3/queue": 3,
+        "GET /api/v3/wanted/missing": 3,
+        "GET /api/v3/movie": 3,
+    }
+
+
+def test_poll_finishes_downloaded_and_drops_deleted_titles(make_config, tables):
+    make_config(downloads={"ENABLED": True})
+    stub = RadarrStub(library_size=9)
+    _track(1, user_id=7)  # has a file
+    _track(3)  # monitored without a file: missing
+    _track(99)  # not in the library any more
+
+    bot = asyncio.run(_poll(make_config, stub))
+
+    assert [row["item_id"] for row in downloads.tracked_downloads()] == [3]
+    assert ledger.find_request("movie", 1)["status"] == ledger.DOWNLOADED
+    assert [chat_id for chat_id, _ in bot.messages] == [7]
+
+
+def test_no_library_listing_while_titles_are_downloading(make_config, tables):
+    make_config(downloads={"ENABLED": True})
+    stub = RadarrStub(library_size=9)
+    _track(3)
+
+    asyncio.run(_poll(make_config, stub))
+
+    assert "GET /api/v3/movie" not in stub.calls
@@ -0,0 +1,39 @@
+import asyncio
+
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from streamnet import httpclient
+from streamnet.circuitbreaker import CLOSED, OPEN
+
+
+async def _call_repeatedly(status, calls):
+    async def respond(request):
+        return web.Response(status=status)
+
+    app = web.Application()
+    app.router.add_get("/", respond)
+    async with TestServer(app) as server:
+        try:
+            for _ in range(calls):
+                with pytest.raises(aiohttp.ClientResponseError):
+                    async with httpclient.request(
+                        "tmdb", "GET", str(server.make_url("/"))
+                    ) as response:
+                        response.raise_for_status()
+        finally:
+            await httpclient.close_session()
+    return httpclient.get_breaker("tmdb").state
+
+
+def test_4xx_raised_by_caller_does_not_open_breaker(make_config):
+    make_config(circuit_breaker={"MIN_CALLS": 5})
+    assert asyncio.run(_call_repeatedly(404, 10)) == CLOSED
+    assert httpclient.get_breaker("tmdb").snapshot()["failures"] == 0
+
+
+def test_5xx_opens_breaker(make_config):
+    make_config(circuit_breaker={"MIN_CALLS": 5})
+    assert asyncio.run(_call_repeatedly(503, 5)) == OPEN
@@ -0,0 +1,95 @@
+import asyncio
+import sqlite3
+import time
+
+from streamnet import jobqueue
+from streamnet.database import DATABASE_FILE
+
+
+def _set_running(job_id, owner, heartbeat_at):
+    with sqlite3.connect(DATABASE_FILE) as conn:
+        conn.execute(
+            "UPDATE jobs SET status = ?, owner = ?, heartbeat_at = ? WHERE id = ?",
+            (jobqueue.RUNNING, owner, heartbeat_at, job_id),
+        )
+        conn.commit()
+
+
+def _status(job_id):
+    with sqlite3.connect(DATABASE_FILE) as conn:
+        return conn.execute(
+            "SELECT status FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()[0]
+
+
+def test_init_requeues_only_stale_jobs(workdir):
+    jobqueue.init_job_queue()
+    live, _ = jobqueue.enqueue_job("add_movie", "movie:1", {}, 1, 1)
+    stale, _ = jobqueue.enqueue_job("add_movie", "movie:2", {}, 1, 1)
+    now = time.time()
+    _set_running(live, "other-replica", now)
+    _set_running(stale, "stopped-replica", now - jobqueue.STALE_SECONDS - 1)
+
+    jobqueue.init_job_queue()
+
+    assert _status(live) == jobqueue.RUNNING
+    assert _status(stale) == jobqueue.QUEUED
+
+
+def test_claim_records_owner_and_heartbeat(workdir):
+    jobqueue.init_job_queue()
+    job_id, _ = jobqueue.enqueue_job("add_movie", "movie:1", {}, 1, 1)
+    job = jobqueue.claim_next_job()
+    assert job["id"] == job_id
+    assert job["owner"] == jobqueue.OWNER
+
+    with sqlite3.connect(DATABASE_FILE) as conn:
+        conn.execute("UPDATE jobs SET heartbeat_at = 0 WHERE id = ?", (job_id,))
+        conn.commit()
+    jobqueue.heartbeat_jobs([job_id])
+    assert jobqueue.requeue_stale_jobs() == 0
+    assert _status(job_id) == jobqueue.RUNNING
+
+
+def test_worker_survives_database_errors(workdir, monkeypatch):
+    jobqueue.init_job_queue()
+    monkeypatch.setattr(jobqueue, "WORKER_ERROR_BACKOFF", 0)
+    calls = []
+
+    def claim():
+        calls.append(None)
+        if len(calls) < 3:
+            raise sqlite3.OperationalError("database is locked")
+        raise asyncio.CancelledError
+
+    monkeypatch.setattr(jobqueue, "claim_next_job", claim)
+    pool = jobqueue.JobWorkerPool(bot=None, workers=1)
+
+    async def run():
+        try:
+            await pool._worker()
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(run())
+    assert len(calls) == 3
+
+
+def test_job_queued_while_claiming_wakes_worker(workdir, monkeypatch):
+    jobqueue.init_job_queue()
+    pool = jobqueue.JobWorkerPool(bot=None, workers=1)
+    claim_next_job = jobqueue.claim_next_job
+
+    def claim():
+        job = claim_next_job()
+        pool.wake()  # a job is queued right after the empty claim
+        return job
+
+    monkeypatch.setattr(jobqueue, "claim_next_job", claim)
+
+    async def run():
+        started = time.monotonic()
+        await pool._work_once()
+        return time.monotonic() - started
+
+    assert asyncio.run(run()) < jobqueue.POLL_INTERVAL / 2
@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+from aiohttp.test_utils import TestServer
+
+from benchmarks.stubs import TVDB_ID_OFFSET, SonarrStub
+from streamnet import downloads, httpclient, jobqueue, ledger, media
+
+
+@pytest.fixture
+def tables(workdir):
+    jobqueue.init_job_queue()
+    ledger.init_ledger()
+    downloads.init_downloads()
+
+
+# Run the add_series job for series 7 of the stub, which is in Sonarr with
+# season 1 monitored and seasons 2 and 3 left out
+async def _add_series(make_config, stub, seasons):
+    stub.library[6]["seasons"] = [
+        {"seasonNumber": 0, "monitored": False},
+        {"seasonNumber": 1, "monitored": True},
+        {"seasonNumber": 2, "monitored": False},
+        {"seasonNumber": 3, "monitored": False},
+    ]
+    job = {"title": "Series 7", "tmdb_id": 7, "tvdb_id": 7 + TVDB_ID_OFFSET}
+    if seasons:
+        job["seasons"] = seasons
+    async with TestServer(stub.app) as server:
+        make_config(
+            sonarr={"URL": str(server.make_url("")).rstrip("/"), "API_KEY": "key"}
+        )
+        try:
+            return await media.add_series_to_sonarr(job)
+        finally:
+            await httpclient.close_session()
+
+
+def test_left_out_season_of_a_series_in_sonarr_is_monitored(make_config, tables):
+    stub = SonarrStub(library_size=10)
+    text = asyncio.run(_add_series(make_config, stub, [3]))
+
+    monitored = {
+        season["seasonNumber"]: season["monitored"]
+        for season in stub.library[6]["seasons"]
+    }
+    assert monitored == {0: False, 1: True, 2: False, 3: True}
+    assert stub.commands == [{"name": "SeasonSearch", "seriesId": 7, "seasonNumber": 3}]
+    assert stub.calls["POST /api/v3/series"] == 0
+    assert "Staffel 3" in text
+
+
+def test_all_seasons_of_a_series_in_sonarr_monitors_the_left_out_ones(
+    make_config, tables
+):
+    stub = SonarrStub(library_size=10)
+    asyncio.run(_add_series(make_config, stub, None))
+
+    assert [command["seasonNumber"] for command in stub.commands] == [2, 3]
+    assert media.unmonitored_seasons(stub.library[6]) == []
+
+
+def test_series_are_not_answered_from_the_ledger_once_added():
+    assert media.answered_by_ledger("movie", {"status": ledger.AVAILABLE})
+    assert media.answered_by_ledger("tv", {"status": ledger.REQUESTED})
+    assert not media.answered_by_ledger("tv", {"status": ledger.ADDED})
+    assert not media.answered_by_ledger("tv", None)
@@ -0,0 +1,99 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from streamnet import quota
+
+
+class FakeBot:
+    def __init__(self, status):
+        self.status = status
+        self.lookups = 0
+
+    async def get_chat_member(self, chat_id, user_id):
+        self.lookups += 1
+        return SimpleNamespace(status=self.status)
+
+
+def _update(user_id, chat_id=-100):
+    replies = []
+
+    async def reply_text(text):
+        replies.append(text)
+
+    return SimpleNamespace(
+        effective_user=SimpleNamespace(id=user_id),
+        effective_chat=SimpleNamespace(id=chat_id, type="supergroup"),
+        effective_message=SimpleNamespace(reply_text=reply_text),
+        callback_query=None,
+        replies=replies,
+    )
+
+
+@pytest.fixture(autouse=True)
+def clean_quota(make_config, monkeypatch):
+    make_config(
+        quota={
+            "ENABLED": True,
+            "USER": {"SEARCH": {"PER_MINUTE": 1, "BURST": 2}},
+            "CHAT": {"SEARCH": {"PER_MINUTE": 1, "BURST": 3}},
+        }
+    )
+    monkeypatch.setattr(quota, "_buckets", {})
+    monkeypatch.setattr(quota, "_dirty", set())
+    monkeypatch.setattr(quota, "_saved", set())
+    monkeypatch.setattr(quota, "_admins", {})
+    monkeypatch.setattr(quota, "_refused_until", {})
+
+
+def _allow(update, bot):
+    return asyncio.run(quota.allow(update, SimpleNamespace(bot=bot), quota.SEARCH))
+
+
+def test_users_are_refused_over_quota():
+    bot = FakeBot("member")
+    update = _update(1)
+    assert [_allow(update, bot) for _ in range(3)] == [True, True, False]
+    assert bot.lookups == 1
+    assert update.replies == [quota.REFUSAL_TEXT]
+
+
+def test_known_admins_do_not_use_up_the_chat_quota():
+    admin = FakeBot("administrator")
+    # The first time the admin runs out of tokens their status is looked up
+    assert all(_allow(_update(1), admin) for _ in range(3))
+    assert admin.lookups == 1
+    chat_tokens = quota._buckets[(quota.CHAT, -100, quota.SEARCH)].tokens
+
+    # From then on their actions take no tokens at all
+    assert all(_allow(_update(1), admin) for _ in range(10))
+    assert admin.lookups == 1
+    bucket = quota._buckets[(quota.CHAT, -100, quota.SEARCH)]
+    assert bucket.refill(time.time()) == pytest.approx(chat_tokens, abs=0.1)
+
+    member = FakeBot("member")
+    assert _allow(_update(2), member)
+
+
+def test_admins_checked_before_any_bucket():
+    quota._admins[1] = (True, time.monotonic())
+    assert all(_allow(_update(1), FakeBot("administrator")) for _ in range(5))
+    assert quota._buckets == {}
+    assert all(_allow(_update(2), FakeBot("member")) for _ in range(2))
+
+
+def test_workers_only_delete_their_own_saved_buckets(workdir):
+    quota.init_quota()
+    quota._buckets[(quota.CHAT, -200, quota.SEARCH)] = quota.TokenBucket(1, 3, 0)
+    quota._dirty.add((quota.CHAT, -200, quota.SEARCH))
+    quota.save_buckets()
+
+    # Another worker loads the bucket; once it has refilled there, the row
+    # stays for the worker that saved it
+    quota.load_buckets()
+    quota._buckets[(quota.CHAT, -200, quota.SEARCH)].tokens = 3
+    quota.save_buckets()
+    quota.load_buckets()
+    assert (quota.CHAT, -200, quota.SEARCH) in quota._buckets
@@ -0,0 +1,44 @@
+import asyncio
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from streamnet import httpclient, tmdb
+
+
+async def _queries(make_config, search):
+    queries = []
+
+    async def respond(request):
+        queries.append(dict(request.query))
+        return web.json_response({"results": []})
+
+    app = web.Application()
+    app.router.add_get("/3/search/{kind}", respond)
+    async with TestServer(app) as server:
+        make_config(tmdb={"API_KEY": "key", "API_URL": str(server.make_url("/3"))})
+        try:
+            await search()
+        finally:
+            await httpclient.close_session()
+    return queries
+
+
+def test_search_title_escapes_the_title(make_config):
+    async def search():
+        await tmdb.search_title("movie", "Fast & Furious", 2009)
+        await tmdb.search_title("tv", "What If...?#1")
+
+    assert asyncio.run(_queries(make_config, search)) == [
+        {"api_key": "key", "query": "Fast & Furious", "year": "2009"},
+        {"api_key": "key", "query": "What If...?#1"},
+    ]
+
+
+def test_search_multi_escapes_the_title(make_config):
+    async def search():
+        await tmdb.search_multi("Love, Death + Robots", language="de")
+
+    assert asyncio.run(_queries(make_config, search)) == [
+        {"api_key": "key", "query": "Love, Death + Robots", "language": "de"},
+    ]
@@ -0,0 +1,17 @@
+from types import SimpleNamespace
+
+from streamnet import callbackdata
+from streamnet.tracing import describe_update
+
+
+def _press(data):
+    return SimpleNamespace(callback_query=SimpleNamespace(data=data))
+
+
+def test_callback_kind_is_the_action_of_signed_data(make_config):
+    make_config()
+    first = callbackdata.encode("a", "movie", 603, 1)
+    second = callbackdata.encode("a", "movie", 27205, 2)
+    assert describe_update(_press(first)) == "callback:am"
+    assert describe_update(_press(second)) == "callback:am"
+    assert describe_update(_press("search_tmdb")) == "callback:search_tmdb"
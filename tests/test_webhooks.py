@@ -0,0 +1,164 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from benchmarks.stubs import RadarrStub, SonarrStub
+from streamnet import downloads, httpclient, jobqueue, ledger, library, webhooks
+
+SECRET = "s3cret-webhook-token"
+SECTIONS = {
+    "webhooks": {"ENABLED": True, "SECRET": SECRET},
+    "downloads": {"ENABLED": False},
+}
+
+
+@pytest.fixture
+def setup(workdir, make_config, monkeypatch):
+    make_config(**SECTIONS)
+    jobqueue.init_job_queue()
+    ledger.init_ledger()
+    downloads.init_downloads()
+    library.init_library_index()
+    finished = []
+
+    async def finish_download(bot, row, title):
+        finished.append((row["service"], row["item_id"], title))
+        downloads.untrack_download(row["service"], row["item_id"])
+
+    monkeypatch.setattr(downloads, "finish_download", finish_download)
+    monkeypatch.setattr(webhooks, "_bot", object())
+    return finished
+
+
+# Post each (path, body) to the webhook receiver, with Sonarr answering the
+# episode lookups. Returns the response statuses.
+async def _post(make_config, sonarr, requests):
+    webhook_app = web.Application()
+    webhook_app.router.add_post("/webhooks/{service}/{secret}", webhooks._receive)
+    statuses = []
+    async with TestServer(sonarr.app) as sonarr_server, TestClient(
+        TestServer(webhook_app)
+    ) as client:
+        make_config(
+            **SECTIONS,
+            sonarr={
+                "URL": str(sonarr_server.make_url("")).rstrip("/"),
+                "API_KEY": "key",
+            },
+        )
+        try:
+            for path, body in requests:
+                if isinstance(body, str):
+                    response = await client.post(path, data=body)
+                else:
+                    response = await client.post(path, json=body)
+                statuses.append(response.status)
+        finally:
+            await httpclient.close_session()
+    return statuses
+
+
+def _run(make_config, requests, sonarr=None):
+    return asyncio.run(
+        _post(make_config, sonarr or SonarrStub(library_size=5), requests)
+    )
+
+
+def _added(media_type, tmdb_id, tvdb_id=None):
+    ledger.record_request(
+        media_type,
+        tmdb_id,
+        f"Title {tmdb_id}",
+        7,
+        "user",
+        -100,
+        tvdb_id=tvdb_id,
+        status=ledger.ADDED,
+    )
+
+
+def test_wrong_secret_or_service_is_not_found(setup, make_config):
+    payload = RadarrStub(library_size=3).webhook_payload("Test", 1)
+    assert _run(
+        make_config,
+        [
+            ("/webhooks/radarr/wrong-secret-value", payload),
+            ("/webhooks/lidarr/" + SECRET, payload),
+        ],
+    ) == [404, 404]
+
+
+def test_bodies_that_are_not_objects_are_rejected(setup, make_config):
+    path = "/webhooks/radarr/" + SECRET
+    assert _run(make_config, [(path, [1, 2]), (path, "not json")]) == [400, 400]
+
+
+def test_delete_marks_requests_removed(setup, make_config):
+    sonarr, radarr = SonarrStub(library_size=5), RadarrStub(library_size=5)
+    _added("tv", 2, tvdb_id=sonarr.library[1]["tvdbId"])
+    _added("movie", 3)
+    downloads.track_download("radarr", 3, 3)
+
+    statuses = _run(
+        make_config,
+        [
+            ("/webhooks/sonarr/" + SECRET, sonarr.webhook_payload("SeriesDelete", 2)),
+            ("/webhooks/radarr/" + SECRET, radarr.webhook_payload("MovieDelete", 3)),
+        ],
+        sonarr,
+    )
+
+    assert statuses == [204, 204]
+    assert ledger.find_request("tv", 2)["status"] == ledger.REMOVED
+    assert ledger.find_request("movie", 3)["status"] == ledger.REMOVED
+    assert downloads.tracked_downloads() == []
+
+
+def test_download_of_tracked_title_finishes_it(setup, make_config):
+    sonarr, radarr = SonarrStub(library_size=5), RadarrStub(library_size=5)
+    _added("movie", 1)
+    _added("tv", 2)
+    downloads.track_download("radarr", 1, 1)
+    downloads.track_download("sonarr", 2, 2)
+    # Not tracked: neither finished nor announced
+    radarr_download = radarr.webhook_payload("Download", 4)
+
+    statuses = _run(
+        make_config,
+        [
+            ("/webhooks/radarr/" + SECRET, radarr.webhook_payload("Download", 1)),
+            ("/webhooks/sonarr/" + SECRET, sonarr.webhook_payload("Download", 2)),
+            ("/webhooks/radarr/" + SECRET, radarr_download),
+        ],
+        sonarr,
+    )
+
+    assert statuses == [204, 204, 204]
+    assert setup == [("radarr", 1, "Movie 1"), ("sonarr", 2, "Series 2")]
+    assert sonarr.calls["GET /api/v3/episode"] == 1
+
+
+def test_download_waits_for_missing_episodes(setup, make_config):
+    sonarr = SonarrStub(library_size=5)
+    sonarr.set_downloaded(sonarr.library[1], False)
+    downloads.track_download("sonarr", 2, 2)
+
+    path = "/webhooks/sonarr/" + SECRET
+    assert _run(
+        make_config, [(path, sonarr.webhook_payload("Download", 2))], sonarr
+    ) == [204]
+    assert setup == []
+    assert len(downloads.tracked_downloads()) == 1
+
+
+def test_rename_updates_the_library_index(setup, make_config):
+    radarr = RadarrStub(library_size=5)
+    radarr.library[2]["title"] = "Renamed Movie"
+
+    path = "/webhooks/radarr/" + SECRET
+    assert _run(make_config, [(path, radarr.webhook_payload("Rename", 3))]) == [204]
+    assert [match["tmdb_id"] for match in library.search_library("Renamed Movie")] == [
+        3
+    ]